@@ -0,0 +1,157 @@
+# Copyright (c) 2018 Stephen Bunn <stephen@bunn.io>
+# MIT License <https://choosealicense.com/licenses/mit/>
+
+"""Benchmarks reading every file of a synthetic BSA of many small files.
+
+Compares parsing each file through the construct file structures against
+:func:`~bethesda_structs.archive.BSAArchive.read_record`.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bsa_read.py [file_count] [compression]
+"""
+
+import os
+import sys
+import time
+import zlib
+import struct
+import tempfile
+
+import lz4.frame
+
+from bethesda_structs.archive import BSAArchive
+
+FILES_PER_DIRECTORY = 256
+
+
+def build_archive(filepath: str, file_count: int, compression: str = "lz4"):
+    """Writes a synthetic BSA of small compressed files.
+
+    Args:
+        filepath (str): The filepath to write the archive to
+        file_count (int): The number of files in the archive
+        compression (str, optional): Defaults to "lz4".
+            The compression of the archive's files, either ``lz4`` (v105) or
+            ``zlib`` (v104)
+    """
+    version = 105 if compression == "lz4" else 104
+    compress = lz4.frame.compress if compression == "lz4" else zlib.compress
+
+    directories = {}
+    for index in range(file_count):
+        directories.setdefault(
+            f"meshes\\bench{index // FILES_PER_DIRECTORY:04d}", []
+        ).append(f"file{index:06d}.nif")
+    directories = sorted(
+        (
+            BSAArchive.hash_name(directory),
+            directory,
+            sorted(
+                (BSAArchive.hash_name(*os.path.splitext(name)), name) for name in names
+            ),
+        )
+        for (directory, names) in directories.items()
+    )
+
+    directory_record_size = 24 if version >= 105 else 16
+    directory_names_length = sum(len(name) + 1 for (_, name, _) in directories)
+    file_names = b"".join(
+        name.encode("utf8") + b"\x00"
+        for (_, _, names) in directories
+        for (_, name) in names
+    )
+    data_offset = (
+        36
+        + len(directories) * directory_record_size
+        + directory_names_length
+        + len(directories)
+        + file_count * 16
+        + len(file_names)
+    )
+
+    (directory_records, directory_blocks, file_data) = ([], [], [])
+    block_offset = 36 + len(directories) * directory_record_size
+    offset = data_offset
+    for (directory_hash, directory, names) in directories:
+        name_offset = block_offset + len(file_names)
+        if version >= 105:
+            directory_records.append(
+                struct.pack("<QIIQ", directory_hash, len(names), 0, name_offset)
+            )
+        else:
+            directory_records.append(
+                struct.pack("<QII", directory_hash, len(names), name_offset)
+            )
+
+        block = [bytes([len(directory) + 1]) + directory.encode("utf8") + b"\x00"]
+        for (file_hash, name) in names:
+            data = (name.encode("utf8") + b" ") * 8
+            stored = struct.pack("<I", len(data)) + compress(data)
+            block.append(struct.pack("<QII", file_hash, len(stored), offset))
+            file_data.append(stored)
+            offset += len(stored)
+        block = b"".join(block)
+        directory_blocks.append(block)
+        block_offset += len(block)
+
+    header = struct.pack(
+        "<4sIIIIIIII",
+        b"BSA\x00",
+        version,
+        36,
+        0x007,
+        len(directories),
+        file_count,
+        directory_names_length,
+        len(file_names),
+        0x001,
+    )
+    with open(filepath, "wb") as stream:
+        stream.write(header)
+        stream.write(b"".join(directory_records))
+        stream.write(b"".join(directory_blocks))
+        stream.write(file_names)
+        stream.write(b"".join(file_data))
+
+
+def read_construct(archive: BSAArchive) -> int:
+    """Reads every file by parsing it with the construct file structures."""
+    total = 0
+    for record in archive.records:
+        file_struct = archive.compressed_file_struct
+        total += len(
+            file_struct.parse(archive._read(record.offset, record.packed_size)).data
+        )
+    return total
+
+
+def read_records(archive: BSAArchive) -> int:
+    """Reads every file with :func:`~BSAArchive.read_record`."""
+    return sum(len(archive.read_record(record).data) for record in archive.records)
+
+
+def main(file_count: int = 50000, compression: str = "lz4"):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filepath = os.path.join(temp_dir, "bench.bsa")
+        build_archive(filepath, file_count, compression=compression)
+
+        with BSAArchive.parse_file(filepath) as archive:
+            # NOTE: build the records up front so only reading files is measured
+            archive.records
+            results = {}
+            for read in (read_construct, read_records):
+                start = time.perf_counter()
+                results[read.__name__] = read(archive)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{read.__name__:>16}: {elapsed:.3f}s "
+                    f"({elapsed / file_count * 1e6:.2f}us per file)"
+                )
+            assert len(set(results.values())) == 1
+
+
+if __name__ == "__main__":
+    main(
+        file_count=(int(sys.argv[1]) if len(sys.argv) > 1 else 50000),
+        compression=(sys.argv[2] if len(sys.argv) > 2 else "lz4"),
+    )
@@ -2,17 +2,27 @@
 # MIT License <https://choosealicense.com/licenses/mit/>
 
 from .bsa import BSAArchive
+from ._vfs import ArchiveVFS
 from .btdx import BTDXArchive
-from ._common import BaseArchive
+from ._common import ARCHIVE_BACKENDS, BaseArchive, record_filter
+from ._compare import ArchiveChange, DuplicateGroup, diff_archives, find_duplicates
 
 AVAILABLE_ARCHIVES = (BSAArchive, BTDXArchive)
 
 
-def get_archive(filepath: str) -> BaseArchive:
+def get_archive(
+    filepath: str, backend: str = "memory", cache_dir: str = None
+) -> BaseArchive:
     """Get an instance of the first archive that can handle a given file.
 
     Args:
         filepath (str): The path of the file to handle
+        backend (str, optional): Defaults to "memory".
+            The content backend to open the archive with (see
+            :func:`~BaseArchive.parse_file`)
+        cache_dir (str, optional): Defaults to None.
+            The directory to keep the archive's index cache in (see
+            :func:`~BaseArchive.parse_file`)
 
     Returns:
         BaseArchive: The base archive
@@ -29,4 +39,4 @@ def get_archive(filepath: str) -> BaseArchive:
 
     for arch in AVAILABLE_ARCHIVES:
         if arch.can_handle(filepath):
-            return arch.parse_file(filepath)
+            return arch.parse_file(filepath, backend=backend, cache_dir=cache_dir)
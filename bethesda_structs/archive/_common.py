@@ -1,125 +1,2100 @@
 # Copyright (c) 2018 Stephen Bunn <stephen@bunn.io>
 # MIT License <https://choosealicense.com/licenses/mit/>
 
+import io
 import os
+import re
 import abc
-from typing import Generic, TypeVar, Callable, Generator
-from pathlib import Path
+import mmap
+import zlib
+import json
+import queue
+import struct
+import hashlib
+import tempfile
+import threading
+import collections
+import multiprocessing
+from typing import (
+    Any,
+    Dict,
+    List,
+    Type,
+    Tuple,
+    Union,
+    Generic,
+    Pattern,
+    TypeVar,
+    Callable,
+    Iterable,
+    Generator,
+)
+from pathlib import Path, PurePath, PureWindowsPath
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
 
 import attr
-from construct import Construct, Container, StreamError
+import lz4.frame
+from construct import Construct, Container, StreamError, ListContainer
 
 from .._common import BaseFiletype
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
 T_BaseArchive = TypeVar("BaseArchive")
+T_IndexCacheKey = Tuple[int, int, int]
+
+ARCHIVE_BACKENDS = ("memory", "mmap", "file")
+EXTRACT_EXECUTORS = ("thread", "process")
+EXTRACT_MODES = ("full", "incremental")
+EXTRACT_MANIFEST_VERSION = 1
+EXTRACT_BLOCK_SIZE = 16 * 1024 * 1024
+EXTRACT_BLOCK_GAP = 64 * 1024
+STREAM_BUFFER_SIZE = 1024 * 1024
+INDEX_TABLE_DTYPE = [
+    ("offset", "<u8"),
+    ("packed_size", "<u4"),
+    ("unpacked_size", "<u4"),
+    ("compressed", "?"),
+    ("dir_hash", "<u8"),
+    ("file_hash", "<u8"),
+    ("name_id", "<u4"),
+]
+INDEX_CACHE_MAGIC = b"BSIX"
+INDEX_CACHE_VERSION = 1
+INDEX_CACHE_COMPRESSIONS = (None, "zlib", "lz4")
+
+# magic, version, archive size, archive mtime, archive header checksum, record count,
+# payload size, payload checksum
+_INDEX_CACHE_HEADER = struct.Struct("<4sHQQIIII")
+# filepath size, offset, packed size, unpacked size, compression, container size
+_INDEX_CACHE_RECORD = struct.Struct("<HQIIBH")
+_INDEX_CACHE_UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+@attr.s
+class ArchiveFile(object):
+    """A generic archive file object that can be used for extracting.
+
+    The purpose of this object is to provide some generic format for
+    :func:`~BaseArchive.iter_files` to yield so that the :func:`~BaseArchive.extract`
+    method can be abstracted away from the archive subclasses.
+    """
+
+    filepath = attr.ib(type=str, converter=Path)
+    """The relative filepath of the archived file.
+
+    Returns:
+        str: The relative filepath of the archived file
+    """
+
+    _data = attr.ib(type=bytes, repr=False)
+
+    @property
+    def data(self) -> bytes:
+        """The raw data of the archived file.
+
+        Returns:
+            bytes: The raw data of the archived file
+        """
+        return self._data
+
+    @property
+    def size(self) -> int:
+        """The size of the raw data.
+
+        Returns:
+            int: The size of the raw data
+        """
+        return len(self.data)
+
+    def open(self) -> io.BufferedIOBase:
+        """Opens the raw data of the archived file as a readable stream.
+
+        Returns:
+            io.BufferedIOBase: A readable stream of the raw data
+        """
+        return io.BytesIO(self.data)
+
+
+@attr.s(slots=True)
+class ArchiveRecord(object):
+    """A reference to a file stored within an archive.
+
+    Records are built from the archive's parsed records and names without reading any
+    of the archived file's data.
+    They are read into an :class:`ArchiveFile` by :func:`~BaseArchive.read_record`.
+    """
+
+    filepath = attr.ib(type=PureWindowsPath)
+    """The relative filepath of the archived file.
+
+    Returns:
+        PureWindowsPath: The relative filepath of the archived file
+    """
+
+    _container = attr.ib(type=Union[Container, Callable[[], Container]], repr=False)
+
+    offset = attr.ib(type=int, default=None)
+    """The offset of the archived file's stored data.
+
+    Returns:
+        int: The offset of the archived file's stored data
+    """
+
+    packed_size = attr.ib(type=int, default=None)
+    """The size of the archived file's stored data.
+
+    Returns:
+        int: The size of the archived file's stored data
+    """
+
+    unpacked_size = attr.ib(type=int, default=None)
+    """The size of the archived file's data once read.
+
+    Note:
+        This may be None if the size is stored with the file's data, use
+        :func:`~BaseArchive.record_size` to resolve it.
+
+    Returns:
+        int: The size of the archived file's data once read
+    """
+
+    compression = attr.ib(type=str, default=None)
+    """The compression of the archived file's stored data.
+
+    Returns:
+        str: Either ``zlib`` or ``lz4``, None if the data is not compressed
+    """
+
+    @property
+    def container(self) -> Container:
+        """The parsed record container of the archived file.
+
+        Note:
+            Archives may give a callable building the container instead, in which
+            case the container is only built when it is first accessed.
+
+        Returns:
+            Container: The parsed record container of the archived file
+        """
+        # NOTE: containers are callable themselves, so factories are any other callable
+        if not isinstance(self._container, Container):
+            self._container = self._container()
+        return self._container
+
+
+@attr.s
+class LazyArchiveFile(ArchiveFile):
+    """An archive file whose data is only read when it is first accessed.
+
+    These are yielded by :func:`~BaseArchive.iter_files` so that files can be listed
+    (and filtered by their size) without reading or decompressing any of their data.
+
+    Note:
+        The archive must not be closed before the file's data is accessed.
+    """
+
+    archive = attr.ib(type="BaseArchive", repr=False)
+    """The archive the file is stored in.
+
+    Returns:
+        BaseArchive: The archive the file is stored in
+    """
+
+    record = attr.ib(type=ArchiveRecord, repr=False)
+    """The record of the archived file.
+
+    Returns:
+        ArchiveRecord: The record of the archived file
+    """
+
+    _data = attr.ib(type=bytes, default=None, repr=False, init=False)
+
+    @property
+    def data(self) -> bytes:
+        """The raw data of the archived file (read on first access).
+
+        Returns:
+            bytes: The raw data of the archived file
+        """
+        if self._data is None:
+            self._data = self.archive.read_record(self.record).data
+        return self._data
+
+    @property
+    def size(self) -> int:
+        """The size of the raw data (without reading the data).
+
+        Returns:
+            int: The size of the raw data
+        """
+        return self.archive.record_size(self.record)
+
+    @property
+    def offset(self) -> int:
+        """The offset of the archived file's stored data.
+
+        Returns:
+            int: The offset of the archived file's stored data
+        """
+        return self.record.offset
+
+    @property
+    def packed_size(self) -> int:
+        """The size of the archived file's stored data.
+
+        Returns:
+            int: The size of the archived file's stored data
+        """
+        return self.record.packed_size
+
+    @property
+    def compression(self) -> str:
+        """The compression of the archived file's stored data.
+
+        Returns:
+            str: Either ``zlib`` or ``lz4``, None if the data is not compressed
+        """
+        return self.record.compression
+
+    def open(self) -> io.BufferedIOBase:
+        """Opens the raw data of the archived file as a readable stream.
+
+        Note:
+            Unless the data has already been read, the stream reads (and decompresses)
+            the data from the archive as it is read (see :class:`ArchiveFileReader`).
+
+        Returns:
+            io.BufferedIOBase: A readable stream of the raw data
+        """
+        if self._data is not None:
+            return io.BytesIO(self._data)
+        return io.BufferedReader(ArchiveFileReader(self.archive, self.record))
+
+
+class ArchiveFileReader(io.RawIOBase):
+    """A read-only raw stream of the data of an archived file.
+
+    Files which are stored uncompressed in a single range of the archive are read
+    directly from the archive's content and are seekable.
+    Other files are decompressed incrementally as they are read and are not seekable.
+
+    Note:
+        This should usually be wrapped in a :class:`io.BufferedReader`, as is done by
+        :func:`~BaseArchive.open`.
+    """
+
+    def __init__(
+        self,
+        archive: "BaseArchive",
+        record: ArchiveRecord,
+        buffer_size: int = STREAM_BUFFER_SIZE,
+    ):
+        """Initializes the reader.
+
+        Args:
+            archive (BaseArchive): The archive the file is stored in
+            record (ArchiveRecord): The record of the archived file
+            buffer_size (int, optional): Defaults to ``STREAM_BUFFER_SIZE``.
+                The size of the pieces to read and decompress
+        """
+        super().__init__()
+        self.archive = archive
+        self.record = record
+        self.size = archive.record_size(record)
+        self._stored_range = archive._stored_range(record)
+        self._buffer_size = buffer_size
+        self._position = 0
+        self._pieces = None
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self._stored_range is not None
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if not self.seekable():
+            raise io.UnsupportedOperation(
+                f"{self.record.filepath!s} is compressed and cannot be seeked"
+            )
+
+        position = {
+            io.SEEK_SET: 0,
+            io.SEEK_CUR: self._position,
+            io.SEEK_END: self.size,
+        }[whence] + offset
+        if position < 0:
+            raise ValueError(f"negative seek position {position!r}")
+        self._position = position
+        return self._position
+
+    def readinto(self, buffer: bytearray) -> int:
+        buffer = memoryview(buffer).cast("B")
+        if self._stored_range is not None:
+            (offset, size) = self._stored_range
+            read_size = max(0, min(len(buffer), size - self._position))
+            if read_size > 0:
+                buffer[:read_size] = self.archive._read(
+                    offset + self._position, read_size
+                )
+            self._position += read_size
+            return read_size
+
+        if self._pieces is None:
+            self._pieces = self.archive.iter_record_data(
+                self.record, buffer_size=self._buffer_size
+            )
+        while not self._pending:
+            piece = next(self._pieces, None)
+            if piece is None:
+                return 0
+            self._pending = memoryview(piece).cast("B")
+
+        read_size = min(len(buffer), len(self._pending))
+        buffer[:read_size] = self._pending[:read_size]
+        self._pending = self._pending[read_size:]
+        self._position += read_size
+        return read_size
+
+    def close(self):
+        if self._pieces is not None:
+            self._pieces.close()
+            self._pieces = None
+        self._pending = memoryview(b"")
+        super().close()
+
+
+T_RecordPattern = Union[str, Pattern, Iterable[Union[str, Pattern]]]
+
+
+def _compile_glob(pattern: str) -> Pattern:
+    """Compiles a case-insensitive regular expression from a given glob pattern.
+
+    Note:
+        Both ``/`` and ``\\`` are treated as path separators.
+        ``*`` and ``?`` never match path separators, ``**`` matches any number of
+        directories and ``[...]`` matches character sets (``[!...]`` negates them).
+
+    Args:
+        pattern (str): The glob pattern to compile
+
+    Returns:
+        Pattern: The compiled regular expression
+    """
+    pattern = pattern.replace("\\", "/")
+    (index, regex) = (0, "")
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            (index, regex) = (index + 3, regex + "(?:.*/)?")
+            continue
+        elif pattern.startswith("**", index):
+            (index, regex) = (index + 2, regex + ".*")
+            continue
+        elif char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[" and "]" in pattern[index + 2 :]:
+            end = pattern.index("]", index + 2)
+            charset = pattern[index + 1 : end]
+            if charset.startswith("!"):
+                charset = "^" + charset[1:]
+            (index, regex) = (end + 1, regex + f"[{charset}]")
+            continue
+        else:
+            regex += re.escape(char)
+        index += 1
+    return re.compile(regex, re.IGNORECASE)
+
+
+def _compile_patterns(patterns: T_RecordPattern) -> List[Pattern]:
+    """Compiles given glob patterns and regular expressions.
+
+    Args:
+        patterns (T_RecordPattern): A glob pattern, regular expression or iterable of
+            glob patterns and regular expressions
+
+    Returns:
+        List[Pattern]: A list of compiled regular expressions
+    """
+    if isinstance(patterns, (str, Pattern)):
+        patterns = [patterns]
+    return [
+        pattern if isinstance(pattern, Pattern) else _compile_glob(pattern)
+        for pattern in patterns
+    ]
+
+
+def record_filter(
+    include: T_RecordPattern = None,
+    exclude: T_RecordPattern = None,
+    predicate: Callable[[ArchiveRecord], bool] = None,
+) -> Callable[[ArchiveRecord], bool]:
+    """Builds a filter for archive records.
+
+    Glob patterns are matched against the full relative filepath of a record
+    (case-insensitive, using ``/`` as the separator).
+    Regular expressions are matched (using ``fullmatch``) against the same filepath.
+
+    Args:
+        include (T_RecordPattern, optional): Defaults to None.
+            Glob patterns or regular expressions of which a record's filepath must
+            match at least one
+        exclude (T_RecordPattern, optional): Defaults to None.
+            Glob patterns or regular expressions of which a record's filepath must
+            match none
+        predicate (Callable[[ArchiveRecord], bool], optional): Defaults to None.
+            A callable that is given records that pass the patterns and returns True
+            if the record should be included (records filtered by an archive have
+            their ``unpacked_size`` read, see :func:`~BaseArchive.extract`)
+
+    Returns:
+        Callable[[ArchiveRecord], bool]: A callable that returns True if a given
+        record passes the filter
+
+    Example:
+        >>> FILEPATH = ""  # absolute path to BSA/BTDX archive
+        >>> archive = bethesda_structs.archive.get_archive(FILEPATH)
+        >>> for archive_file in archive.iter_files(
+        ...     filter=record_filter(include="textures/**/*.dds", exclude="**/*_n.dds")
+        ... ):
+        ...     print(archive_file.filepath)
+    """
+    include = _compile_patterns(include) if include is not None else None
+    exclude = _compile_patterns(exclude) if exclude is not None else []
+
+    def filter_record(record: ArchiveRecord) -> bool:
+        filepath = record.filepath.as_posix()
+        if include is not None and not any(
+            pattern.fullmatch(filepath) for pattern in include
+        ):
+            return False
+        if any(pattern.fullmatch(filepath) for pattern in exclude):
+            return False
+        return predicate(record) if callable(predicate) else True
+
+    return filter_record
+
+
+def _get_index_cache_filepath(cache_dir: str, archive_type: str, filepath: str) -> Path:
+    """Gets the filepath of the index cache of an archive.
+
+    Args:
+        cache_dir (str): The directory index caches are stored in
+        archive_type (str): The name of the archive's class
+        filepath (str): The filepath of the archive
+
+    Returns:
+        Path: The filepath of the archive's index cache
+    """
+    archive_path = os.path.normcase(os.path.abspath(filepath))
+    digest = hashlib.sha1(f"{archive_type}:{archive_path}".encode("utf8"))
+    return Path(cache_dir).joinpath(f"{digest.hexdigest()}.idx")
+
+
+def _get_index_cache_key(filepath: str, header_content: bytes) -> T_IndexCacheKey:
+    """Gets the key an index cache is valid for.
+
+    Args:
+        filepath (str): The filepath of the archive
+        header_content (bytes): The content of the archive's header
+
+    Returns:
+        T_IndexCacheKey: A tuple of the archive's (``size``, ``mtime_ns``,
+        ``header_checksum``)
+    """
+    stat = os.stat(filepath)
+    return (stat.st_size, stat.st_mtime_ns, zlib.crc32(header_content))
+
+
+def _load_index_cache(
+    cache_filepath: Path,
+    key: T_IndexCacheKey,
+    unpack_container: Callable[[memoryview], Container],
+) -> List[ArchiveRecord]:
+    """Reads the records of an archive from its index cache.
+
+    Args:
+        cache_filepath (Path): The filepath of the index cache
+        key (T_IndexCacheKey): The key the index cache must be valid for
+        unpack_container (Callable[[memoryview], Container]): A callable that builds
+            a record container from its packed content
+
+    Returns:
+        List[ArchiveRecord]: The records of the archive, None if the index cache
+        doesn't exist or is not valid for the given key
+    """
+    try:
+        with open(cache_filepath, "rb") as stream:
+            content = memoryview(stream.read())
+    except OSError:
+        return None
+
+    if len(content) < _INDEX_CACHE_HEADER.size:
+        return None
+    (
+        magic,
+        version,
+        archive_size,
+        archive_mtime,
+        header_checksum,
+        record_count,
+        payload_size,
+        payload_checksum,
+    ) = _INDEX_CACHE_HEADER.unpack_from(content)
+    payload = content[_INDEX_CACHE_HEADER.size :]
+    if (
+        magic != INDEX_CACHE_MAGIC
+        or version != INDEX_CACHE_VERSION
+        or (archive_size, archive_mtime, header_checksum) != key
+        or len(payload) != payload_size
+        or zlib.crc32(payload) != payload_checksum
+    ):
+        return None
+
+    (records, offset) = ([], 0)
+    for _ in range(record_count):
+        (
+            filepath_size,
+            record_offset,
+            packed_size,
+            unpacked_size,
+            compression,
+            container_size,
+        ) = _INDEX_CACHE_RECORD.unpack_from(payload, offset)
+        offset += _INDEX_CACHE_RECORD.size
+        filepath = str(payload[offset : (offset + filepath_size)], "utf8")
+        offset += filepath_size
+        container = unpack_container(payload[offset : (offset + container_size)])
+        offset += container_size
+
+        records.append(
+            ArchiveRecord(
+                filepath=PureWindowsPath(filepath),
+                container=container,
+                offset=record_offset,
+                packed_size=packed_size,
+                unpacked_size=(
+                    None
+                    if unpacked_size == _INDEX_CACHE_UNKNOWN_SIZE
+                    else unpacked_size
+                ),
+                compression=INDEX_CACHE_COMPRESSIONS[compression],
+            )
+        )
+    return records
+
+
+def _dump_index_cache(
+    cache_filepath: Path,
+    key: T_IndexCacheKey,
+    records: List[ArchiveRecord],
+    pack_container: Callable[[Container], bytes],
+):
+    """Writes the records of an archive to its index cache.
+
+    Note:
+        The index cache is written to a temporary file which then replaces the index
+        cache, so concurrent writers and readers never see a partially written cache.
+
+    Args:
+        cache_filepath (Path): The filepath of the index cache
+        key (T_IndexCacheKey): The key the index cache is valid for
+        records (List[ArchiveRecord]): The records of the archive
+        pack_container (Callable[[Container], bytes]): A callable that packs a record
+            container into bytes
+    """
+    payload = []
+    for record in records:
+        filepath = str(record.filepath).encode("utf8")
+        container = pack_container(record.container)
+        payload.append(
+            _INDEX_CACHE_RECORD.pack(
+                len(filepath),
+                record.offset,
+                record.packed_size,
+                (
+                    _INDEX_CACHE_UNKNOWN_SIZE
+                    if record.unpacked_size is None
+                    else record.unpacked_size
+                ),
+                INDEX_CACHE_COMPRESSIONS.index(record.compression),
+                len(container),
+            )
+        )
+        payload.extend((filepath, container))
+    payload = b"".join(payload)
+
+    cache_filepath.parent.mkdir(parents=True, exist_ok=True)
+    (handle, temp_filepath) = tempfile.mkstemp(
+        dir=str(cache_filepath.parent), prefix=f".{cache_filepath.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(handle, "wb") as stream:
+            stream.write(
+                _INDEX_CACHE_HEADER.pack(
+                    INDEX_CACHE_MAGIC,
+                    INDEX_CACHE_VERSION,
+                    *key,
+                    len(records),
+                    len(payload),
+                    zlib.crc32(payload),
+                )
+            )
+            stream.write(payload)
+        os.replace(temp_filepath, str(cache_filepath))
+    except BaseException:
+        os.remove(temp_filepath)
+        raise
+
+
+@attr.s(slots=True)
+class _ExtractedFile(object):
+    """The manifest entry of a file written by an incremental extraction.
+    """
+
+    size = attr.ib(type=int)
+    offset = attr.ib(type=int)
+    packed_size = attr.ib(type=int)
+    compression = attr.ib(type=str)
+    checksum = attr.ib(type=int)
+    mtime_ns = attr.ib(type=int)
+
+
+def _load_extract_manifest(
+    manifest_filepath: Path,
+) -> Tuple[T_IndexCacheKey, Dict[str, _ExtractedFile]]:
+    """Reads the manifest of a previous incremental extraction.
+
+    Args:
+        manifest_filepath (Path): The filepath of the manifest
+
+    Returns:
+        Tuple[T_IndexCacheKey, Dict[str, _ExtractedFile]]: A tuple of the key of the
+        extracted archive (maybe None) and the extracted files by their relative posix
+        filepaths, empty if the manifest doesn't exist or is not valid
+    """
+    try:
+        with open(manifest_filepath, "r", encoding="utf8") as stream:
+            manifest = json.load(stream)
+        if manifest["version"] != EXTRACT_MANIFEST_VERSION:
+            return (None, {})
+        return (
+            tuple(manifest["archive"]) if manifest["archive"] is not None else None,
+            {
+                filepath: _ExtractedFile(*entry)
+                for (filepath, entry) in manifest["files"].items()
+            },
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return (None, {})
+
+
+def _dump_extract_manifest(
+    manifest_filepath: Path,
+    key: T_IndexCacheKey,
+    extracted: Dict[str, _ExtractedFile],
+):
+    """Writes the manifest of an incremental extraction.
+
+    Args:
+        manifest_filepath (Path): The filepath of the manifest
+        key (T_IndexCacheKey): The key of the extracted archive (maybe None)
+        extracted (Dict[str, _ExtractedFile]): The extracted files by their relative
+            posix filepaths
+    """
+    manifest = json.dumps(
+        {
+            "version": EXTRACT_MANIFEST_VERSION,
+            "archive": key,
+            "files": {
+                filepath: attr.astuple(entry)
+                for (filepath, entry) in sorted(extracted.items())
+            },
+        },
+        separators=(",", ":"),
+    )
+    _write_archive(
+        str(manifest_filepath), lambda stream: stream.write(manifest.encode("utf8"))
+    )
+
+
+T_ArchiveSource = Union[
+    str, Iterable[Tuple[Union[str, PurePath], Union[bytes, io.BufferedIOBase]]]
+]
+
+
+@attr.s(slots=True)
+class _SourceFile(object):
+    """A file to be written into a built archive.
+    """
+
+    filepath = attr.ib(type=PureWindowsPath)
+    content = attr.ib(type=Union[Path, bytes, io.BufferedIOBase], repr=False)
+
+    def read(self, size: int = None) -> bytes:
+        """Reads the content of the file.
+
+        Note:
+            Loose files are opened for each read and seekable streams are rewound
+            after each read, so the file can be read (or partially read) repeatedly.
+            Streams which aren't seekable are read whole on the first read.
+
+        Args:
+            size (int, optional): Defaults to None.
+                The number of bytes to read from the start of the file, reads the
+                full file if None
+
+        Returns:
+            bytes: The content of the file
+        """
+        if isinstance(self.content, Path):
+            with self.content.open("rb") as stream:
+                return stream.read(-1 if size is None else size)
+        elif isinstance(self.content, (bytes, bytearray, memoryview)):
+            return bytes(self.content[:size])
+        elif not self.content.seekable():
+            self.content = self.content.read()
+            return self.read(size=size)
+
+        position = self.content.tell()
+        try:
+            return self.content.read(-1 if size is None else size)
+        finally:
+            self.content.seek(position)
+
+
+def _collect_source_files(source: T_ArchiveSource) -> List[_SourceFile]:
+    """Collects the files to write into a built archive.
+
+    Args:
+        source (T_ArchiveSource): Either a directory of loose files or an iterable of
+            (``filepath``, ``content``) where the content is bytes or a readable
+            binary stream
+
+    Raises:
+        NotADirectoryError: If the given source is a directory that doesn't exist
+        ValueError: If multiple files have the same (case-insensitive) filepath
+
+    Returns:
+        List[_SourceFile]: The files to write sorted by their normalized filepath
+    """
+    if isinstance(source, (str, PurePath)):
+        if not os.path.isdir(str(source)):
+            raise NotADirectoryError(f"no directory {str(source)!r} exists")
+
+        (source_dir, source) = (Path(source), [])
+        for (dirpath, _, filenames) in os.walk(str(source_dir)):
+            for filename in filenames:
+                filepath = Path(dirpath, filename)
+                source.append((filepath.relative_to(source_dir), filepath))
+
+    source_files = {}
+    for (filepath, content) in source:
+        filepath = PureWindowsPath(PurePath(filepath).as_posix())
+        key = BaseArchive._normalize_path(filepath)
+        if key in source_files:
+            raise ValueError(f"multiple files have the filepath {str(filepath)!r}")
+        source_files[key] = _SourceFile(filepath=filepath, content=content)
+    return [source_files[key] for key in sorted(source_files)]
+
+
+def _iter_mapped(
+    func: Callable, items: Iterable, workers: int = 1
+) -> Generator[object, None, None]:
+    """Maps a callable over some items using a pool of threads.
+
+    Note:
+        Results are yielded in the order of the given items and at most
+        ``2 * workers`` items are being processed (or waiting to be consumed) at once,
+        so the memory used doesn't depend on the number of items.
+
+    Args:
+        func (Callable): The callable to call with each item
+        items (Iterable): The items to map the callable over
+        workers (int, optional): Defaults to 1.
+            The number of threads to call the callable with
+
+    Yields:
+        object: The result of calling the callable with each item
+    """
+    if workers <= 1:
+        yield from map(func, items)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _iter_range(
+    read: Callable[[int, int], memoryview],
+    offset: int,
+    size: int,
+    buffer_size: int = STREAM_BUFFER_SIZE,
+) -> Generator[memoryview, None, None]:
+    """Iterates over a range of an archive's content in pieces.
+
+    Args:
+        read (Callable[[int, int], memoryview]): A callable that reads (``offset``,
+            ``size``) bytes of the archive's content
+        offset (int): The offset of the range
+        size (int): The size of the range
+        buffer_size (int, optional): Defaults to ``STREAM_BUFFER_SIZE``.
+            The size of the pieces to read
+
+    Yields:
+        memoryview: A piece of the range
+    """
+    for position in range(offset, offset + size, buffer_size):
+        yield read(position, min(buffer_size, offset + size - position))
+
+
+def _write_archive(filepath: str, write: Callable[[io.BufferedRandom], None]):
+    """Writes a built archive to a given filepath.
+
+    Note:
+        The archive is written to a temporary file which then replaces the given
+        filepath, so a failed build never leaves a partially written archive behind.
+
+    Args:
+        filepath (str): The filepath to write the archive to
+        write (Callable[[io.BufferedRandom], None]): A callable that writes the
+            archive to a given seekable stream
+    """
+    filepath = Path(filepath)
+    (handle, temp_filepath) = tempfile.mkstemp(
+        dir=str(filepath.parent), prefix=f".{filepath.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(handle, "w+b") as stream:
+            write(stream)
+        os.replace(temp_filepath, str(filepath))
+    except BaseException:
+        os.remove(temp_filepath)
+        raise
+
+
+@attr.s(slots=True)
+class _ChecksumRead(object):
+    """A read callable which checksums the reads of a file's stored data.
+
+    Reads within the file's stored range are checksummed as they are read, so that
+    extracting a file also computes the checksum of its stored data without reading
+    it again.
+    Gaps between reads (such as a skipped size prefix) and any unread remainder of
+    the range are read when needed.
+    """
+
+    read = attr.ib(type=Callable[[int, int], memoryview])
+    offset = attr.ib(type=int)
+    size = attr.ib(type=int)
+    position = attr.ib(type=int, init=False)
+    checksum = attr.ib(type=int, default=0, init=False)
+
+    def __attrs_post_init__(self):
+        """Initializes the non-init attributes.
+        """
+        self.position = self.offset
+
+    def __call__(self, offset: int, size: int) -> memoryview:
+        data = self.read(offset, size)
+        (end, read_end) = (self.offset + self.size, offset + size)
+        if self.position is None or read_end <= self.offset or offset >= end:
+            return data
+
+        if offset < self.position or read_end > end:
+            # NOTE: reads which overlap or leave the range can't be checksummed
+            self.position = None
+            return data
+        if offset > self.position:
+            self.checksum = zlib.crc32(
+                self.read(self.position, offset - self.position), self.checksum
+            )
+        self.checksum = zlib.crc32(data, self.checksum)
+        self.position = read_end
+        return data
+
+    def result(self) -> int:
+        """Gets the checksum of the stored data once the file has been read.
+
+        Returns:
+            int: The CRC32 of the file's stored data, None if the reads of the file
+            couldn't be checksummed
+        """
+        if self.position is None:
+            return None
+        end = self.offset + self.size
+        for piece in _iter_range(self.read, self.position, end - self.position):
+            self.checksum = zlib.crc32(piece, self.checksum)
+        self.position = end
+        return self.checksum
+
+
+@attr.s
+class BaseArchive(BaseFiletype, abc.ABC, Generic[T_BaseArchive]):
+    """The base class all Archives should subclass.
+    """
+
+    content = attr.ib(type=Union[bytes, mmap.mmap, io.BufferedReader], repr=False)
+    filepath = attr.ib(type=str, default=None)
+    cache_dir = attr.ib(type=str, default=None, repr=False)
+    container = attr.ib(type=Container, default=None, repr=False, init=False)
+    _view = attr.ib(type=memoryview, default=None, repr=False, init=False)
+    _records = attr.ib(type=List[ArchiveRecord], default=None, repr=False, init=False)
+    _index = attr.ib(
+        type=Dict[str, ArchiveRecord], default=None, repr=False, init=False
+    )
+    _lock = attr.ib(
+        type=threading.Lock,
+        default=attr.Factory(threading.Lock),
+        repr=False,
+        init=False,
+    )
+    _cache_key = attr.ib(type=T_IndexCacheKey, default=None, repr=False, init=False)
+
+    def __attrs_post_init__(self):
+        """Initializes the non-init attributes.
+        """
+        if self.filepath:
+            self.filepath = Path(self.filepath)
+
+        # NOTE: memory-mapped and file content is parsed as a stream so that only the
+        # bytes required by the archive struct are ever paged in (or read)
+        if isinstance(self.content, (bytes, mmap.mmap)):
+            self._view = memoryview(self.content)
+        if hasattr(self.content, "read"):
+            self.content.seek(0)
+            stream = self.content
+        else:
+            stream = io.BytesIO(self.content)
+
+        try:
+            if self.cache_dir is not None and self.filepath:
+                self._records = self._read_index_cache(stream)
+            if self._records is None:
+                self.container = self.archive_struct.parse_stream(stream)
+        except StreamError as exc:
+            raise ValueError(
+                (
+                    f"parsing {self.__class__.__name__} archive struct is not large "
+                    f"enough, {exc}"
+                )
+            )
+
+    @abc.abstractproperty
+    def archive_struct(self) -> Construct:
+        """The base archive structure to use for parsing the **full** archive.
+
+        Raises:
+            NotImplementedError: Subclasses must implement
+
+        Returns:
+            :class:`construct.Construct`: The archive structure
+        """
+        raise NotImplementedError
+
+    def __contains__(self, filepath: Union[str, PurePath]) -> bool:
+        return self.find_record(filepath) is not None
+
+    def __enter__(self) -> T_BaseArchive:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @classmethod
+    def parse(
+        cls, content: Union[bytes, mmap.mmap], filepath: str = None
+    ) -> T_BaseArchive:
+        """Create a :class:`BaseArchive` from a byte array.
+
+        Args:
+            content (Union[bytes, mmap.mmap]): The byte content of the archive
+            filepath (str, optional): Defaults to None.
+                Sets the filepath attribute for user's reference
+
+        Raises:
+            ValueError: If the given content is not of bytes
+
+        Returns:
+            :class:`BaseArchive`: An archive instance
+        """
+        if not isinstance(content, (bytes, mmap.mmap)):
+            raise ValueError(
+                f"given content must be of bytes, recieved {type(content)!r}"
+            )
+
+        return cls(content, filepath=filepath)
+
+    @classmethod
+    def parse_file(
+        cls, filepath: str, backend: str = "memory", cache_dir: str = None
+    ) -> T_BaseArchive:
+        """Create a :class:`BaseArchive` from a given filepath.
+
+        Args:
+            filepath (str): The filepath to read from
+            backend (str, optional): Defaults to "memory".
+                How the archive content is accessed, one of ``memory`` (the full
+                archive is read into bytes), ``mmap`` (the archive is memory-mapped
+                as read-only and pages are only loaded when they are sliced) or
+                ``file`` (only the archive's header and records are read, the file
+                handle is kept open and file data is read only when requested)
+            cache_dir (str, optional): Defaults to None.
+                The directory to keep the archive's index cache in, when the cache is
+                valid for the archive (same size, modification time and header) the
+                archive's records are read from the cache instead of being parsed
+
+        Raises:
+            FileNotFoundError: If the given filepath does not exist
+            ValueError: If the given backend is not supported
+
+        Returns:
+            :class:`BaseArchive`: An archive instance
+
+        Example:
+            >>> FILEPATH = ""  # absolute path to BSA/BTDX archive
+            >>> with BTDXArchive.parse_file(FILEPATH, backend="mmap") as archive:
+            ...     for archive_file in archive.iter_files():
+            ...         print(archive_file.filepath)
+        """
+        if backend not in ARCHIVE_BACKENDS:
+            raise ValueError(
+                f"backend must be one of {ARCHIVE_BACKENDS!r}, recieved {backend!r}"
+            )
+
+        if not os.path.isfile(filepath):
+            raise FileNotFoundError(f"no such file {filepath!r} exists")
+
+        if backend == "memory":
+            with open(filepath, "rb") as stream:
+                return cls(stream.read(), filepath=filepath, cache_dir=cache_dir)
+
+        if backend == "file":
+            stream = open(filepath, "rb")
+            try:
+                return cls(stream, filepath=filepath, cache_dir=cache_dir)
+            except Exception:
+                stream.close()
+                raise
+
+        with open(filepath, "rb") as stream:
+            content = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(content, filepath=filepath, cache_dir=cache_dir)
+
+    def close(self):
+        """Releases the resources held by the archive's content.
+
+        Note:
+            This is only required for memory-mapped and file archives, but is safe to
+            call for any archive.
+            Any data sliced from the archive content must be released before the
+            archive is closed.
+        """
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if isinstance(self.content, (mmap.mmap, io.IOBase)) and not self.content.closed:
+            self.content.close()
+
+    def _read(self, offset: int, size: int = None) -> memoryview:
+        """Reads a slice of the archive's content.
+
+        Args:
+            offset (int): The offset to start reading from
+            size (int, optional): Defaults to None.
+                The number of bytes to read, reads to the end of the content if None
+
+        Returns:
+            memoryview: A view of the requested slice of content
+        """
+        if self._view is not None:
+            if size is None:
+                return self._view[offset:]
+            return self._view[offset : (offset + size)]
+
+        if size is None:
+            size = os.fstat(self.content.fileno()).st_size - offset
+        # NOTE: positional reads don't share the handle's position, so reading from
+        # multiple threads is safe; seeking requires holding the lock
+        if hasattr(os, "pread"):
+            return memoryview(os.pread(self.content.fileno(), size, offset))
+        with self._lock:
+            self.content.seek(offset)
+            return memoryview(self.content.read(size))
+
+    @property
+    def records(self) -> List[ArchiveRecord]:
+        """The records of all files in the archive (built on first access).
+
+        Note:
+            If the archive has a ``cache_dir`` the built records are written to the
+            archive's index cache.
+
+        Returns:
+            List[ArchiveRecord]: The records of all files in the archive
+        """
+        if self._records is None:
+            self._records = list(self.iter_records())
+            if self._cache_key is not None:
+                self._write_index_cache()
+        return self._records
+
+    def _read_index_cache(self, stream: io.IOBase) -> List[ArchiveRecord]:
+        """Reads the archive's records from its index cache.
+
+        Only the archive's header is parsed (as ``container.header``) if the index
+        cache is valid.
+
+        Args:
+            stream (io.IOBase): The stream of the archive's content
+
+        Returns:
+            List[ArchiveRecord]: The records of the archive, None if the index cache
+            doesn't exist or is not valid
+        """
+        header_content = stream.read(self.header_struct.sizeof())
+        stream.seek(0)
+        # NOTE: record containers may depend on the archive's header to be unpacked
+        self.container = Container(header=self.header_struct.parse(header_content))
+        self._cache_key = _get_index_cache_key(self.filepath, header_content)
+        return _load_index_cache(
+            _get_index_cache_filepath(
+                self.cache_dir, self.__class__.__name__, self.filepath
+            ),
+            self._cache_key,
+            self._unpack_record_container,
+        )
+
+    def _write_index_cache(self):
+        """Writes the archive's records to its index cache.
+
+        Note:
+            The index cache is only an optimization, failing to write it is ignored.
+        """
+        try:
+            _dump_index_cache(
+                _get_index_cache_filepath(
+                    self.cache_dir, self.__class__.__name__, self.filepath
+                ),
+                self._cache_key,
+                self._records,
+                self._pack_record_container,
+            )
+        except OSError:
+            pass
+
+    def _pack_record_container(self, container: Container) -> bytes:
+        """Packs the container of a record for the index cache.
+
+        Args:
+            container (Container): The container of a record
+
+        Raises:
+            NotImplementedError: Subclasses must implement to support index caches
+
+        Returns:
+            bytes: The packed container
+        """
+        raise NotImplementedError
+
+    def _unpack_record_container(self, content: memoryview) -> Container:
+        """Unpacks the container of a record from the index cache.
+
+        Args:
+            content (memoryview): The packed container
+
+        Raises:
+            NotImplementedError: Subclasses must implement to support index caches
+
+        Returns:
+            Container: The container of a record
+        """
+        raise NotImplementedError
+
+    @property
+    def index(self) -> Dict[str, ArchiveRecord]:
+        """The case-insensitive filepath to record index (built on first access).
+
+        Returns:
+            Dict[str, ArchiveRecord]: A dictionary of normalized filepaths to records
+        """
+        if self._index is None:
+            self._index = {
+                self._normalize_path(record.filepath): record
+                for record in self.records
+            }
+        return self._index
+
+    def index_table(self) -> Tuple["numpy.ndarray", List[str]]:
+        """Builds a columnar listing of the files in the archive.
+
+        The listing is a structured array with the columns of ``INDEX_TABLE_DTYPE``
+        and a parallel table of filepaths indexed by its ``name_id`` column.
+        Where possible the columns are decoded directly from the archive's raw file
+        records without building any :class:`ArchiveRecord`.
+
+        Note:
+            Requires `numpy <https://numpy.org/>`_
+            (``pip install bethesda-structs[numpy]``).
+            The ``unpacked_size`` of files which store their size with their data
+            (compressed BSA files) is ``0``, use :func:`~BaseArchive.record_size` to
+            resolve it.
+            The table lists every file of the archive's file table, including DX10
+            textures with unsupported formats which have no record (and an
+            ``unpacked_size`` of ``0``).
+
+        Raises:
+            ImportError: If numpy is not installed
+
+        Returns:
+            Tuple[numpy.ndarray, List[str]]: A tuple of the structured array and its
+            table of filepaths
+
+        Example:
+            >>> FILEPATH = ""  # absolute path to BSA/BTDX archive
+            >>> archive = bethesda_structs.archive.get_archive(FILEPATH)
+            >>> (table, filepaths) = archive.index_table()
+            >>> filepaths[table[table["packed_size"].argmax()]["name_id"]]
+            'textures\\foo.dds'
+        """
+        if numpy is None:
+            raise ImportError(
+                "building index tables requires numpy, "
+                "install with `pip install bethesda-structs[numpy]`"
+            )
+        return self._build_index_table()
+
+    def _build_index_table(self) -> Tuple["numpy.ndarray", List[str]]:
+        """Builds the index table of the archive from its records.
+
+        Note:
+            Subclasses should override this to decode the table from the archive's
+            raw file records, the hash columns are left as ``0``.
+
+        Returns:
+            Tuple[numpy.ndarray, List[str]]: A tuple of the structured array and its
+            table of filepaths
+        """
+        return self._tabulate_records(self.records)
+
+    @staticmethod
+    def _tabulate_records(
+        records: List[ArchiveRecord],
+    ) -> Tuple["numpy.ndarray", List[str]]:
+        """Builds an index table from some records.
+
+        Note:
+            The hash columns are left as ``0``.
+
+        Args:
+            records (List[ArchiveRecord]): The records to build the table from
+
+        Returns:
+            Tuple[numpy.ndarray, List[str]]: A tuple of the structured array and its
+            table of filepaths
+        """
+        table = numpy.zeros(len(records), dtype=INDEX_TABLE_DTYPE)
+        table["offset"] = [record.offset for record in records]
+        table["packed_size"] = [record.packed_size for record in records]
+        table["unpacked_size"] = [record.unpacked_size or 0 for record in records]
+        table["compressed"] = [bool(record.compression) for record in records]
+        table["name_id"] = numpy.arange(len(records))
+        return (table, [str(record.filepath) for record in records])
+
+    @staticmethod
+    def _normalize_path(filepath: Union[str, PurePath]) -> str:
+        """Normalizes a filepath for use as a key in the archive's index.
+
+        Args:
+            filepath (Union[str, PurePath]): The filepath to normalize
+
+        Returns:
+            str: The normalized filepath
+        """
+        return str(filepath).replace("/", "\\").strip("\\").lower()
+
+    @abc.abstractmethod
+    def iter_records(self) -> Generator[ArchiveRecord, None, None]:
+        """Iterates over the records of the files in the archive.
+
+        Yields:
+            ArchiveRecord: An archive record
+
+        Raises:
+            NotImplementedError: Subclasses must implement
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def read_record(
+        self, record: ArchiveRecord, read: Callable[[int, int], memoryview] = None
+    ) -> ArchiveFile:
+        """Reads the file referenced by a given record.
+
+        Args:
+            record (ArchiveRecord): The record to read
+            read (Callable[[int, int], memoryview], optional): Defaults to None.
+                A callable that reads (``offset``, ``size``) bytes of the archive's
+                content, uses the archive's content if None
+
+        Raises:
+            NotImplementedError: Subclasses must implement
+
+        Returns:
+            ArchiveFile: The archive file
+        """
+        raise NotImplementedError
+
+    def find_record(self, filepath: Union[str, PurePath]) -> ArchiveRecord:
+        """Finds the record of a single file in the archive by its filepath.
+
+        Args:
+            filepath (Union[str, PurePath]): The case-insensitive relative filepath
+
+        Returns:
+            ArchiveRecord: The archive record, None if the filepath doesn't exist
+        """
+        return self.index.get(self._normalize_path(filepath))
+
+    def record_size(self, record: ArchiveRecord) -> int:
+        """Gets the size of the file referenced by a given record without reading it.
+
+        Args:
+            record (ArchiveRecord): The record to get the size of
+
+        Returns:
+            int: The size of the file's data once read
+        """
+        return record.unpacked_size
+
+    def _read_record_sizes(
+        self, records: Iterable[ArchiveRecord]
+    ) -> List[ArchiveRecord]:
+        """Reads the sizes of the files of the given records.
+
+        Note:
+            Sizes may be read from the content (see :func:`~BaseArchive.record_size`),
+            so they are read in the order of the records' offsets.
+
+        Args:
+            records (Iterable[ArchiveRecord]): The records to read the sizes of
+
+        Returns:
+            List[ArchiveRecord]: The records sorted by their offsets, with their
+            ``unpacked_size`` set
+        """
+        records = sorted(records, key=lambda record: record.offset)
+        for record in records:
+            record.unpacked_size = self.record_size(record)
+        return records
+
+    def _stored_range(self, record: ArchiveRecord) -> Tuple[int, int]:
+        """Gets the range of the archive's content that is the file's data as-is.
+
+        Args:
+            record (ArchiveRecord): The record of the file
 
+        Returns:
+            Tuple[int, int]: The (``offset``, ``size``) of the file's data, None if
+            the file's data is not stored as-is
+        """
+        return None
 
-@attr.s
-class ArchiveFile(object):
-    """A generic archive file object that can be used for extracting.
+    def _packed_range(self, record: ArchiveRecord) -> Tuple[int, int]:
+        """Gets the range of the archive's content that the file's data is read from.
 
-    The purpose of this object is to provide some generic format for
-    :func:`~BaseArchive.iter_files` to yield so that the :func:`~BaseArchive.extract`
-    method can be abstracted away from the archive subclasses.
-    """
+        Note:
+            Files whose data is read from a single range are identical if their ranges
+            are identical (and they are stored with the same compression).
 
-    filepath = attr.ib(type=str, converter=Path)
-    """The relative filepath of the archived file.
+        Args:
+            record (ArchiveRecord): The record of the file
 
-    Returns:
-        str: The relative filepath of the archived file
-    """
+        Returns:
+            Tuple[int, int]: The (``offset``, ``size``) of the file's stored data, None
+            if the file's data is not read from a single range of the content
+        """
+        return None
 
-    data = attr.ib(type=bytes, repr=False)
-    """The raw data of the archived file.
+    def _iter_packed(
+        self, record: ArchiveRecord, buffer_size: int = STREAM_BUFFER_SIZE
+    ) -> Generator[bytes, None, None]:
+        """Iterates over the stored (maybe compressed) data of a file in pieces.
 
-    Returns:
-        bytes: The raw data of the archived file
-    """
+        Note:
+            Files which are identical once stored have identical stored data (the
+            data is never decompressed).
+            Subclasses should override this for files which are not read from a
+            single range of the content, by default their data is decompressed.
 
-    @property
-    def size(self) -> int:
-        """The size of the raw data.
+        Args:
+            record (ArchiveRecord): The record of the file
+            buffer_size (int, optional): Defaults to ``STREAM_BUFFER_SIZE``.
+                The size of the pieces to read
+
+        Yields:
+            bytes: A piece of the file's stored data
+        """
+        packed_range = self._packed_range(record)
+        if packed_range is None:
+            yield from self.iter_record_data(record, buffer_size=buffer_size)
+            return
+
+        yield from _iter_range(self._read, *packed_range, buffer_size=buffer_size)
+
+    @staticmethod
+    def _compress(data: bytes, compression: str) -> bytes:
+        """Compresses some data for storing in a built archive.
+
+        Args:
+            data (bytes): The data to compress
+            compression (str): The compression to use, either ``zlib`` or ``lz4``
 
         Returns:
-            int: The size of the raw data
+            bytes: The compressed data
         """
-        return len(self.data)
+        if compression == "zlib":
+            return zlib.compress(data)
+        return lz4.frame.compress(data)
 
+    @staticmethod
+    def _decompress(data: bytes, compression: str, size: int = None) -> bytes:
+        """Decompresses some stored data all at once.
 
-@attr.s
-class BaseArchive(BaseFiletype, abc.ABC, Generic[T_BaseArchive]):
-    """The base class all Archives should subclass.
-    """
+        Args:
+            data (bytes): The stored data
+            compression (str): The compression of the stored data, either ``zlib``,
+                ``lz4`` or None
+            size (int, optional): Defaults to None.
+                The expected size of the decompressed data, used to size the output
+                buffer up front
 
-    content = attr.ib(type=bytes, repr=False)
-    filepath = attr.ib(type=str, default=None)
-    container = attr.ib(type=Container, default=None, repr=False, init=False)
+        Returns:
+            bytes: The decompressed data
+        """
+        if compression == "zlib":
+            if size is None:
+                return zlib.decompress(data)
+            return zlib.decompress(data, bufsize=size)
+        elif compression == "lz4":
+            return lz4.frame.decompress(data)
+        return bytes(data)
 
-    def __attrs_post_init__(self):
-        """Initializes the non-init attributes.
+    @staticmethod
+    def _iter_limited(
+        decompressor: Union["zlib._Decompress", lz4.frame.LZ4FrameDecompressor],
+        compression: str,
+        data: bytes,
+        buffer_size: int,
+    ) -> Generator[bytes, None, None]:
+        """Iterates over the decompressed pieces of some compressed data.
+
+        Note:
+            Limiting the output of the decompressor keeps the pieces of highly
+            compressed data bounded.
+
+        Args:
+            decompressor (Union[zlib._Decompress, LZ4FrameDecompressor]): The
+                decompressor of the data
+            compression (str): The compression of the data, either ``zlib`` or ``lz4``
+            data (bytes): The compressed data
+            buffer_size (int): The maximum size of the decompressed pieces
+
+        Yields:
+            bytes: A decompressed piece of the data
         """
-        if self.filepath:
-            self.filepath = Path(self.filepath)
+        if compression == "zlib":
+            while data:
+                piece = decompressor.decompress(data, buffer_size)
+                if piece:
+                    yield piece
+                data = decompressor.unconsumed_tail
+            return
 
-        try:
-            self.container = self.archive_struct.parse(self.content)
-        except StreamError as exc:
-            raise ValueError(
-                (
-                    f"parsing {self.__class__.__name__} archive struct is not large "
-                    f"enough, {exc}"
+        # NOTE: the lz4 decompressor keeps the data it didn't consume, so it's drained
+        # until it needs more input
+        while True:
+            piece = decompressor.decompress(data, max_length=buffer_size)
+            if piece:
+                yield piece
+            if decompressor.eof or decompressor.needs_input:
+                return
+            data = b""
+
+    def _iter_decompressed(
+        self,
+        offset: int,
+        size: int,
+        compression: str,
+        read: Callable[[int, int], memoryview] = None,
+        buffer_size: int = STREAM_BUFFER_SIZE,
+    ) -> Generator[bytes, None, None]:
+        """Iterates over the decompressed data of a range of the archive's content.
+
+        The stored data is read and decompressed in pieces of at most
+        ``buffer_size`` bytes so the memory used doesn't depend on the data's size.
+
+        Args:
+            offset (int): The offset of the stored data
+            size (int): The size of the stored data
+            compression (str): The compression of the stored data, either ``zlib``,
+                ``lz4`` or None
+            read (Callable[[int, int], memoryview], optional): Defaults to None.
+                A callable that reads (``offset``, ``size``) bytes of the archive's
+                content, uses the archive's content if None
+            buffer_size (int, optional): Defaults to ``STREAM_BUFFER_SIZE``.
+                The size of the pieces to read and decompress
+
+        Yields:
+            bytes: A decompressed piece of the data
+        """
+        read = read or self._read
+        decompressor = None
+        if compression == "zlib":
+            decompressor = zlib.decompressobj()
+        elif compression == "lz4":
+            decompressor = lz4.frame.LZ4FrameDecompressor()
+
+        for data in _iter_range(read, offset, size, buffer_size=buffer_size):
+            if decompressor is None:
+                yield data
+            else:
+                yield from self._iter_limited(
+                    decompressor, compression, data, buffer_size
                 )
-            )
 
-    @abc.abstractproperty
-    def archive_struct(self) -> Construct:
-        """The base archive structure to use for parsing the **full** archive.
+        if compression == "zlib":
+            piece = decompressor.flush()
+            if piece:
+                yield piece
 
-        Raises:
-            NotImplementedError: Subclasses must implement
+    def iter_record_data(
+        self,
+        record: ArchiveRecord,
+        read: Callable[[int, int], memoryview] = None,
+        buffer_size: int = STREAM_BUFFER_SIZE,
+    ) -> Generator[bytes, None, None]:
+        """Iterates over the data of the file referenced by a given record in pieces.
+
+        Note:
+            Subclasses should override this to decompress the file's data
+            incrementally, by default the full file is read with
+            :func:`~BaseArchive.read_record`.
+
+        Args:
+            record (ArchiveRecord): The record to read
+            read (Callable[[int, int], memoryview], optional): Defaults to None.
+                A callable that reads (``offset``, ``size``) bytes of the archive's
+                content, uses the archive's content if None
+            buffer_size (int, optional): Defaults to ``STREAM_BUFFER_SIZE``.
+                The size of the pieces to read and decompress
+
+        Yields:
+            bytes: A piece of the file's data
+        """
+        yield self.read_record(record, read=read).data
+
+    def write_record(
+        self,
+        record: ArchiveRecord,
+        stream: io.RawIOBase,
+        read: Callable[[int, int], memoryview] = None,
+        buffer_size: int = STREAM_BUFFER_SIZE,
+    ) -> int:
+        """Writes the data of the file referenced by a record to a writable stream.
+
+        The data is decompressed and written in pieces so that large files are never
+        held in memory at once.
+
+        Args:
+            record (ArchiveRecord): The record to write
+            stream (io.RawIOBase): The writable stream to write to
+            read (Callable[[int, int], memoryview], optional): Defaults to None.
+                A callable that reads (``offset``, ``size``) bytes of the archive's
+                content, uses the archive's content if None
+            buffer_size (int, optional): Defaults to ``STREAM_BUFFER_SIZE``.
+                The size of the pieces to read and decompress
 
         Returns:
-            :class:`construct.Construct`: The archive structure
+            int: The number of bytes written
+
+        Example:
+            >>> FILEPATH = ""  # absolute path to BSA/BTDX archive
+            >>> archive = bethesda_structs.archive.get_archive(FILEPATH)
+            >>> with open("/home/username/Downloads/foo.xwm", "wb") as stream:
+            ...     archive.write_record(archive.find_record("sound\\foo.xwm"), stream)
         """
-        raise NotImplementedError
+        written_size = 0
+        for piece in self.iter_record_data(
+            record, read=read, buffer_size=buffer_size
+        ):
+            # NOTE: raw streams may write less than they were given
+            view = memoryview(piece)
+            while view:
+                written = stream.write(view)
+                written = len(view) if written is None else written
+                view = view[written:]
+                written_size += written
+        return written_size
 
-    @classmethod
-    def parse(cls, content: bytes, filepath: str = None) -> T_BaseArchive:
-        """Create a :class:`BaseArchive` from a byte array.
+    def iter_files(
+        self, filter: Callable[[ArchiveRecord], bool] = None
+    ) -> Generator[ArchiveFile, None, None]:
+        """Iterates over the available files in the archive.
 
         Args:
-            content (bytes): The byte content of the archive
-            filepath (str, optional): Defaults to None.
-                Sets the filepath attribute for user's reference
+            filter (Callable[[ArchiveRecord], bool], optional): Defaults to None.
+                A callable that returns True if the file of a given record should be
+                read (see :func:`record_filter`), files that are filtered out are
+                never read
+
+        Note:
+            The yielded files are instances of :class:`LazyArchiveFile`, files are
+            only read when their ``data`` is accessed.
+            Records given to the filter have their ``unpacked_size`` read (see
+            :func:`~BaseArchive.record_size`) so that it can be filtered on.
+
+        Yields:
+            ArchiveFile: An archive file
+        """
+        if filter is not None:
+            self._read_record_sizes(self.records)
+        for record in self.records:
+            if filter is None or filter(record):
+                yield LazyArchiveFile(
+                    filepath=record.filepath, archive=self, record=record
+                )
+
+    def get(self, filepath: Union[str, PurePath]) -> ArchiveFile:
+        """Gets a single file from the archive by its filepath.
+
+        Args:
+            filepath (Union[str, PurePath]): The case-insensitive relative filepath
+
+        Returns:
+            ArchiveFile: The archive file, None if the filepath doesn't exist
+
+        Example:
+            >>> FILEPATH = ""  # absolute path to BSA/BTDX archive
+            >>> archive = bethesda_structs.archive.get_archive(FILEPATH)
+            >>> archive.get("meshes\\foo.nif")
+            ArchiveFile(filepath=PosixPath('meshes/foo.nif'))
+        """
+        record = self.find_record(filepath)
+        if record is None:
+            return None
+        return self.read_record(record)
+
+    def open(self, filepath: Union[str, PurePath]) -> io.BufferedIOBase:
+        """Opens a single file from the archive as a readable stream.
+
+        Args:
+            filepath (Union[str, PurePath]): The case-insensitive relative filepath
 
         Raises:
-            ValueError: If the given content is not of bytes
+            FileNotFoundError: If the given filepath does not exist in the archive
 
         Returns:
-            :class:`BaseArchive`: An archive instance
+            io.BufferedIOBase: A readable stream of the file's data
+
+        Example:
+            >>> FILEPATH = ""  # absolute path to BSA/BTDX archive
+            >>> archive = bethesda_structs.archive.get_archive(FILEPATH)
+            >>> with archive.open("textures\\foo.dds") as stream:
+            ...     stream.read(4)
+            b'DDS '
         """
-        if not isinstance(content, bytes):
-            raise ValueError(
-                f"given content must be of bytes, recieved {type(content)!r}"
+        record = self.find_record(filepath)
+        if record is None:
+            raise FileNotFoundError(f"no such file {filepath!r} exists in archive")
+        return io.BufferedReader(ArchiveFileReader(self, record))
+
+    def _plan_blocks(
+        self, records: List[ArchiveRecord], block_size: int = EXTRACT_BLOCK_SIZE
+    ) -> List[Tuple[int, int, List[ArchiveRecord]]]:
+        """Plans the blocks of content to read for extracting the given records.
+
+        Records are sorted by the offset of their stored data and records whose data
+        is contiguous (or nearly contiguous) are coalesced into a single block so that
+        the archive's content is read sequentially in large reads.
+
+        Args:
+            records (List[ArchiveRecord]): The records to plan blocks for
+            block_size (int, optional): Defaults to ``EXTRACT_BLOCK_SIZE``.
+                The maximum size of a block (unless a single record is larger)
+
+        Returns:
+            List[Tuple[int, int, List[ArchiveRecord]]]: A list of blocks of
+            (``offset``, ``size``, ``records``) in offset order
+        """
+        blocks = []
+        (block_offset, block_end, block_records) = (0, 0, [])
+        for record in sorted(records, key=lambda record: record.offset):
+            record_end = record.offset + record.packed_size
+            if block_records and (
+                record.offset > (block_end + EXTRACT_BLOCK_GAP)
+                or (max(block_end, record_end) - block_offset) > block_size
+            ):
+                blocks.append((block_offset, block_end - block_offset, block_records))
+                block_records = []
+
+            if not block_records:
+                (block_offset, block_end) = (record.offset, record_end)
+            block_end = max(block_end, record_end)
+            block_records.append(record)
+
+        if block_records:
+            blocks.append((block_offset, block_end - block_offset, block_records))
+        return blocks
+
+    def _extract_block(
+        self,
+        to_dir: Path,
+        block: Tuple[int, int, List[ArchiveRecord]],
+        progress: Callable[[int, str, int], None],
+        checksum: bool = False,
+    ):
+        """Reads a planned block of content and extracts the records within it.
+
+        Args:
+            to_dir (Path): The directory to extract the files to
+            block (Tuple[int, int, List[ArchiveRecord]]): The planned block of
+                (``offset``, ``size``, ``records``)
+            progress (Callable[[int, str, int], None]): A callable that should expect
+                (``written_size``, ``current_filepath``) and the ``checksum`` of the
+                file's stored data once it is written as arguments
+            checksum (bool, optional): Defaults to False.
+                True if the checksums of the files' stored data should be computed
+                (see :func:`~BaseArchive._extract_record`)
+        """
+        (block_offset, block_size, records) = block
+        if block_size > EXTRACT_BLOCK_SIZE:
+            # NOTE: blocks of single large records are streamed rather than read whole
+            for record in records:
+                self._extract_record(to_dir, record, progress, checksum=checksum)
+            return
+
+        block_content = self._read(block_offset, block_size)
+
+        def read(offset: int, size: int) -> memoryview:
+            start = offset - block_offset
+            # records whose data isn't stored contiguously may fall outside the block
+            if start < 0 or (start + size) > block_size:
+                return self._read(offset, size)
+            return block_content[start : (start + size)]
+
+        for record in records:
+            self._extract_record(
+                to_dir, record, progress, read=read, checksum=checksum
             )
 
-        return cls(content, filepath=filepath)
+    def _extract_record(
+        self,
+        to_dir: Path,
+        record: ArchiveRecord,
+        progress: Callable[[int, str, int], None],
+        read: Callable[[int, int], memoryview] = None,
+        checksum: bool = False,
+    ):
+        """Reads and writes the file referenced by a record to the given directory.
 
-    @abc.abstractmethod
-    def iter_files(self) -> Generator[ArchiveFile, None, None]:
-        """Iterates over the available files in the archive.
+        Args:
+            to_dir (Path): The directory to extract the file to
+            record (ArchiveRecord): The record of the file to extract
+            progress (Callable[[int, str, int], None]): A callable that should expect
+                (``written_size``, ``current_filepath``) and the ``checksum`` of the
+                file's stored data once it is written as arguments
+            read (Callable[[int, int], memoryview], optional): Defaults to None.
+                A callable that reads (``offset``, ``size``) bytes of the archive's
+                content, uses the archive's content if None
+            checksum (bool, optional): Defaults to False.
+                True if the checksum of the file's stored data should be computed
+                (see :func:`~BaseArchive._checksum_record`) from the data read while
+                extracting the file, otherwise the checksum is None
+        """
+        to_path = to_dir.joinpath(Path(record.filepath))
+        progress(0, to_path.as_posix())
 
-        Yields:
-            ArchiveFile: An archive file
+        checksum_read = None
+        packed_range = self._packed_range(record) if checksum else None
+        if packed_range is not None:
+            read = checksum_read = _ChecksumRead(read or self._read, *packed_range)
+
+        # NOTE: multiple threads may be creating the same parent directory
+        to_path.parent.mkdir(parents=True, exist_ok=True)
+        with to_path.open("wb") as stream:
+            written_size = self.write_record(record, stream, read=read)
+
+        progress(
+            written_size,
+            to_path.as_posix(),
+            checksum_read.result() if checksum_read is not None else None,
+        )
+
+    def _shard_records(
+        self, records: List[ArchiveRecord], count: int
+    ) -> List[List[ArchiveRecord]]:
+        """Splits the given records into offset-contiguous shards.
+
+        Args:
+            records (List[ArchiveRecord]): The records to split
+            count (int): The maximum number of shards to split the records into
+
+        Returns:
+            List[List[ArchiveRecord]]: A list of shards of records (in offset order),
+            each containing roughly the same amount of stored data
+        """
+        records = sorted(records, key=lambda record: record.offset)
+        shard_size = max(1, sum(record.packed_size for record in records) / count)
+
+        shards = [[]]
+        current_size = 0
+        for record in records:
+            if current_size >= shard_size * len(shards):
+                shards.append([])
+            shards[-1].append(record)
+            current_size += record.packed_size
+        return shards
+
+    def _extract_processes(
+        self,
+        to_dir: Path,
+        progress: Callable[[int, str, int], None],
+        workers: int,
+        records: List[ArchiveRecord],
+        checksum: bool = False,
+    ):
+        """Extracts the archive using a pool of processes.
+
+        Each process reopens the archive (memory-mapped) from its filepath and
+        extracts a shard of offset-contiguous records.
+        Progress from the processes is reported back through a managed queue.
+
+        Args:
+            to_dir (Path): The directory to extract the content to
+            progress (Callable[[int, str, int], None]): A callable that should expect
+                (``written_size``, ``current_filepath``) and the ``checksum`` of the
+                file's stored data once it is written as arguments
+            workers (int): The number of processes to extract with
+            records (List[ArchiveRecord]): The records to extract
+            checksum (bool, optional): Defaults to False.
+                True if the checksums of the files' stored data should be computed
 
         Raises:
-            NotImplementedError: Subclasses must implement
+            ValueError: If the archive wasn't parsed from a filepath
         """
-        raise NotImplementedError
+        if not self.filepath:
+            raise ValueError(
+                f"extracting with processes requires {self.__class__.__name__} to "
+                "have a filepath"
+            )
+
+        with multiprocessing.Manager() as manager, ProcessPoolExecutor(
+            max_workers=workers
+        ) as executor:
+            progress_queue = manager.Queue()
+            pending = {
+                executor.submit(
+                    _extract_shard,
+                    self.__class__,
+                    str(self.filepath),
+                    to_dir,
+                    [_detach_record(record) for record in shard],
+                    progress_queue,
+                    checksum,
+                )
+                for shard in self._shard_records(records, workers)
+            }
+
+            while pending:
+                (done, pending) = wait(pending, timeout=0.1)
+                while True:
+                    try:
+                        progress(*progress_queue.get_nowait())
+                    except queue.Empty:
+                        break
+                # NOTE: raises exceptions from the worker processes
+                for future in done:
+                    future.result()
+
+    def _get_extract_manifest_filepath(self, to_dir: Path) -> Path:
+        """Gets the filepath of the manifest of incremental extractions to a directory.
+
+        Args:
+            to_dir (Path): The directory the archive is extracted to
+
+        Returns:
+            Path: The filepath of the archive's manifest in the directory
+        """
+        archive_name = (
+            Path(self.filepath).name if self.filepath else self.__class__.__name__
+        )
+        return to_dir.joinpath(f".{archive_name}.manifest.json")
+
+    def _get_extract_key(self) -> T_IndexCacheKey:
+        """Gets the key identifying the archive's current content on disk.
+
+        Returns:
+            T_IndexCacheKey: A tuple of the archive's (``size``, ``mtime_ns``,
+            ``header_checksum``), None if the archive has no filepath
+        """
+        if not self.filepath:
+            return None
+        return _get_index_cache_key(
+            self.filepath, self._read(0, self.header_struct.sizeof())
+        )
+
+    def _checksum_record(self, record: ArchiveRecord) -> int:
+        """Gets the checksum of the stored (maybe compressed) data of a record.
+
+        Args:
+            record (ArchiveRecord): The record of the file
+
+        Returns:
+            int: The CRC32 of the file's stored data, None if the file's data is not
+            read from a single range of the archive's content
+        """
+        packed_range = self._packed_range(record)
+        if packed_range is None:
+            return None
+
+        checksum = 0
+        for piece in _iter_range(self._read, *packed_range):
+            checksum = zlib.crc32(piece, checksum)
+        return checksum
+
+    def _plan_incremental(
+        self,
+        to_dir: Path,
+        records: List[ArchiveRecord],
+        extracted: Dict[str, _ExtractedFile],
+        same_archive: bool,
+        workers: int = 1,
+    ) -> Tuple[List[ArchiveRecord], Dict[str, _ExtractedFile]]:
+        """Finds the records whose files are not up to date in the given directory.
+
+        A file is up to date if it still has the size and modification time it was
+        written with and its record still has the size and stored data it was
+        extracted from.
+        If the archive hasn't changed since the last extraction, a record's stored
+        data is unchanged if its offset and size are, otherwise the stored data is
+        read (but never decompressed) and compared by its checksum.
+
+        Args:
+            to_dir (Path): The directory the archive is extracted to
+            records (List[ArchiveRecord]): The records to extract
+            extracted (Dict[str, _ExtractedFile]): The previously extracted files
+            same_archive (bool): True if the archive hasn't changed since the files
+                were extracted
+            workers (int, optional): Defaults to 1.
+                The number of threads to checksum stored data with
+
+        Returns:
+            Tuple[List[ArchiveRecord], Dict[str, _ExtractedFile]]: A tuple of the
+            records to extract and the up to date files
+        """
+        (stale, unchanged, candidates) = ([], {}, [])
+        for record in self._read_record_sizes(records):
+            filepath = record.filepath.as_posix()
+            entry = extracted.get(filepath)
+            try:
+                stat = to_dir.joinpath(Path(record.filepath)).stat()
+            except OSError:
+                stat = None
+
+            size = record.unpacked_size
+            if (
+                entry is None
+                or stat is None
+                or (entry.size, entry.compression) != (size, record.compression)
+                or (stat.st_size, stat.st_mtime_ns) != (size, entry.mtime_ns)
+            ):
+                stale.append(record)
+            elif same_archive and (entry.offset, entry.packed_size) == (
+                record.offset,
+                record.packed_size,
+            ):
+                unchanged[filepath] = entry
+            else:
+                candidates.append((record, entry))
+
+        for ((record, entry), checksum) in zip(
+            candidates,
+            _iter_mapped(
+                lambda candidate: self._checksum_record(candidate[0]),
+                candidates,
+                workers,
+            ),
+        ):
+            if checksum is None or checksum != entry.checksum:
+                stale.append(record)
+                continue
+            entry.offset = record.offset
+            entry.packed_size = record.packed_size
+            unchanged[record.filepath.as_posix()] = entry
+        return (stale, unchanged)
+
+    def _record_extracted(
+        self,
+        to_dir: Path,
+        records: List[ArchiveRecord],
+        unchanged: Dict[str, _ExtractedFile],
+        checksums: Dict[str, int],
+    ) -> Dict[str, _ExtractedFile]:
+        """Builds the manifest entries of the files after an incremental extraction.
+
+        Args:
+            to_dir (Path): The directory the archive was extracted to
+            records (List[ArchiveRecord]): The records that were extracted
+            unchanged (Dict[str, _ExtractedFile]): The files that were up to date
+            checksums (Dict[str, int]): The checksums of the extracted files' stored
+                data, computed while extracting them (by their extracted posix
+                filepaths)
+
+        Returns:
+            Dict[str, _ExtractedFile]: All extracted files by their relative posix
+            filepaths
+        """
+        extracted = dict(unchanged)
+        for record in records:
+            to_path = to_dir.joinpath(Path(record.filepath))
+            stat = to_path.stat()
+            extracted[record.filepath.as_posix()] = _ExtractedFile(
+                size=stat.st_size,
+                offset=record.offset,
+                packed_size=record.packed_size,
+                compression=record.compression,
+                checksum=checksums.get(to_path.as_posix()),
+                mtime_ns=stat.st_mtime_ns,
+            )
+        return extracted
 
     def extract(
-        self, to_dir: str, progress_hook: Callable[[int, int, str], None] = None
+        self,
+        to_dir: str,
+        progress_hook: Callable[[int, int, str], None] = None,
+        workers: int = 1,
+        executor: str = "thread",
+        include: T_RecordPattern = None,
+        exclude: T_RecordPattern = None,
+        predicate: Callable[[ArchiveRecord], bool] = None,
+        mode: str = "full",
     ):
         """Extracts the content of the `BaseArchive` to the given directory.
 
@@ -128,6 +2103,37 @@ class BaseArchive(BaseFiletype, abc.ABC, Generic[T_BaseArchive]):
             progress_hook (Callable[[int, int, str], None], optional): Defaults to None.
                 A progress hook that should expect (``current``, ``total``,
                 ``current_filepath``) as arguments
+            workers (int, optional): Defaults to 1.
+                The number of threads (or processes) to decompress and write files
+                with
+            executor (str, optional): Defaults to "thread".
+                The type of workers to extract with, one of ``thread`` or
+                ``process`` (requires the archive to have a ``filepath``)
+            include (T_RecordPattern, optional): Defaults to None.
+                Glob patterns or regular expressions of files to extract (see
+                :func:`record_filter`)
+            exclude (T_RecordPattern, optional): Defaults to None.
+                Glob patterns or regular expressions of files to not extract (see
+                :func:`record_filter`)
+            predicate (Callable[[ArchiveRecord], bool], optional): Defaults to None.
+                A callable that returns True if the file of a given record should be
+                extracted (see :func:`record_filter`)
+            mode (str, optional): Defaults to "full".
+                The extraction mode, one of ``full`` or ``incremental`` (skips files
+                which are already up to date in the directory)
+
+        Raises:
+            NotADirectoryError: If the given directory does not exist
+            ValueError: If the given executor or mode is not supported
+
+        Note:
+            Files are read, decompressed and written one at a time (per worker) so
+            only the files currently being extracted are ever held in memory.
+            Files are extracted in the order their data is stored in the archive,
+            reading contiguous data in large blocks (see ``EXTRACT_BLOCK_SIZE``).
+            Files which are filtered out are never read, though the records given
+            to the ``predicate`` have their ``unpacked_size`` read (see
+            :func:`~BaseArchive.record_size`) so that it can be filtered on.
 
         Example:
             >>> FILEPATH = ""  # absolute path to BSA/BTDX archive
@@ -160,27 +2166,234 @@ class BaseArchive(BaseFiletype, abc.ABC, Generic[T_BaseArchive]):
             The provided progress hook is simple and two-stage. It is called once
             before a file is being written and once after the same file is done
             being written.
+            When using multiple ``workers`` the progress hook is never called
+            concurrently and ``current`` is the total written by all workers.
+
+        Note:
+            Incremental extractions write a manifest of the extracted files into the
+            directory (``.<archive name>.manifest.json``).
+            A file is skipped (without being read) if it still has the size and
+            modification time it was written with and its record is unchanged.
+            If the archive itself changed since the last extraction, the stored data
+            of records is compared by its checksum instead, so only files whose
+            stored data changed are decompressed (DX10 textures, whose data is stored
+            in chunks, are always extracted again in this case).
+            Only the files extracted by the latest extraction are kept in the
+            manifest.
+
+        Example:
+            >>> FILEPATH = ""  # absolute path to BSA/BTDX archive
+            >>> archive = bethesda_structs.archive.get_archive(FILEPATH)
+            >>> archive.extract("/home/username/Downloads/out", mode="incremental")
+        """
+
+        filter_record = record_filter(
+            include=include, exclude=exclude, predicate=predicate
+        )
+        records = self.records
+        if predicate is not None:
+            records = self._read_record_sizes(records)
+        self._extract_records(
+            to_dir,
+            [record for record in records if filter_record(record)],
+            progress_hook=progress_hook,
+            workers=workers,
+            executor=executor,
+            mode=mode,
+        )
+
+    def _extract_records(
+        self,
+        to_dir: str,
+        records: List[ArchiveRecord],
+        progress_hook: Callable[[int, int, str], None] = None,
+        workers: int = 1,
+        executor: str = "thread",
+        mode: str = "full",
+    ):
+        """Extracts the given records to the given directory.
+
+        Args:
+            to_dir (str): The directory to extract the files to
+            records (List[ArchiveRecord]): The records to extract
+            progress_hook (Callable[[int, int, str], None], optional): Defaults to None.
+                A progress hook that should expect (``current``, ``total``,
+                ``current_filepath``) as arguments
+            workers (int, optional): Defaults to 1.
+                The number of threads (or processes) to extract with
+            executor (str, optional): Defaults to "thread".
+                The type of workers to extract with
+            mode (str, optional): Defaults to "full".
+                The extraction mode, one of ``full`` or ``incremental``
+
+        Raises:
+            NotADirectoryError: If the given directory does not exist
+            ValueError: If the given executor or mode is not supported
         """
 
         if not os.path.isdir(to_dir):
             raise NotADirectoryError(f"no directory {to_dir!r} exists")
-
+        if executor not in EXTRACT_EXECUTORS:
+            raise ValueError(
+                f"executor must be one of {EXTRACT_EXECUTORS!r}, recieved {executor!r}"
+            )
+        if mode not in EXTRACT_MODES:
+            raise ValueError(
+                f"mode must be one of {EXTRACT_MODES!r}, recieved {mode!r}"
+            )
         to_dir = Path(to_dir)
 
-        archive_files = list(self.iter_files())
-        total_size = sum(entry.size for entry in archive_files)
+        if mode == "full":
+            self._extract_with(to_dir, records, progress_hook, workers, executor)
+            return
+
+        checksums = {}
+        manifest_filepath = self._get_extract_manifest_filepath(to_dir)
+        (manifest_key, extracted) = _load_extract_manifest(manifest_filepath)
+        key = self._get_extract_key()
+        (records, unchanged) = self._plan_incremental(
+            to_dir,
+            records,
+            extracted,
+            key is not None and key == manifest_key,
+            workers=workers,
+        )
+        self._extract_with(
+            to_dir, records, progress_hook, workers, executor, checksums=checksums
+        )
+        _dump_extract_manifest(
+            manifest_filepath,
+            key,
+            self._record_extracted(to_dir, records, unchanged, checksums),
+        )
+
+    def _extract_with(
+        self,
+        to_dir: Path,
+        records: List[ArchiveRecord],
+        progress_hook: Callable[[int, int, str], None],
+        workers: int,
+        executor: str,
+        checksums: Dict[str, int] = None,
+    ):
+        """Extracts the given records to the given directory with some workers.
+
+        Args:
+            to_dir (Path): The directory to extract the files to
+            records (List[ArchiveRecord]): The records to extract
+            progress_hook (Callable[[int, int, str], None]): A progress hook that
+                should expect (``current``, ``total``, ``current_filepath``) as
+                arguments (maybe None)
+            workers (int): The number of threads (or processes) to extract with
+            executor (str): The type of workers to extract with
+            checksums (Dict[str, int], optional): Defaults to None.
+                A dictionary to store the checksums of the extracted files' stored
+                data in (by their extracted posix filepaths), checksums are only
+                computed if given
+        """
+
+        total_size = sum(
+            record.unpacked_size for record in self._read_record_sizes(records)
+        )
+        progress_lock = threading.Lock()
         current_size = 0
 
-        for entry in archive_files:
-            to_path = to_dir.joinpath(entry.filepath)
-            if callable(progress_hook):
-                progress_hook(current_size, total_size, to_path.as_posix())
+        def progress(written_size: int, filepath: str, checksum: int = None):
+            nonlocal current_size
+            with progress_lock:
+                current_size += written_size
+                if checksum is not None:
+                    checksums[filepath] = checksum
+                if callable(progress_hook):
+                    progress_hook(current_size, total_size, filepath)
+
+        checksum = checksums is not None
+        if executor == "process":
+            self._extract_processes(to_dir, progress, workers, records, checksum)
+            return
+
+        if workers <= 1:
+            for block in self._plan_blocks(records):
+                self._extract_block(to_dir, block, progress, checksum=checksum)
+            return
+
+        # NOTE: blocks are kept small enough that every worker has something to do
+        block_size = min(
+            EXTRACT_BLOCK_SIZE, sum(record.packed_size for record in records) // workers
+        )
+        with ThreadPoolExecutor(max_workers=workers) as thread_executor:
+            # NOTE: consume the results so that worker exceptions are raised
+            for _ in thread_executor.map(
+                lambda block: self._extract_block(
+                    to_dir, block, progress, checksum=checksum
+                ),
+                self._plan_blocks(records, block_size=block_size),
+            ):
+                pass
 
-            if not to_path.parent.is_dir():
-                to_path.parent.mkdir(parents=True)
-            with to_path.open("wb") as stream:
-                stream.write(entry.data)
-            current_size += entry.size
 
-            if callable(progress_hook):
-                progress_hook(current_size, total_size, to_path.as_posix())
+def _detach_container(value: Any) -> Any:
+    """Copies a parsed container without the streams it was parsed from.
+
+    Note:
+        Parsed containers keep a reference to their stream as ``_io``, which can't be
+        pickled if the stream is memory-mapped.
+
+    Args:
+        value (Any): The parsed value to copy
+
+    Returns:
+        Any: The copied value
+    """
+    if isinstance(value, Container):
+        return Container(
+            (key, _detach_container(item))
+            for (key, item) in value.items()
+            if key != "_io"
+        )
+    if isinstance(value, ListContainer):
+        return ListContainer(_detach_container(item) for item in value)
+    return value
+
+
+def _detach_record(record: ArchiveRecord) -> ArchiveRecord:
+    """Copies a record so that it can be sent to another process.
+
+    Args:
+        record (ArchiveRecord): The record to copy
+
+    Returns:
+        ArchiveRecord: The copied record
+    """
+    if not isinstance(record._container, Container):
+        return record
+    return attr.evolve(record, container=_detach_container(record._container))
+
+
+def _extract_shard(
+    archive_type: Type[BaseArchive],
+    filepath: str,
+    to_dir: Path,
+    records: List[ArchiveRecord],
+    progress_queue: queue.Queue,
+    checksum: bool = False,
+):
+    """Extracts a shard of records from an archive (used by process extraction).
+
+    Args:
+        archive_type (Type[BaseArchive]): The archive class to open the archive with
+        filepath (str): The filepath of the archive
+        to_dir (Path): The directory to extract the content to
+        records (List[ArchiveRecord]): The records to extract
+        progress_queue (queue.Queue): The queue to put progress arguments into
+        checksum (bool, optional): Defaults to False.
+            True if the checksums of the files' stored data should be computed
+    """
+    with archive_type.parse_file(filepath, backend="mmap") as archive:
+        for block in archive._plan_blocks(records):
+            archive._extract_block(
+                to_dir,
+                block,
+                lambda *args: progress_queue.put(args),
+                checksum=checksum,
+            )
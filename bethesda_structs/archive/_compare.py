@@ -0,0 +1,366 @@
+# Copyright (c) 2018 Stephen Bunn <stephen@bunn.io>
+# MIT License <https://choosealicense.com/licenses/mit/>
+
+import hashlib
+import collections
+from typing import List, Tuple, Iterable, Generator
+from pathlib import PureWindowsPath
+
+import attr
+
+from ._common import BaseArchive, ArchiveRecord, _iter_range, _iter_mapped
+
+T_ArchivedRecord = Tuple[BaseArchive, ArchiveRecord]
+
+DIGEST_SIZE = 16
+DIFF_STATUSES = ("added", "removed", "changed")
+
+
+@attr.s
+class DuplicateGroup(object):
+    """A group of archived files with byte-identical data.
+
+    Groups are found by :func:`find_duplicates`.
+    """
+
+    size = attr.ib(type=int)
+    """The size of the data of each file in the group.
+
+    Returns:
+        int: The size of the data of each file in the group
+    """
+
+    records = attr.ib(type=List[T_ArchivedRecord], repr=False)
+    """The archives and records of the files in the group.
+
+    Returns:
+        List[T_ArchivedRecord]: A list of (``archive``, ``record``) of the files
+    """
+
+    @property
+    def wasted_size(self) -> int:
+        """The number of bytes wasted by storing the duplicate files.
+
+        Returns:
+            int: The size of all but one of the files in the group
+        """
+        return self.size * (len(self.records) - 1)
+
+
+@attr.s
+class ArchiveChange(object):
+    """A file that differs between two archives.
+
+    Changes are found by :func:`diff_archives`.
+    """
+
+    status = attr.ib(type=str, validator=attr.validators.in_(DIFF_STATUSES))
+    """The kind of change, one of ``added``, ``removed`` or ``changed``.
+
+    Returns:
+        str: The kind of change
+    """
+
+    filepath = attr.ib(type=PureWindowsPath)
+    """The relative filepath of the file.
+
+    Returns:
+        PureWindowsPath: The relative filepath of the file
+    """
+
+    old_record = attr.ib(type=ArchiveRecord, default=None, repr=False)
+    """The record of the file in the old archive.
+
+    Returns:
+        ArchiveRecord: The record of the file in the old archive, None if the file was
+        added
+    """
+
+    new_record = attr.ib(type=ArchiveRecord, default=None, repr=False)
+    """The record of the file in the new archive.
+
+    Returns:
+        ArchiveRecord: The record of the file in the new archive, None if the file was
+        removed
+    """
+
+
+def _hash_packed(archive: BaseArchive, record: ArchiveRecord) -> bytes:
+    """Hashes the stored (maybe compressed) data of an archived file.
+
+    Args:
+        archive (BaseArchive): The archive of the file
+        record (ArchiveRecord): The record of the file
+
+    Returns:
+        bytes: The digest of the file's stored data, None if the file's data is not
+        read from a single range of the archive's content
+    """
+    packed_range = archive._packed_range(record)
+    if packed_range is None:
+        return None
+
+    packed_hash = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for piece in _iter_range(archive._read, *packed_range):
+        packed_hash.update(piece)
+    return packed_hash.digest()
+
+
+def _hash_data(archive: BaseArchive, record: ArchiveRecord) -> bytes:
+    """Hashes the (decompressed) data of an archived file.
+
+    Note:
+        The data is decompressed and hashed in pieces so the memory used doesn't
+        depend on the file's size.
+
+    Args:
+        archive (BaseArchive): The archive of the file
+        record (ArchiveRecord): The record of the file
+
+    Returns:
+        bytes: The digest of the file's data
+    """
+    data_hash = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for piece in archive.iter_record_data(record):
+        data_hash.update(piece)
+    return data_hash.digest()
+
+
+def _confirm_digest(
+    archive: BaseArchive, record: ArchiveRecord, packed_digest: bytes
+) -> bytes:
+    """Gets the digest of an archived file's data given the digest of its stored data.
+
+    Args:
+        archive (BaseArchive): The archive of the file
+        record (ArchiveRecord): The record of the file
+        packed_digest (bytes): The digest of the file's stored data (maybe None)
+
+    Returns:
+        bytes: The digest of the file's data
+    """
+    # NOTE: the stored data of uncompressed files is their data
+    if isinstance(packed_digest, bytes) and archive._stored_range(record) is not None:
+        return packed_digest
+    return _hash_data(archive, record)
+
+
+def find_duplicates(
+    archives: Iterable[BaseArchive], workers: int = 1
+) -> List[DuplicateGroup]:
+    """Finds the files with byte-identical data across some archives.
+
+    Files are first grouped by the size of their data and then by a hash of their
+    stored data, read directly from the archive without decompressing it.
+    Files with identical stored data (and compression) are identical, so only files
+    of the same size with different stored data (such as files compressed
+    differently) have their decompressed data hashed to confirm they are identical.
+    Nothing is ever extracted and files without a file of the same size are never
+    read.
+
+    Args:
+        archives (Iterable[BaseArchive]): The archives to find duplicate files in
+        workers (int, optional): Defaults to 1.
+            The number of threads to read and hash files with
+
+    Returns:
+        List[DuplicateGroup]: The groups of duplicate files, sorted by their wasted
+        size (largest first)
+
+    Example:
+        >>> FILEPATHS = []  # absolute paths to BSA/BTDX archives
+        >>> archives = [get_archive(filepath, backend="mmap") for filepath in FILEPATHS]
+        >>> groups = find_duplicates(archives, workers=4)
+        >>> sum(group.wasted_size for group in groups)
+        1048576
+    """
+    sized = collections.defaultdict(list)
+    for archive in archives:
+        for record in archive._read_record_sizes(archive.records):
+            # empty files don't waste anything
+            if record.unpacked_size > 0:
+                sized[record.unpacked_size].append((archive, record))
+
+    candidates = [
+        (size, archive, record)
+        for (size, sized_records) in sized.items()
+        if len(sized_records) > 1
+        for (archive, record) in sized_records
+    ]
+    packed = collections.defaultdict(lambda: collections.defaultdict(list))
+    for ((size, archive, record), packed_digest) in zip(
+        candidates,
+        _iter_mapped(
+            lambda candidate: _hash_packed(*candidate[1:]), candidates, workers
+        ),
+    ):
+        # NOTE: files not read from a single range can't share their stored data
+        packed_key = (
+            (record.compression, packed_digest)
+            if packed_digest is not None
+            else (None, id(record))
+        )
+        packed[size][packed_key].append((archive, record))
+
+    # files whose stored data differs may still be identical once decompressed
+    unconfirmed = [
+        (size, packed_key, packed_records[0])
+        for (size, packed_groups) in packed.items()
+        if len(packed_groups) > 1
+        for (packed_key, packed_records) in packed_groups.items()
+    ]
+    confirmed = collections.defaultdict(list)
+    for ((size, packed_key, _), data_digest) in zip(
+        unconfirmed,
+        _iter_mapped(
+            lambda item: _confirm_digest(*item[2], item[1][1]), unconfirmed, workers
+        ),
+    ):
+        confirmed[(size, data_digest)].extend(packed[size].pop(packed_key))
+
+    groups = [
+        DuplicateGroup(size=size, records=grouped_records)
+        for ((size, _), grouped_records) in confirmed.items()
+        if len(grouped_records) > 1
+    ] + [
+        DuplicateGroup(size=size, records=packed_records)
+        for (size, packed_groups) in packed.items()
+        for packed_records in packed_groups.values()
+        if len(packed_records) > 1
+    ]
+    return sorted(groups, key=lambda group: group.wasted_size, reverse=True)
+
+
+def _next_view(pieces: Iterable[bytes]) -> memoryview:
+    """Gets the next non-empty piece of some data.
+
+    Args:
+        pieces (Iterable[bytes]): An iterator of the pieces of the data
+
+    Returns:
+        memoryview: The next non-empty piece, None if there are no more pieces
+    """
+    for piece in pieces:
+        if len(piece) > 0:
+            return memoryview(piece)
+    return None
+
+
+def _equal_pieces(left: Iterable[bytes], right: Iterable[bytes]) -> bool:
+    """Compares two pieced data without joining their pieces.
+
+    Note:
+        The pieces are only consumed until the first difference.
+
+    Args:
+        left (Iterable[bytes]): The pieces of the first data
+        right (Iterable[bytes]): The pieces of the second data
+
+    Returns:
+        bool: True if the data are identical
+    """
+    (left, right) = (iter(left), iter(right))
+    (left_view, right_view) = (_next_view(left), _next_view(right))
+    while left_view is not None and right_view is not None:
+        size = min(len(left_view), len(right_view))
+        if left_view[:size] != right_view[:size]:
+            return False
+        left_view = left_view[size:] or _next_view(left)
+        right_view = right_view[size:] or _next_view(right)
+    return left_view is None and right_view is None
+
+
+def _diff_records(
+    old_archive: BaseArchive,
+    new_archive: BaseArchive,
+    old_record: ArchiveRecord,
+    new_record: ArchiveRecord,
+) -> str:
+    """Compares the records of a file in two archives.
+
+    Args:
+        old_archive (BaseArchive): The old archive
+        new_archive (BaseArchive): The new archive
+        old_record (ArchiveRecord): The record of the file in the old archive (maybe
+            None)
+        new_record (ArchiveRecord): The record of the file in the new archive (maybe
+            None)
+
+    Returns:
+        str: The status of the file's change, None if the file is unchanged
+    """
+    if old_record is None:
+        return "added"
+    elif new_record is None:
+        return "removed"
+
+    if (
+        old_archive.record_size(old_record),
+        old_record.packed_size,
+        old_record.compression,
+    ) != (
+        new_archive.record_size(new_record),
+        new_record.packed_size,
+        new_record.compression,
+    ):
+        return "changed"
+    elif not _equal_pieces(
+        old_archive._iter_packed(old_record), new_archive._iter_packed(new_record)
+    ):
+        return "changed"
+    return None
+
+
+def diff_archives(
+    old_archive: BaseArchive, new_archive: BaseArchive, workers: int = 1
+) -> Generator[ArchiveChange, None, None]:
+    """Iterates over the files that differ between two archives.
+
+    Files are matched by their (case-insensitive) filepaths through the archives'
+    indexes (see :attr:`~BaseArchive.index`).
+    Matched files are first compared by their sizes and compression, only files with
+    identical metadata have their stored (maybe compressed) data compared.
+    Nothing is ever decompressed, so files whose data is identical but stored
+    differently (such as recompressed files) are also considered changed.
+
+    Args:
+        old_archive (BaseArchive): The old archive
+        new_archive (BaseArchive): The new archive
+        workers (int, optional): Defaults to 1.
+            The number of threads to compare stored data with
+
+    Yields:
+        ArchiveChange: A change of a file, removed files first (in the old archive's
+        order) followed by the added and changed files (in the new archive's order)
+
+    Example:
+        >>> OLD_FILEPATH = ""  # absolute path to BSA/BTDX archive
+        >>> NEW_FILEPATH = ""  # absolute path to an updated BSA/BTDX archive
+        >>> for change in diff_archives(
+        ...     get_archive(OLD_FILEPATH, backend="mmap"),
+        ...     get_archive(NEW_FILEPATH, backend="mmap"),
+        ... ):
+        ...     print(change.status, change.filepath)
+        changed meshes\\foo.nif
+        added textures\\foo.dds
+    """
+    (old_index, new_index) = (old_archive.index, new_archive.index)
+    pairs = [
+        (record, None) for (key, record) in old_index.items() if key not in new_index
+    ] + [(old_index.get(key), record) for (key, record) in new_index.items()]
+
+    for ((old_record, new_record), status) in zip(
+        pairs,
+        _iter_mapped(
+            lambda pair: _diff_records(old_archive, new_archive, *pair),
+            pairs,
+            workers,
+        ),
+    ):
+        if status is not None:
+            yield ArchiveChange(
+                status=status,
+                filepath=(new_record or old_record).filepath,
+                old_record=old_record,
+                new_record=new_record,
+            )
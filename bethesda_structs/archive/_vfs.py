@@ -0,0 +1,219 @@
+# Copyright (c) 2018 Stephen Bunn <stephen@bunn.io>
+# MIT License <https://choosealicense.com/licenses/mit/>
+
+import io
+import os
+from typing import Dict, List, Tuple, Union
+from pathlib import Path, PurePath
+
+import attr
+
+from ._common import BaseArchive, ArchiveRecord, ArchiveFileReader
+
+T_VFSEntry = Tuple[BaseArchive, Union[ArchiveRecord, Path]]
+
+
+@attr.s
+class ArchiveVFS(object):
+    """A virtual filesystem of archives (and loose file directories) in load order.
+
+    The files of all layers are merged into a single case-insensitive index when the
+    filesystem is created, files of later layers override the files of earlier
+    layers with the same filepath (as the game resolves them by load order).
+    Lookups only use the merged index and never iterate over any archive.
+
+    Note:
+        Archives are opened with the given ``backend`` and ``cache_dir`` (see
+        :func:`~BaseArchive.parse_file`) and are held open until the filesystem is
+        closed.
+
+    Example:
+        >>> DATA_DIR = ""  # absolute path to the game's data directory
+        >>> with ArchiveVFS(
+        ...     [
+        ...         os.path.join(DATA_DIR, "Skyrim - Meshes.bsa"),
+        ...         os.path.join(DATA_DIR, "Update.bsa"),
+        ...         DATA_DIR,
+        ...     ]
+        ... ) as vfs:
+        ...     with vfs.open("meshes\\foo.nif") as stream:
+        ...         data = stream.read()
+    """
+
+    layers = attr.ib(type=List[str], converter=list)
+    """The filepaths of the archives and loose file directories, in load order.
+
+    Returns:
+        List[str]: The filepaths of the layers
+    """
+
+    backend = attr.ib(type=str, default="mmap")
+    cache_dir = attr.ib(type=str, default=None, repr=False)
+    _archives = attr.ib(
+        type=List[BaseArchive], default=attr.Factory(list), repr=False, init=False
+    )
+    _files = attr.ib(
+        type=Dict[str, T_VFSEntry], default=attr.Factory(dict), repr=False, init=False
+    )
+    _dirs = attr.ib(
+        type=Dict[str, Dict[str, str]],
+        default=attr.Factory(lambda: {"": {}}),
+        repr=False,
+        init=False,
+    )
+
+    def __attrs_post_init__(self):
+        """Builds the merged index of the layers.
+
+        Raises:
+            ValueError: If a layer is neither a directory nor a supported archive
+        """
+        try:
+            for layer in self.layers:
+                if os.path.isdir(layer):
+                    self._add_directory(Path(layer))
+                else:
+                    self._add_archive(layer)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> "ArchiveVFS":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def archives(self) -> List[BaseArchive]:
+        """The opened archives of the filesystem, in load order.
+
+        Returns:
+            List[BaseArchive]: The opened archives
+        """
+        return self._archives
+
+    def close(self):
+        """Closes the archives of the filesystem.
+        """
+        for archive in self._archives:
+            archive.close()
+
+    def _add_archive(self, filepath: str):
+        """Adds the files of an archive as a layer.
+
+        Args:
+            filepath (str): The filepath of the archive
+
+        Raises:
+            ValueError: If no archive can handle the given filepath
+        """
+        # NOTE: imported here as the package imports this module
+        from . import get_archive
+
+        archive = get_archive(filepath, backend=self.backend, cache_dir=self.cache_dir)
+        if archive is None:
+            raise ValueError(f"no archive can handle {filepath!r}")
+        self._archives.append(archive)
+        for record in archive.records:
+            self._add_file(str(record.filepath), (archive, record))
+
+    def _add_directory(self, dirpath: Path):
+        """Adds the loose files of a directory as a layer.
+
+        Args:
+            dirpath (Path): The directory of loose files
+        """
+        for (parent, _, filenames) in os.walk(str(dirpath)):
+            for filename in filenames:
+                filepath = Path(parent, filename)
+                self._add_file(str(filepath.relative_to(dirpath)), (None, filepath))
+
+    def _add_file(self, filepath: str, entry: T_VFSEntry):
+        """Adds a file to the merged index, overriding any file with the same filepath.
+
+        Note:
+            Names are listed as they were first added to their directory.
+
+        Args:
+            filepath (str): The relative filepath of the file
+            entry (T_VFSEntry): The (``archive``, ``record``) of the file
+        """
+        names = str(filepath).replace("/", "\\").strip("\\").split("\\")
+        keys = [name.lower() for name in names]
+        self._files["\\".join(keys)] = entry
+
+        # NOTE: only the directories which don't exist yet are added to their parents
+        for depth in range(len(keys) - 1, -1, -1):
+            parent = "\\".join(keys[:depth])
+            children = self._dirs.get(parent)
+            if children is not None:
+                children.setdefault(keys[depth], names[depth])
+                break
+            self._dirs[parent] = {keys[depth]: names[depth]}
+
+    def resolve(self, filepath: Union[str, PurePath]) -> T_VFSEntry:
+        """Resolves a filepath to the file of the last layer providing it.
+
+        Args:
+            filepath (Union[str, PurePath]): The case-insensitive relative filepath
+
+        Returns:
+            T_VFSEntry: A tuple of the (``archive``, ``record``) of the file, or
+            (None, ``path``) for loose files, None if the filepath doesn't exist
+        """
+        return self._files.get(BaseArchive._normalize_path(filepath))
+
+    def exists(self, filepath: Union[str, PurePath]) -> bool:
+        """Checks if a file or directory exists in the filesystem.
+
+        Args:
+            filepath (Union[str, PurePath]): The case-insensitive relative filepath
+
+        Returns:
+            bool: True if the file or directory exists
+        """
+        key = BaseArchive._normalize_path(filepath)
+        return key in self._files or key in self._dirs
+
+    def open(self, filepath: Union[str, PurePath]) -> io.BufferedIOBase:
+        """Opens a file of the filesystem as a readable stream.
+
+        Args:
+            filepath (Union[str, PurePath]): The case-insensitive relative filepath
+
+        Raises:
+            FileNotFoundError: If the given filepath does not exist in the filesystem
+
+        Returns:
+            io.BufferedIOBase: A readable stream of the file's data
+        """
+        entry = self.resolve(filepath)
+        if entry is None:
+            raise FileNotFoundError(f"no such file {filepath!r} exists in filesystem")
+
+        (archive, record) = entry
+        if archive is None:
+            return record.open("rb")
+        return io.BufferedReader(ArchiveFileReader(archive, record))
+
+    def listdir(self, dirpath: Union[str, PurePath] = "") -> List[str]:
+        """Lists the names of the files and directories in a directory.
+
+        Args:
+            dirpath (Union[str, PurePath], optional): Defaults to "".
+                The case-insensitive relative directory path
+
+        Raises:
+            NotADirectoryError: If the given directory does not exist in the
+                filesystem
+
+        Returns:
+            List[str]: The names of the directory's files and directories
+        """
+        children = self._dirs.get(BaseArchive._normalize_path(dirpath))
+        if children is None:
+            raise NotADirectoryError(
+                f"no such directory {dirpath!r} exists in filesystem"
+            )
+        return list(children.values())
@@ -1,12 +1,19 @@
 # Copyright (c) 2018 Stephen Bunn <stephen@bunn.io>
 # MIT License <https://choosealicense.com/licenses/mit/>
 
-from typing import Generator
-from pathlib import PureWindowsPath
-
+import io
+import os
+import bisect
+import struct
+import itertools
+from typing import List, Tuple, Union, Callable, Generator
+from pathlib import PurePath, PureWindowsPath
+
+import attr
 import lz4.frame
 from construct import (
     If,
+    Lazy,
     Array,
     Bytes,
     Struct,
@@ -23,7 +30,19 @@ from construct import (
     PascalString,
 )
 
-from ._common import ArchiveFile, BaseArchive
+from ._common import (
+    INDEX_TABLE_DTYPE,
+    STREAM_BUFFER_SIZE,
+    ArchiveFile,
+    BaseArchive,
+    ArchiveRecord,
+    T_ArchiveSource,
+    numpy,
+    _SourceFile,
+    _iter_mapped,
+    _write_archive,
+    _collect_source_files,
+)
 
 
 class LZ4CompressedAdapter(Adapter):
@@ -61,6 +80,7 @@ class LZ4CompressedAdapter(Adapter):
         return lz4.frame.compress(obj)
 
 
+@attr.s
 class BSAArchive(BaseArchive):
     """Archive type for BSA files.
 
@@ -81,10 +101,39 @@ class BSAArchive(BaseArchive):
 
     **Credit:**
         - `BAE <https://github.com/jonwd7/bae>`_
+        - `UESP <https://en.uesp.net/wiki/Oblivion_Mod:Hash_Calculation>`_
     """
 
     SIZE_MASK = 0x3fffffff
     COMPRESSED_MASK = 0xc0000000
+    COMPRESSED_TOGGLE = 0x40000000
+    HASH_EXTENSION_FLAGS = {
+        ".kf": 0x80,
+        ".nif": 0x8000,
+        ".dds": 0x8080,
+        ".wav": 0x80000000,
+    }
+    FILE_FLAG_EXTENSIONS = (
+        ".nif",
+        ".dds",
+        ".xml",
+        ".wav",
+        ".mp3",
+        ".txt",
+        ".html",
+        ".bat",
+        ".scc",
+        ".spt",
+        ".tex",
+        ".fnt",
+        ".ctl",
+    )
+
+    _directory_hashes = attr.ib(type=List[int], default=None, repr=False, init=False)
+    _directory_starts = attr.ib(type=List[int], default=None, repr=False, init=False)
+    _file_hashes = attr.ib(
+        type=dict, default=attr.Factory(dict), repr=False, init=False
+    )
 
     header_struct = Struct(
         "magic" / Bytes(4),
@@ -152,6 +201,8 @@ class BSAArchive(BaseArchive):
         :class:`~construct.core.Struct`: The structure of file records
     """
 
+    _packed_file_record = struct.Struct("<QII")
+
     directory_block_struct = Struct(
         "name"
         / If(
@@ -179,15 +230,27 @@ class BSAArchive(BaseArchive):
         "file_names"
         / If(
             lambda this: this.header.archive_flags.files_named,
-            Array(lambda this: this.header.file_count, CString("utf8")),
+            Lazy(Array(lambda this: this.header.file_count, CString("utf8"))),
         ),
     )
     """The **partial** structure of BSA archives.
 
+    Note:
+        The ``file_names`` are parsed lazily, use :attr:`~BSAArchive.file_names` to
+        access them.
+
     Return:
         :class:`~construct.core.Struct`: The **partial** structure of BSA archives
     """
 
+    _uncompressed_file_struct = Struct("data" / GreedyBytes)
+    _zlib_file_struct = Struct(
+        "original_size" / Int32ul, "data" / Compressed(GreedyBytes, "zlib")
+    )
+    _lz4_file_struct = Struct(
+        "original_size" / Int32ul, "data" / LZ4CompressedAdapter(GreedyBytes)
+    )
+
     @property
     def uncompressed_file_struct(self) -> Struct:
         """The uncompressed file structure for uncompressed files.
@@ -196,26 +259,295 @@ class BSAArchive(BaseArchive):
             :class:`~construct.core.Struct`: The uncompressed file structure for
             uncompressed files.
         """
-        return Struct("data" / GreedyBytes)
+        return self._uncompressed_file_struct
 
     @property
     def compressed_file_struct(self) -> Struct:
         """The compressed file structure for compressed files.
 
+        Note:
+            Files are read without these structures (see
+            :func:`~BSAArchive.read_record`), they're kept for describing the layout
+            of stored files.
+
         Returns:
             :class:`~construct.core.Struct`: The compressed file structure for
             compressed files.
         """
-        return Struct(
-            "original_size" / Int32ul,
-            "data"
-            / IfThenElse(
-                self.container.header.version >= 105,
-                LZ4CompressedAdapter(GreedyBytes),
-                Compressed(GreedyBytes, "zlib"),
-            ),
+        if self.container.header.version >= 105:
+            return self._lz4_file_struct
+        return self._zlib_file_struct
+
+    @property
+    def file_names(self) -> List[str]:
+        """The names of all files in the archive (parsed on first access).
+
+        Returns:
+            List[str]: The names of all files in the archive, None if the archive's
+            files are not named
+        """
+        if "file_names" not in self.container:
+            # NOTE: archives whose records were read from an index cache are not parsed
+            if not self.container.header.archive_flags.files_named:
+                return None
+            return [record.filepath.name for record in self.records]
+
+        if callable(self.container.file_names):
+            # NOTE: the lazy parse seeks the content stream which may be shared
+            with self._lock:
+                if callable(self.container.file_names):
+                    self.container.file_names = self.container.file_names()
+        return self.container.file_names
+
+    @classmethod
+    def hash_name(cls, name: str, ext: str = "") -> int:
+        """Calculates the Bethesda hash of a given name and extension.
+
+        Args:
+            name (str): The directory path or the file name without its extension
+            ext (str, optional): Defaults to "".
+                The file extension (including the leading ``.``)
+
+        Returns:
+            int: The 64-bit hash of the given name
+        """
+        chars = name.lower().replace("/", "\\").encode("utf8")
+        ext = ext.lower()
+
+        name_hash = 0
+        if len(chars) > 0:
+            name_hash = (
+                chars[-1]
+                | ((chars[-2] if len(chars) > 2 else 0) << 8)
+                | (len(chars) << 16)
+                | (chars[0] << 24)
+            )
+        name_hash |= cls.HASH_EXTENSION_FLAGS.get(ext, 0)
+
+        chars_hash = 0
+        for char in chars[1:-2]:
+            chars_hash = ((chars_hash * 0x1003F) + char) & 0xFFFFFFFF
+        ext_hash = 0
+        for char in ext.encode("utf8"):
+            ext_hash = ((ext_hash * 0x1003F) + char) & 0xFFFFFFFF
+
+        return (((chars_hash + ext_hash) & 0xFFFFFFFF) << 32) | name_hash
+
+    @classmethod
+    def hash_filepath(cls, filepath: Union[str, PurePath]) -> Tuple[int, int]:
+        """Calculates the directory and file hashes of a given filepath.
+
+        Args:
+            filepath (Union[str, PurePath]): The relative filepath
+
+        Returns:
+            Tuple[int, int]: A tuple of (``directory_hash``, ``file_hash``)
+
+        Example:
+            >>> BSAArchive.hash_filepath("meshes\\foo.nif")
+            (3616173460730307955, 10578188054403739503)
+        """
+        (directory, _, filename) = cls._normalize_path(filepath).rpartition("\\")
+        return (cls.hash_name(directory), cls.hash_name(*os.path.splitext(filename)))
+
+    @staticmethod
+    def _bisect_hash(hashes: List[int], value: int) -> int:
+        """Binary searches a sorted list of hashes for a given hash.
+
+        Args:
+            hashes (List[int]): The sorted list of hashes
+            value (int): The hash to search for
+
+        Returns:
+            int: The index of the hash, None if the hash doesn't exist
+        """
+        index = bisect.bisect_left(hashes, value)
+        if index < len(hashes) and hashes[index] == value:
+            return index
+
+    def find_record(self, filepath: Union[str, PurePath]) -> ArchiveRecord:
+        """Finds the record of a single file in the archive by its filepath.
+
+        Note:
+            Unless the filepath index has already been built, records are found by
+            binary searching the sorted directory and file record hashes.
+            This works for archives without names and doesn't require parsing any of
+            the archive's names.
+            Once the records of a named archive have been built (or read from an
+            index cache) the filepath index is used instead, returning the archive's
+            own record.
+            Records found by their hashes are built from the given filepath, so their
+            ``filepath`` has the casing of the given filepath rather than the
+            archive's.
+            The 64-bit hashes of different filepaths may collide, so the names of
+            records found in named archives are compared with the given filepath
+            (parsing the archive's file names on the first lookup).
+            If they differ, the filepath index is used instead.
+
+        Args:
+            filepath (Union[str, PurePath]): The case-insensitive relative filepath
+
+        Returns:
+            :class:`.ArchiveRecord`: The archive record, None if the filepath
+            doesn't exist
+        """
+        archive_flags = self.container.header.archive_flags
+        if (
+            self._index is not None
+            or "directory_records" not in self.container
+            or (
+                self._records is not None
+                and archive_flags.directories_named
+                and archive_flags.files_named
+            )
+        ):
+            return super().find_record(filepath)
+
+        if self._directory_hashes is None:
+            self._directory_hashes = [
+                directory_record.hash
+                for directory_record in self.container.directory_records
+            ]
+
+        (directory_hash, file_hash) = self.hash_filepath(filepath)
+        directory_index = self._bisect_hash(self._directory_hashes, directory_hash)
+        if directory_index is None:
+            return
+
+        file_records = self.container.directory_blocks[directory_index].file_records
+        file_hashes = self._file_hashes.get(directory_index)
+        if file_hashes is None:
+            file_hashes = [file_record.hash for file_record in file_records]
+            self._file_hashes[directory_index] = file_hashes
+
+        file_index = self._bisect_hash(file_hashes, file_hash)
+        if file_index is None:
+            return
+
+        if not self._is_named(filepath, directory_index, file_index):
+            return super().find_record(filepath)
+        return self._build_record(PureWindowsPath(filepath), file_records[file_index])
+
+    def _is_named(
+        self, filepath: Union[str, PurePath], directory_index: int, file_index: int
+    ) -> bool:
+        """Checks if a file found by its hashes has the names of a given filepath.
+
+        Note:
+            Unnamed directories and files can't be checked, so they always match.
+
+        Args:
+            filepath (Union[str, PurePath]): The case-insensitive relative filepath
+            directory_index (int): The index of the file's directory
+            file_index (int): The index of the file within its directory
+
+        Returns:
+            bool: True if the names of the file match the given filepath
+        """
+        (directory, _, filename) = self._normalize_path(filepath).rpartition("\\")
+        directory_block = self.container.directory_blocks[directory_index]
+        if directory_block.name is not None and (
+            self._normalize_path(directory_block.name[:-1]) != directory
+        ):
+            return False
+
+        file_names = self.file_names
+        if file_names is None:
+            return True
+
+        if self._directory_starts is None:
+            self._directory_starts = [0] + list(
+                itertools.accumulate(
+                    directory_record.file_count
+                    for directory_record in self.container.directory_records
+                )
+            )
+        file_name = file_names[self._directory_starts[directory_index] + file_index]
+        return file_name.lower() == filename
+
+    def _is_compressed(self, file_record: Container) -> bool:
+        """Determines if the file of a given file record is compressed.
+
+        Args:
+            file_record (Container): The file record
+
+        Returns:
+            bool: True if the file is compressed, otherwise False
+        """
+        # the compressed mask toggles the archive's default compression
+        return self.container.header.archive_flags.files_compressed != bool(
+            file_record.size & self.COMPRESSED_MASK
         )
 
+    def _build_record(
+        self, filepath: PureWindowsPath, file_record: Container
+    ) -> ArchiveRecord:
+        """Builds an archive record for a given file record.
+
+        Args:
+            filepath (PureWindowsPath): The filepath of the file record
+            file_record (Container): The file record
+
+        Returns:
+            :class:`.ArchiveRecord`: The archive record
+        """
+        packed_size = file_record.size & self.SIZE_MASK
+        compression = None
+        if self._is_compressed(file_record):
+            compression = "lz4" if self.container.header.version >= 105 else "zlib"
+
+        return ArchiveRecord(
+            filepath=filepath,
+            container=file_record,
+            offset=file_record.offset,
+            packed_size=packed_size,
+            # compressed files store their original size with their data
+            unpacked_size=(None if compression else packed_size),
+            compression=compression,
+        )
+
+    def record_size(self, record: ArchiveRecord) -> int:
+        """Gets the size of the file referenced by a given record without reading it.
+
+        Note:
+            Compressed files prefix their data with their original size, so only the
+            first 4 bytes of the file's data are read.
+
+        Args:
+            record (ArchiveRecord): The record to get the size of
+
+        Returns:
+            int: The size of the file's data once read
+        """
+        if record.unpacked_size is None:
+            (record.unpacked_size,) = struct.unpack("<I", self._read(record.offset, 4))
+        return record.unpacked_size
+
+    def _pack_record_container(self, container: Container) -> bytes:
+        """Packs the file record of a record for the index cache.
+
+        Args:
+            container (Container): The file record
+
+        Returns:
+            bytes: The packed file record
+        """
+        return self._packed_file_record.pack(
+            container.hash, container.size, container.offset
+        )
+
+    def _unpack_record_container(self, content: memoryview) -> Container:
+        """Unpacks the file record of a record from the index cache.
+
+        Args:
+            content (memoryview): The packed file record
+
+        Returns:
+            Container: The file record
+        """
+        (file_hash, size, offset) = self._packed_file_record.unpack(content)
+        return Container(hash=file_hash, size=size, offset=offset)
+
     @classmethod
     def can_handle(cls, filepath: str) -> bool:
         """Determines if a given file can be handled by the current archive.
@@ -227,42 +559,389 @@ class BSAArchive(BaseArchive):
         header = cls.header_struct.parse_file(filepath)
         return header.magic == b"BSA\x00" and header.version in (103, 104, 105)
 
-    def iter_files(self) -> Generator[ArchiveFile, None, None]:
-        """Iterates over the parsed data and yields instances of :class:`.ArchiveFile`.
+    @classmethod
+    def _group_source_files(
+        cls, source: T_ArchiveSource
+    ) -> List[Tuple[int, bytes, List[Tuple[int, bytes, _SourceFile]]]]:
+        """Groups the files to build an archive from into their sorted directories.
+
+        Args:
+            source (T_ArchiveSource): The source of the files (see
+                :func:`~BSAArchive.build`)
+
+        Raises:
+            ValueError: If a directory name is too long or filepaths have colliding
+                hashes
+
+        Returns:
+            List[Tuple[int, bytes, List[Tuple[int, bytes, _SourceFile]]]]: A list of
+            (``directory_hash``, ``directory_name``, ``files``) sorted by their hash,
+            where files is a list of (``file_hash``, ``file_name``, ``source_file``)
+            sorted by their hash
+        """
+        directories = {}
+        for source_file in _collect_source_files(source):
+            (directory_name, _, file_name) = str(source_file.filepath).rpartition("\\")
+            (directory_hash, file_hash) = cls.hash_filepath(source_file.filepath)
+            (known_name, files) = directories.setdefault(
+                directory_hash, (directory_name, {})
+            )
+            if file_hash in files or known_name.lower() != directory_name.lower():
+                raise ValueError(
+                    f"hash of filepath {str(source_file.filepath)!r} collides with "
+                    "another filepath"
+                )
+            if len(directory_name.encode("utf8")) >= 0xFF:
+                raise ValueError(f"directory name {directory_name!r} is too long")
+            files[file_hash] = (file_name.encode("utf8"), source_file)
+
+        # NOTE: the game binary searches directories and files by their hashes
+        return [
+            (
+                directory_hash,
+                directory_name.encode("utf8"),
+                [
+                    (file_hash, file_name, source_file)
+                    for (file_hash, (file_name, source_file)) in sorted(files.items())
+                ],
+            )
+            for (directory_hash, (directory_name, files)) in sorted(directories.items())
+        ]
+
+    @classmethod
+    def build(
+        cls,
+        to_filepath: str,
+        source: T_ArchiveSource,
+        version: int = 105,
+        compress: bool = True,
+        workers: int = 1,
+    ):
+        """Builds a BSA archive from a directory or an iterable of files.
+
+        Directories and files are sorted by their hashes (as the game expects) and
+        files are compressed by a pool of threads (zlib for v104, LZ4 frames for v105).
+        Files are written as soon as they are compressed, so only the files currently
+        being compressed are ever held in memory.
+
+        Note:
+            Files which don't shrink when compressed are stored uncompressed.
+
+        Args:
+            to_filepath (str): The filepath to write the archive to
+            source (T_ArchiveSource): Either a directory of loose files or an
+                iterable of (``filepath``, ``content``) where the content is bytes or
+                a readable binary stream
+            version (int, optional): Defaults to 105.
+                The version of the archive, one of ``104`` or ``105``
+            compress (bool, optional): Defaults to True.
+                If True, the archive's files are compressed
+            workers (int, optional): Defaults to 1.
+                The number of threads to read and compress files with
+
+        Raises:
+            ValueError: If the given version is not supported, a directory name is too
+                long, filepaths have colliding hashes or the archive is too large
+
+        Example:
+            >>> BSAArchive.build(
+            ...     "/home/username/Downloads/foo.bsa",
+            ...     "/home/username/Downloads/foo",
+            ...     workers=4,
+            ... )
+        """
+        if version not in (104, 105):
+            raise ValueError(f"version must be one of (104, 105), recieved {version!r}")
+
+        directories = cls._group_source_files(source)
+        directory_record = struct.Struct("<QIIQ" if version >= 105 else "<QII")
+        files = [file_ for (_, _, files) in directories for file_ in files]
+        header = dict(
+            magic=b"BSA\x00",
+            version=version,
+            directory_offset=cls.header_struct.sizeof(),
+            archive_flags=dict(
+                directories_named=True, files_named=True, files_compressed=compress
+            ),
+            directory_count=len(directories),
+            file_count=len(files),
+            directory_names_length=sum(
+                len(directory_name) + 1 for (_, directory_name, _) in directories
+            ),
+            file_names_length=sum(len(file_name) + 1 for (_, file_name, _) in files),
+            file_flags={
+                ext[1:]: True
+                for ext in {
+                    os.path.splitext(source_file.filepath.name)[-1].lower()
+                    for (_, _, source_file) in files
+                }
+                if ext in cls.FILE_FLAG_EXTENSIONS
+            },
+        )
+        blocks_offset = header["directory_offset"] + (
+            len(directories) * directory_record.size
+        )
+        compression = "lz4" if version >= 105 else "zlib"
+
+        def pack_file(source_file: _SourceFile) -> Tuple[List[bytes], bool]:
+            data = source_file.read()
+            if compress:
+                packed = cls._compress(data, compression)
+                if (len(packed) + 4) < len(data):
+                    # NOTE: compressed files prefix their data with their original size
+                    return ([struct.pack("<I", len(data)), packed], True)
+            return ([data], False)
+
+        def write(stream: io.BufferedRandom):
+            # NOTE: file data is written first as file records depend on its size
+            stream.seek(
+                blocks_offset
+                + len(directories)
+                + header["directory_names_length"]
+                + (len(files) * cls._packed_file_record.size)
+                + header["file_names_length"]
+            )
+            file_records = []
+            for (pieces, compressed) in _iter_mapped(
+                pack_file, (source_file for (_, _, source_file) in files), workers
+            ):
+                offset = stream.tell()
+                for piece in pieces:
+                    stream.write(piece)
+                size = stream.tell() - offset
+                if stream.tell() > 0xFFFFFFFF or size > cls.SIZE_MASK:
+                    raise ValueError("BSA archives must be smaller than 4GiB")
+                # the compressed toggle inverts the archive's default compression
+                if compressed != compress:
+                    size |= cls.COMPRESSED_TOGGLE
+                file_records.append((size, offset))
+
+            stream.seek(0)
+            stream.write(cls.header_struct.build(header))
+            # NOTE: directory name offsets include the length of the file names
+            block_offset = blocks_offset + header["file_names_length"]
+            for (directory_hash, directory_name, directory_files) in directories:
+                stream.write(
+                    directory_record.pack(
+                        directory_hash,
+                        len(directory_files),
+                        *((0,) if version >= 105 else ()),
+                        block_offset,
+                    )
+                )
+                block_offset += (len(directory_name) + 2) + (
+                    len(directory_files) * cls._packed_file_record.size
+                )
+
+            file_records = iter(file_records)
+            for (_, directory_name, directory_files) in directories:
+                stream.write(bytes((len(directory_name) + 1,)) + directory_name + b"\0")
+                stream.write(
+                    b"".join(
+                        cls._packed_file_record.pack(file_hash, *next(file_records))
+                        for (file_hash, _, _) in directory_files
+                    )
+                )
+            stream.write(b"".join(file_name + b"\0" for (_, file_name, _) in files))
+
+        _write_archive(to_filepath, write)
+
+    def _iter_file_records(self) -> Generator[Tuple[str, str, Container], None, None]:
+        """Iterates over the parsed file records and their names.
 
         Yields:
-            :class:`.ArchiveFile`: An file contained within the archive
+            Tuple[str, str, Container]: A tuple of (``directory_name``,
+            ``file_name``, ``file_record``) for each file in the archive
         """
 
+        file_names = self.file_names
         file_index = 0
-        file_struct = self.uncompressed_file_struct
-        if self.container.header.archive_flags.files_compressed:
-            file_struct = self.compressed_file_struct
+        for (directory_record, directory_block) in zip(
+            self.container.directory_records, self.container.directory_blocks
+        ):
+            # get directory path from directory block, unnamed directories and files
+            # are named by their hashes
+            if directory_block.name is not None:
+                directory_name = directory_block.name[:-1]
+            else:
+                directory_name = f"{directory_record.hash:016x}"
 
-        for directory_block in self.container.directory_blocks:
-            # get directory path from directory block
-            directory_path = PureWindowsPath(directory_block.name[:-1])
             for file_record in directory_block.file_records:
-                # choose the compressed file structure if compressed mask is set
-                if file_record.size > 0 and (
-                    self.container.header.archive_flags.files_compressed
-                    != bool(file_record.size & self.COMPRESSED_MASK)
-                ):
-                    file_struct = self.compressed_file_struct
-
-                file_container = file_struct.parse(
-                    self.content[
-                        file_record.offset : (
-                            file_record.offset + (file_record.size & self.SIZE_MASK)
-                        )
-                    ]
-                )
+                if file_names is not None:
+                    file_name = file_names[file_index]
+                else:
+                    file_name = f"{file_record.hash:016x}"
+
+                yield (directory_name, file_name, file_record)
+                file_index += 1
+
+    def iter_records(self) -> Generator[ArchiveRecord, None, None]:
+        """Iterates over the parsed data and yields instances of `ArchiveRecord`.
+
+        Yields:
+            :class:`.ArchiveRecord`: A record of a file contained within the archive
+        """
+
+        for (directory_name, file_name, file_record) in self._iter_file_records():
+            yield self._build_record(
+                PureWindowsPath(directory_name, file_name), file_record
+            )
+
+    def _build_index_table(self) -> Tuple["numpy.ndarray", List[str]]:
+        """Builds the index table of the archive from its raw file records.
 
-                yield ArchiveFile(
-                    filepath=directory_path.joinpath(
-                        self.container.file_names[file_index]
-                    ),
-                    data=file_container.data,
+        Note:
+            Directory and file records are decoded with :func:`numpy.frombuffer`
+            directly from a single read of the archive's record region (starting at
+            the header's ``directory_offset``).
+            The record dtypes follow :attr:`~BSAArchive.directory_record_struct` and
+            :attr:`~BSAArchive.file_record_struct`.
+
+        Returns:
+            Tuple[numpy.ndarray, List[str]]: A tuple of the structured array and its
+            table of filepaths
+        """
+        header = self.container.header
+        if header.version >= 105:
+            directory_dtype = numpy.dtype(
+                [
+                    ("hash", "<u8"),
+                    ("file_count", "<u4"),
+                    ("_unknown_0", "<u4"),
+                    ("name_offset", "<u8"),
+                ]
+            )
+        else:
+            directory_dtype = numpy.dtype(
+                [("hash", "<u8"), ("file_count", "<u4"), ("name_offset", "<u4")]
+            )
+        file_dtype = numpy.dtype([("hash", "<u8"), ("size", "<u4"), ("offset", "<u4")])
+
+        # NOTE: directory blocks are each prefixed by their name (if named)
+        blocks_offset = header.directory_count * directory_dtype.itemsize
+        blocks_size = header.file_count * file_dtype.itemsize
+        if header.archive_flags.directories_named:
+            blocks_size += header.directory_names_length + header.directory_count
+        content = self._read(header.directory_offset, blocks_offset + blocks_size)
+
+        directory_records = numpy.frombuffer(
+            content, dtype=directory_dtype, count=header.directory_count
+        )
+        (file_records, position) = ([], blocks_offset)
+        for file_count in directory_records["file_count"].tolist():
+            if header.archive_flags.directories_named:
+                position += 1 + content[position]
+            file_records.append(
+                numpy.frombuffer(
+                    content, dtype=file_dtype, count=file_count, offset=position
                 )
+            )
+            position += file_count * file_dtype.itemsize
+        file_records = numpy.concatenate(file_records or [numpy.zeros(0, file_dtype)])
+
+        table = numpy.zeros(len(file_records), dtype=INDEX_TABLE_DTYPE)
+        table["offset"] = file_records["offset"]
+        table["packed_size"] = file_records["size"] & self.SIZE_MASK
+        # the compressed mask toggles the archive's default compression
+        table["compressed"] = ((file_records["size"] & self.COMPRESSED_MASK) != 0) != (
+            bool(header.archive_flags.files_compressed)
+        )
+        table["unpacked_size"] = numpy.where(
+            table["compressed"], 0, table["packed_size"]
+        )
+        table["dir_hash"] = numpy.repeat(
+            directory_records["hash"], directory_records["file_count"]
+        )
+        table["file_hash"] = file_records["hash"]
+        table["name_id"] = numpy.arange(len(table))
+
+        if self._records is not None:
+            filepaths = [str(record.filepath) for record in self._records]
+        else:
+            directory_paths = {}
+            filepaths = []
+            for (directory_name, file_name, _) in self._iter_file_records():
+                directory_path = directory_paths.get(directory_name)
+                if directory_path is None:
+                    directory_path = str(PureWindowsPath(directory_name))
+                    directory_paths[directory_name] = directory_path
+                filepaths.append(f"{directory_path}\\{file_name}")
+        return (table, filepaths)
+
+    def _stored_range(self, record: ArchiveRecord) -> Tuple[int, int]:
+        """Gets the range of the archive's content that is the file's data as-is.
 
-                file_index += 1
+        Args:
+            record (ArchiveRecord): The record of the file
+
+        Returns:
+            Tuple[int, int]: The (``offset``, ``size``) of the file's data, None if
+            the file's data is compressed
+        """
+        if not record.compression:
+            return (record.offset, record.packed_size)
+
+    def _packed_range(self, record: ArchiveRecord) -> Tuple[int, int]:
+        """Gets the range of the archive's content that the file's data is read from.
+
+        Args:
+            record (ArchiveRecord): The record of the file
+
+        Returns:
+            Tuple[int, int]: The (``offset``, ``size``) of the file's stored data
+        """
+        return (record.offset, record.packed_size)
+
+    def iter_record_data(
+        self,
+        record: ArchiveRecord,
+        read: Callable[[int, int], memoryview] = None,
+        buffer_size: int = STREAM_BUFFER_SIZE,
+    ) -> Generator[bytes, None, None]:
+        """Iterates over the data of the file referenced by a given record in pieces.
+
+        Args:
+            record (ArchiveRecord): The record to read
+            read (Callable[[int, int], memoryview], optional): Defaults to None.
+                A callable that reads (``offset``, ``size``) bytes of the archive's
+                content, uses the archive's content if None
+            buffer_size (int, optional): Defaults to ``STREAM_BUFFER_SIZE``.
+                The size of the pieces to read and decompress
+
+        Yields:
+            bytes: A piece of the file's data
+        """
+        (offset, size) = (record.offset, record.packed_size)
+        if record.compression:
+            # skip the original size prefixing the compressed data
+            (offset, size) = (offset + 4, size - 4)
+
+        yield from self._iter_decompressed(
+            offset, size, record.compression, read=read, buffer_size=buffer_size
+        )
+
+    def read_record(
+        self, record: ArchiveRecord, read: Callable[[int, int], memoryview] = None
+    ) -> ArchiveFile:
+        """Reads the file referenced by a given record.
+
+        Args:
+            record (ArchiveRecord): The record to read
+            read (Callable[[int, int], memoryview], optional): Defaults to None.
+                A callable that reads (``offset``, ``size``) bytes of the archive's
+                content, uses the archive's content if None
+
+        Returns:
+            :class:`.ArchiveFile`: The file referenced by the record
+        """
+
+        read = read or self._read
+        data = read(record.offset, record.packed_size)
+        if record.compression:
+            # NOTE: compressed files prefix their data with their original size
+            (record.unpacked_size,) = struct.unpack_from("<I", data)
+            data = self._decompress(
+                data[4:], record.compression, size=record.unpacked_size
+            )
+
+        return ArchiveFile(filepath=record.filepath, data=bytes(data))
@@ -1,41 +1,60 @@
 # Copyright (c) 2018 Stephen Bunn <stephen@bunn.io>
 # MIT License <https://choosealicense.com/licenses/mit/>
 
+import io
+import os
+import zlib
+import struct
 import warnings
-from typing import Tuple, Generator
-from pathlib import PureWindowsPath
+import functools
+from typing import List, Tuple, Union, Callable, Iterable, Generator
+from pathlib import PurePath, PureWindowsPath
 
+import attr
 from construct import (
+    Lazy,
     Array,
     Bytes,
     Const,
     Int8ul,
     Struct,
     Switch,
-    VarInt,
     Default,
     Int16ul,
     Int32ul,
     Int64ul,
     Container,
     FlagsEnum,
-    Compressed,
-    GreedyBytes,
     PaddedString,
-    PascalString,
+    ListContainer,
 )
 
 from .. import __version__
-from ._common import ArchiveFile, BaseArchive
+from ._common import (
+    INDEX_TABLE_DTYPE,
+    STREAM_BUFFER_SIZE,
+    ArchiveFile,
+    BaseArchive,
+    ArchiveRecord,
+    T_ArchiveSource,
+    T_RecordPattern,
+    numpy,
+    _SourceFile,
+    _iter_mapped,
+    record_filter,
+    _write_archive,
+    _collect_source_files,
+)
 from ..contrib.dds import (
-    DDS_HEADER,
-    MAKEFOURCC,
-    DDS_HEADER_DX10,
+    DDS_HEADERS_SIZE,
     DXGIFormats,
-    D3D10ResourceDimension,
+    get_mip_sizes,
+    build_dds_headers,
+    parse_dds_headers,
 )
 
 
+@attr.s
 class BTDXArchive(BaseArchive):
     """Archive type for BTDX files (aka. BA2).
 
@@ -63,6 +82,24 @@ class BTDXArchive(BaseArchive):
         - `BAE <https://github.com/jonwd7/bae>`_
     """
 
+    DX10_CHUNK_SIZE = 0x10000
+
+    _file_names = attr.ib(type=List[str], default=None, repr=False, init=False)
+
+    _packed_file = struct.Struct("<I4sIIQIII")
+    _packed_tex_header = struct.Struct("<I4sIBBHHHBBH")
+    _packed_tex_chunk = struct.Struct("<QIIHHI")
+    _file_dtype = [
+        ("hash", "<u4"),
+        ("ext", "S4"),
+        ("directory_hash", "<u4"),
+        ("_unknown_0", "<u4"),
+        ("offset", "<u8"),
+        ("packed_size", "<u4"),
+        ("unpacked_size", "<u4"),
+        ("_unknown_1", "<u4"),
+    ]
+
     header_struct = Struct(
         "magic" / Bytes(4),
         "version" / Int32ul,
@@ -138,19 +175,278 @@ class BTDXArchive(BaseArchive):
     archive_struct = Struct(
         "header" / header_struct,
         "files"
-        / Array(
-            lambda this: this.header.file_count,
-            Switch(
-                lambda this: this.header.type, {"GNRL": file_struct, "DX10": tex_struct}
-            ),
+        / Switch(
+            lambda this: this.header.type,
+            {
+                "GNRL": Lazy(Array(lambda this: this.header.file_count, file_struct)),
+                "DX10": Array(lambda this: this.header.file_count, tex_struct),
+            },
         ),
     )
     """The **partial** structure of BTDX archives.
 
+    Note:
+        GNRL files are parsed lazily (see :attr:`~BTDXArchive.files`), their records
+        are decoded directly from the fixed-size file table.
+
     Returns:
         :class:`~construct.core.Struct`: The **partial** structure of BTDX archives
     """
 
+    @property
+    def files(self) -> List[Container]:
+        """The GNRL or DX10 file containers of the archive (parsed on first access).
+
+        Returns:
+            List[Container]: The file containers of the archive, only the containers
+            of its records if the archive's records were read from an index cache
+        """
+        if "files" not in self.container:
+            # NOTE: archives whose records were read from an index cache are not parsed
+            return [record.container for record in self.records]
+
+        if callable(self.container.files):
+            # NOTE: the lazy parse seeks the content stream which may be shared
+            with self._lock:
+                if callable(self.container.files):
+                    self.container.files = self.container.files()
+        return self.container.files
+
+    @property
+    def file_names(self) -> List[str]:
+        """The names of all files in the archive (decoded on first access).
+
+        Note:
+            The name table is decoded in a single pass over the archive's content and
+            is shared by iteration, lookup and filtering.
+
+        Returns:
+            List[str]: The names of all files in the archive
+        """
+        if self._file_names is None:
+            with self._lock:
+                if self._file_names is None:
+                    self._file_names = self._parse_file_names()
+        return self._file_names
+
+    def _parse_file_names(self) -> List[str]:
+        """Decodes the name table of the archive.
+
+        Returns:
+            List[str]: The names of all files in the archive
+        """
+        names_content = self._read(self.container.header.names_offset)
+        (file_names, offset) = ([], 0)
+        for _ in range(self.container.header.file_count):
+            # names are prefixed with their uint16 length and are not null terminated
+            (name_length,) = struct.unpack_from("<H", names_content, offset)
+            offset += 2
+            file_names.append(str(names_content[offset : offset + name_length], "utf8"))
+            offset += name_length
+        return file_names
+
+    @staticmethod
+    def _pack_fields(
+        packer: struct.Struct, field_struct: Struct, container: Container
+    ) -> bytes:
+        """Packs the fields of a container parsed by a given structure.
+
+        Args:
+            packer (struct.Struct): The packing of the structure's fields
+            field_struct (Struct): The structure the container was parsed by
+            container (Container): The container to pack
+
+        Returns:
+            bytes: The packed container
+        """
+        values = (container[subcon.name] for subcon in field_struct.subcons)
+        return packer.pack(
+            *(
+                (value.encode("utf8") if isinstance(value, str) else value)
+                for value in values
+            )
+        )
+
+    @staticmethod
+    def _unpack_fields(
+        packer: struct.Struct,
+        field_struct: Struct,
+        content: memoryview,
+        offset: int = 0,
+    ) -> Container:
+        """Unpacks the fields of a container packed by :func:`_pack_fields`.
+
+        Args:
+            packer (struct.Struct): The packing of the structure's fields
+            field_struct (Struct): The structure the container was parsed by
+            content (memoryview): The packed content
+            offset (int, optional): Defaults to 0.
+                The offset of the packed container in the content
+
+        Returns:
+            Container: The unpacked container
+        """
+        return BTDXArchive._build_fields(
+            field_struct, packer.unpack_from(content, offset)
+        )
+
+    @staticmethod
+    def _build_fields(field_struct: Struct, values: Iterable) -> Container:
+        """Builds a container from the unpacked values of a structure's fields.
+
+        Args:
+            field_struct (Struct): The structure the values belong to
+            values (Iterable): The values of the structure's fields, in order
+
+        Returns:
+            Container: The built container
+        """
+        return Container(
+            (
+                subcon.name,
+                (
+                    value.rstrip(b"\x00").decode("utf8")
+                    if isinstance(value, bytes)
+                    else value
+                ),
+            )
+            for (subcon, value) in zip(field_struct.subcons, values)
+        )
+
+    def _iter_gnrl_files(
+        self,
+    ) -> Iterable[Tuple[int, int, int, Union[Container, Callable[[], Container]]]]:
+        """Iterates over the fields of the GNRL files of the archive.
+
+        Note:
+            Unless the archive's files were already parsed, the file table is decoded
+            in a single :func:`numpy.frombuffer` call (or with
+            :meth:`struct.Struct.iter_unpack` if numpy isn't installed) rather than
+            through :attr:`~BTDXArchive.file_struct`, and the file containers are only
+            built from the decoded file table when they are accessed.
+
+        Returns:
+            Iterable[Tuple[int, int, int, Union[Container, Callable[[], Container]]]]:
+            The (``offset``, ``packed_size``, ``unpacked_size``, ``container``) of
+            each GNRL file, where ``container`` may be a callable building it
+        """
+        if "files" not in self.container or not callable(self.container.files):
+            return (
+                (
+                    file_container.offset,
+                    file_container.packed_size,
+                    file_container.unpacked_size,
+                    file_container,
+                )
+                for file_container in self.files
+            )
+
+        content = self._read(
+            self.header_struct.sizeof(),
+            self.container.header.file_count * self._packed_file.size,
+        )
+        if numpy is None:
+            return (
+                (
+                    values[4],
+                    values[5],
+                    values[6],
+                    functools.partial(BTDXArchive._build_gnrl_file, values),
+                )
+                for values in self._packed_file.iter_unpack(content)
+            )
+
+        # NOTE: the decoded table is copied so it doesn't hold the content's buffer
+        file_records = numpy.frombuffer(content, dtype=self._file_dtype).copy()
+        return zip(
+            file_records["offset"].tolist(),
+            file_records["packed_size"].tolist(),
+            file_records["unpacked_size"].tolist(),
+            (
+                functools.partial(BTDXArchive._build_gnrl_row, file_records, index)
+                for index in range(len(file_records))
+            ),
+        )
+
+    @staticmethod
+    def _build_gnrl_file(values: Tuple) -> Container:
+        """Builds a GNRL file container from the unpacked values of its fields.
+
+        Note:
+            This is referenced through the class (rather than an archive) so that
+            records holding it can be sent to other processes.
+
+        Args:
+            values (Tuple): The values of the file's fields, in order
+
+        Returns:
+            Container: The GNRL file container
+        """
+        return BTDXArchive._build_fields(BTDXArchive.file_struct, values)
+
+    @staticmethod
+    def _build_gnrl_row(file_records: "numpy.ndarray", index: int) -> Container:
+        """Builds a GNRL file container from a row of the decoded file table.
+
+        Args:
+            file_records (numpy.ndarray): The decoded file table
+            index (int): The index of the file's row
+
+        Returns:
+            Container: The GNRL file container
+        """
+        return BTDXArchive._build_gnrl_file(file_records[index].tolist())
+
+    def _pack_record_container(self, container: Container) -> bytes:
+        """Packs the file container of a record for the index cache.
+
+        Args:
+            container (Container): The GNRL or DX10 file container
+
+        Returns:
+            bytes: The packed file container
+        """
+        if self.container.header.type == "GNRL":
+            return self._pack_fields(self._packed_file, self.file_struct, container)
+
+        return self._pack_fields(
+            self._packed_tex_header, self.tex_header_struct, container.header
+        ) + b"".join(
+            self._pack_fields(self._packed_tex_chunk, self.tex_chunk_struct, tex_chunk)
+            for tex_chunk in container.chunks
+        )
+
+    def _unpack_record_container(self, content: memoryview) -> Container:
+        """Unpacks the file container of a record from the index cache.
+
+        Args:
+            content (memoryview): The packed file container
+
+        Returns:
+            Container: The GNRL or DX10 file container
+        """
+        if self.container.header.type == "GNRL":
+            return self._unpack_fields(self._packed_file, self.file_struct, content)
+
+        tex_header = self._unpack_fields(
+            self._packed_tex_header, self.tex_header_struct, content
+        )
+        return Container(
+            header=tex_header,
+            chunks=ListContainer(
+                self._unpack_fields(
+                    self._packed_tex_chunk,
+                    self.tex_chunk_struct,
+                    content,
+                    offset=(
+                        self._packed_tex_header.size
+                        + (chunk_index * self._packed_tex_chunk.size)
+                    ),
+                )
+                for chunk_index in range(tex_header.chunks_count)
+            ),
+        )
+
     @classmethod
     def can_handle(cls, filepath: str) -> bool:
         """Determines if a given file can be handled by the current archive.
@@ -161,277 +457,960 @@ class BTDXArchive(BaseArchive):
         header = cls.header_struct.parse_file(filepath)
         return header.magic == b"BTDX" and header.version >= 1
 
-    def _build_dds_headers(self, file_container: Container) -> Tuple[bytes, bytes]:
-        """Builds DDS and DX10 secion headers for a given `file_container`.
+    @staticmethod
+    def hash_name(name: str) -> int:
+        """Calculates the Bethesda hash of a given name.
+
+        Note:
+            BTDX archives hash names with CRC-32 without inverting the initial or
+            final value.
 
         Args:
-            file_container (Container): File container to build headers for
+            name (str): The directory path or the file name without its extension
 
         Returns:
-            Tuple[bytes, bytes]: A tuple of `DDS_HEADER` and `DX10_HEADER` (maybe None)
+            int: The 32-bit hash of the given name
         """
+        chars = name.lower().replace("/", "\\").encode("utf8")
+        return zlib.crc32(chars, 0xFFFFFFFF) ^ 0xFFFFFFFF
 
-        header_data = {
-            "dwFlags": {
-                "DDSD_CAPS": True,
-                "DDSD_HEIGHT": True,
-                "DDSD_WIDTH": True,
-                "DDSD_PIXELFORMAT": True,
-                "DDSD_MIPMAPCOUNT": True,
-                "DDSD_LINEARSIZE": True,
-            },
-            "dwHeight": file_container.header.height,
-            "dwWidth": file_container.header.width,
-            "dwMipMapCount": file_container.header.mips_count,
-            "dwCaps": {
-                "DDSCAPS_COMPLEX": True,
-                "DDSCAPS_TEXTURE": True,
-                "DDSCAPS_MIPMAP": True,
-            },
-        }
-
-        # NOTE: I'm unsure what this field "is", but BAE has logic to build complete
-        # cubemaps for the DDS_HEADER if set to 2049
-        if file_container.header._unknown_1 == 2049:
-            header_data.update(
-                {
-                    "dwCaps2": {
-                        "DDSCAPS2_CUBEMAP": True,
-                        "DDSCAPS2_CUBEMAP_POSITIVEX": True,
-                        "DDSCAPS2_CUBEMAP_NEGATIVEX": True,
-                        "DDSCAPS2_CUBEMAP_POSITIVEY": True,
-                        "DDSCAPS2_CUBEMAP_NEGATIVEY": True,
-                        "DDSCAPS2_CUBEMAP_POSITIVEZ": True,
-                        "DDSCAPS2_CUBEMAP_NEGATIVEZ": True,
-                    }
-                }
-            )
+    @classmethod
+    def hash_filepath(cls, filepath: Union[str, PurePath]) -> Tuple[int, int]:
+        """Calculates the directory and file hashes of a given filepath.
 
-        # TODO: find a cleaner more obvious way of implementing this logic
-        dx10_header_data = {}
-        pixel_data = {}
-        if file_container.header.format == DXGIFormats.DXGI_FORMAT_BC1_UNORM:
-            pixel_data.update(
-                dict(
-                    dwFlags=dict(DDPF_FOURCC=True),
-                    dwFourCC=MAKEFOURCC("D", "X", "T", "1"),
-                )
+        Args:
+            filepath (Union[str, PurePath]): The relative filepath
+
+        Returns:
+            Tuple[int, int]: A tuple of (``directory_hash``, ``file_hash``)
+
+        Example:
+            >>> BTDXArchive.hash_filepath("interface\\foo.swf")
+            (3539859571, 1932704819)
+        """
+        (directory, _, filename) = cls._normalize_path(filepath).rpartition("\\")
+        return (cls.hash_name(directory), cls.hash_name(os.path.splitext(filename)[0]))
+
+    @classmethod
+    def _plan_dx10_texture(
+        cls, source_file: _SourceFile
+    ) -> Tuple[int, int, int, int, bool, List[Tuple[int, int, int]]]:
+        """Plans the DX10 texture and chunks to store a DDS file as.
+
+        Note:
+            Mipmaps are grouped (largest first) into chunks of at least
+            ``DX10_CHUNK_SIZE`` bytes, so large mipmaps get their own chunks and the
+            small mipmaps share the last chunk.
+            Cubemaps store their faces one after another so they are stored in a single
+            chunk.
+
+        Args:
+            source_file (_SourceFile): The DDS file, only its headers are read
+
+        Raises:
+            ValueError: If the file is not a supported DDS file
+
+        Returns:
+            Tuple[int, int, int, int, bool, List[Tuple[int, int, int]]]: A tuple of
+            (``dxgi_format``, ``width``, ``height``, ``mips_count``, ``cubemap``,
+            ``chunks``) where chunks is a list of (``start_mip``, ``end_mip``,
+            ``size``) and the size of a cubemap's chunk is None
+        """
+        try:
+            (dxgi_format, width, height, mips_count, cubemap, _) = parse_dds_headers(
+                source_file.read(size=DDS_HEADERS_SIZE)
             )
-            header_data.update(
-                dict(
-                    dwPitchOrLinearSize=(
-                        (file_container.header.width * file_container.header.height)
-                        // 2
-                    )
+        except ValueError as exc:
+            raise ValueError(f"can't store {str(source_file.filepath)!r}, {exc}")
+
+        chunks = []
+        if cubemap:
+            chunks.append((0, mips_count - 1, None))
+        else:
+            mip_sizes = get_mip_sizes(dxgi_format, width, height, mips_count)
+            for (mip, mip_size) in enumerate(mip_sizes):
+                if chunks and chunks[-1][-1] < cls.DX10_CHUNK_SIZE:
+                    (start_mip, _, size) = chunks.pop()
+                    chunks.append((start_mip, mip, size + mip_size))
+                else:
+                    chunks.append((mip, mip, mip_size))
+        return (dxgi_format, width, height, mips_count, cubemap, chunks)
+
+    @classmethod
+    def _pack_source_file(
+        cls,
+        source_file: _SourceFile,
+        texture: Tuple[int, int, int, int, bool, List[Tuple[int, int, int]]],
+        compress: bool,
+    ) -> List[Tuple[bytes, int, int]]:
+        """Reads and compresses the data of a file to store in a built archive.
+
+        Args:
+            source_file (_SourceFile): The file to store
+            texture (Tuple[int, int, int, int, bool, List[Tuple[int, int, int]]]):
+                The planned DX10 texture of the file (see
+                :func:`~BTDXArchive._plan_dx10_texture`), None for GNRL files
+            compress (bool): If True, the data is compressed
+
+        Raises:
+            ValueError: If the size of a DX10 texture doesn't match its headers
+
+        Returns:
+            List[Tuple[bytes, int, int]]: A list of (``data``, ``packed_size``,
+            ``unpacked_size``) for the file (or each of its chunks), the packed size
+            of uncompressed data is 0
+        """
+        data = source_file.read()
+        pieces = [data]
+        if texture is not None:
+            offset = parse_dds_headers(data)[-1]
+            chunks = texture[-1]
+            if chunks[-1][-1] is not None and (len(data) - offset) != sum(
+                size for (_, _, size) in chunks
+            ):
+                raise ValueError(
+                    f"size of texture {str(source_file.filepath)!r} doesn't match its "
+                    "headers"
                 )
+
+            pieces = []
+            for (_, _, size) in chunks:
+                end = len(data) if size is None else (offset + size)
+                pieces.append(data[offset:end])
+                offset = end
+
+        payloads = []
+        for piece in pieces:
+            packed = cls._compress(piece, "zlib") if compress else piece
+            if len(packed) < len(piece):
+                payloads.append((packed, len(packed), len(piece)))
+            else:
+                # NOTE: uncompressed data is stored with a packed size of 0
+                payloads.append((piece, 0, len(piece)))
+        return payloads
+
+    @classmethod
+    def _pack_built_record(
+        cls,
+        file_hashes: Tuple[int, bytes, int],
+        texture: Tuple[int, int, int, int, bool, List[Tuple[int, int, int]]],
+        stored: List[Tuple[int, int, int]],
+    ) -> bytes:
+        """Packs the record of a file stored in a built archive.
+
+        Note:
+            The unknown values are the ones written by Bethesda's Archive2.
+
+        Args:
+            file_hashes (Tuple[int, bytes, int]): The (``hash``, ``ext``,
+                ``directory_hash``) of the file
+            texture (Tuple[int, int, int, int, bool, List[Tuple[int, int, int]]]):
+                The planned DX10 texture of the file, None for GNRL files
+            stored (List[Tuple[int, int, int]]): The (``offset``, ``packed_size``,
+                ``unpacked_size``) of the file's stored data (or each of its chunks)
+
+        Returns:
+            bytes: The packed GNRL or DX10 file record
+        """
+        if texture is None:
+            return cls._packed_file.pack(
+                *file_hashes, 0x00100100, *stored[0], 0xBAADF00D
             )
-        elif file_container.header.format == DXGIFormats.DXGI_FORMAT_BC2_UNORM:
-            pixel_data.update(
-                dict(
-                    dwFlags=dict(DDPF_FOURCC=True),
-                    dwFourCC=MAKEFOURCC("D", "X", "T", "3"),
-                )
+
+        (dxgi_format, width, height, mips_count, cubemap, chunks) = texture
+        return cls._packed_tex_header.pack(
+            *file_hashes,
+            0,
+            len(chunks),
+            cls._packed_tex_chunk.size,
+            height,
+            width,
+            mips_count,
+            dxgi_format,
+            (2049 if cubemap else 2048),
+        ) + b"".join(
+            cls._packed_tex_chunk.pack(*chunk_stored, start_mip, end_mip, 0xBAADF00D)
+            for ((start_mip, end_mip, _), chunk_stored) in zip(chunks, stored)
+        )
+
+    @classmethod
+    def build(
+        cls,
+        to_filepath: str,
+        source: T_ArchiveSource,
+        archive_type: str = "GNRL",
+        compress: bool = True,
+        workers: int = 1,
+    ):
+        """Builds a BTDX archive from a directory or an iterable of files.
+
+        Files are sorted by their filepaths and compressed with zlib by a pool of
+        threads.
+        Files are written as soon as they are compressed, so only the files currently
+        being compressed are ever held in memory.
+
+        Note:
+            ``DX10`` archives can only be built from DDS files (in the formats
+            supported by :func:`~bethesda_structs.contrib.dds.build_dds_headers`),
+            their headers are rebuilt when the textures are read.
+            Files (or chunks) which don't shrink when compressed are stored
+            uncompressed.
+
+        Args:
+            to_filepath (str): The filepath to write the archive to
+            source (T_ArchiveSource): Either a directory of loose files or an
+                iterable of (``filepath``, ``content``) where the content is bytes or
+                a readable binary stream
+            archive_type (str, optional): Defaults to "GNRL".
+                The type of the archive, one of ``GNRL`` or ``DX10``
+            compress (bool, optional): Defaults to True.
+                If True, the archive's files are compressed
+            workers (int, optional): Defaults to 1.
+                The number of threads to read and compress files with
+
+        Raises:
+            ValueError: If the given archive type is not supported, a file's extension
+                is too long or a ``DX10`` file is not a supported DDS file
+
+        Example:
+            >>> BTDXArchive.build(
+            ...     "/home/username/Downloads/foo - Textures.ba2",
+            ...     "/home/username/Downloads/foo",
+            ...     archive_type="DX10",
+            ...     workers=4,
+            ... )
+        """
+        if archive_type not in ("GNRL", "DX10"):
+            raise ValueError(
+                "archive type must be one of ('GNRL', 'DX10'), recieved "
+                f"{archive_type!r}"
             )
-            header_data.update(
-                dict(
-                    dwPitchOrLinearSize=(
-                        file_container.header.width * file_container.header.height
-                    )
+
+        source_files = _collect_source_files(source)
+        file_hashes = []
+        for source_file in source_files:
+            ext = os.path.splitext(source_file.filepath.name)[-1][1:].lower()
+            if len(ext.encode("utf8")) > 4:
+                raise ValueError(
+                    f"extension of {str(source_file.filepath)!r} is too long"
                 )
+            (directory_hash, file_hash) = cls.hash_filepath(source_file.filepath)
+            file_hashes.append((file_hash, ext.encode("utf8"), directory_hash))
+
+        textures = [None] * len(source_files)
+        records_size = len(source_files) * cls._packed_file.size
+        if archive_type == "DX10":
+            textures = list(
+                _iter_mapped(cls._plan_dx10_texture, source_files, workers)
             )
-        elif file_container.header.format == DXGIFormats.DXGI_FORMAT_BC3_UNORM:
-            pixel_data.update(
-                dict(
-                    dwFlags=dict(DDPF_FOURCC=True),
-                    dwFourCC=MAKEFOURCC("D", "X", "T", "5"),
-                )
+            records_size = sum(
+                cls._packed_tex_header.size
+                + (len(texture[-1]) * cls._packed_tex_chunk.size)
+                for texture in textures
             )
-            header_data.update(
-                dict(
-                    dwPitchOrLinearSize=(
-                        file_container.header.width * file_container.header.height
+
+        def write(stream: io.BufferedRandom):
+            # NOTE: file data is written first as file records depend on its size
+            stream.seek(cls.header_struct.sizeof() + records_size)
+            stored = []
+            for payloads in _iter_mapped(
+                lambda item: cls._pack_source_file(*item, compress),
+                zip(source_files, textures),
+                workers,
+            ):
+                stored.append([])
+                for (data, packed_size, unpacked_size) in payloads:
+                    stored[-1].append((stream.tell(), packed_size, unpacked_size))
+                    stream.write(data)
+
+            names_offset = stream.tell()
+            for source_file in source_files:
+                # names are prefixed with their uint16 length (not null terminated)
+                name = str(source_file.filepath).encode("utf8")
+                stream.write(struct.pack("<H", len(name)) + name)
+
+            stream.seek(0)
+            stream.write(
+                cls.header_struct.build(
+                    dict(
+                        magic=b"BTDX",
+                        version=1,
+                        type=archive_type,
+                        file_count=len(source_files),
+                        names_offset=names_offset,
                     )
                 )
             )
-        elif file_container.header.format == DXGIFormats.DXGI_FORMAT_BC5_UNORM:
-            pixel_data.update(
-                dict(
-                    dwFlags=dict(DDPF_FOURCC=True),
-                    dwFourCC=MAKEFOURCC("A", "T", "I", "2"),
-                )
+            for (hashes, texture, file_stored) in zip(file_hashes, textures, stored):
+                stream.write(cls._pack_built_record(hashes, texture, file_stored))
+
+        _write_archive(to_filepath, write)
+
+    def _build_dds_headers(self, file_container: Container) -> Tuple[bytes, bytes]:
+        """Builds DDS and DX10 secion headers for a given `file_container`.
+
+        Note:
+            Headers are cached by the texture fields they depend on, see
+            :func:`~bethesda_structs.contrib.dds.build_dds_headers`.
+
+        Args:
+            file_container (Container): File container to build headers for
+
+        Returns:
+            Tuple[bytes, bytes]: A tuple of `DDS_HEADER` and `DX10_HEADER` (maybe None)
+        """
+
+        tex_header = file_container.header
+        try:
+            # NOTE: I'm unsure what this field "is", but BAE has logic to build
+            # complete cubemaps for the DDS_HEADER if set to 2049
+            return build_dds_headers(
+                tex_header.format,
+                tex_header.width,
+                tex_header.height,
+                tex_header.mips_count,
+                cubemap=(tex_header._unknown_1 == 2049),
             )
-            header_data.update(
-                dict(
-                    dwPitchOrLinearSize=(
-                        file_container.header.width * file_container.header.height
-                    )
-                )
+        except ValueError:
+            warnings.warn(
+                (
+                    f"unsupported DXGI format "
+                    f"{DXGIFormats(tex_header.format).name}, "
+                    f"please create an issue on {__version__.__repo__} if you see this"
+                ),
+                UserWarning,
             )
-        elif file_container.header.format in (
-            DXGIFormats.DXGI_FORMAT_BC7_UNORM,
-            DXGIFormats.DXGI_FORMAT_BC7_UNORM_SRGB,
+
+    def _iter_gnrl_records(self) -> Generator[ArchiveRecord, None, None]:
+        """Iterates over the parsed data for GNRL files and yields instances of
+            `ArchiveRecord`.
+
+        Yields:
+            :class:`.ArchiveRecord`: A record of a file contained within the archive
+        """
+        for (filepath, (offset, packed_size, unpacked_size, file_container)) in zip(
+            self.file_names, self._iter_gnrl_files()
         ):
-            # FIXME: There may be a header differnce between BC7_UNORM and
-            # BC7_UNORM_SRGB, but I haven't noticed any
-            # (someone with more experience will have to let me know)
-            pixel_data.update(
-                dict(
-                    dwFlags=dict(DDPF_FOURCC=True),
-                    dwFourCC=MAKEFOURCC("D", "X", "1", "0"),
-                )
+            yield ArchiveRecord(
+                filepath=PureWindowsPath(filepath),
+                container=file_container,
+                offset=offset,
+                packed_size=(packed_size if packed_size > 0 else unpacked_size),
+                unpacked_size=unpacked_size,
+                compression=("zlib" if packed_size > 0 else None),
             )
-            header_data.update(
-                dict(
-                    dwPitchOrLinearSize=(
-                        file_container.header.width * file_container.header.height
-                    )
+
+    def _build_dx10_record(
+        self, filepath: PureWindowsPath, file_container: Container
+    ) -> ArchiveRecord:
+        """Builds an archive record for a given DX10 file container.
+
+        Note:
+            The ``unpacked_size`` of textures with unsupported formats is None, as
+            their DDS headers can't be built.
+
+        Args:
+            filepath (PureWindowsPath): The filepath of the texture
+            file_container (Container): The DX10 file container
+
+        Returns:
+            :class:`.ArchiveRecord`: The archive record
+        """
+        unpacked_size = None
+        dds_headers = self._build_dds_headers(file_container)
+        if dds_headers is not None:
+            (dds_header, dx10_header) = dds_headers
+            unpacked_size = (
+                4
+                + len(dds_header)
+                + len(dx10_header or b"")
+                + sum(
+                    self._chunk_window(tex_chunk)[1]
+                    for tex_chunk in file_container.chunks
                 )
             )
-            dx10_header_data.update(
-                {
-                    "dxgiFormat": file_container.header.format,
-                    "resourceDimension": (
-                        D3D10ResourceDimension.D3D10_RESOURCE_DIMENSION_TEXTURE2D.value
-                    ),
-                    "miscFlag": 0,
-                    "arraySize": 1,
-                    "miscFlags2": 0,
-                }
-            )
-        elif file_container.header.format == DXGIFormats.DXGI_FORMAT_B8G8R8A8_UNORM:
-            pixel_data.update(
-                dict(
-                    dwFlags=dict(DDPF_ALPHA=True, DDPF_RBG=True),
-                    dwRGBBitCount=32,
-                    dwABitMask=0xFF000000,
-                    dwRBitMask=0x00FF0000,
-                    dwGBitMask=0x0000FF00,
-                    dwBBitMask=0x000000FF,
-                )
+
+        return ArchiveRecord(
+            filepath=filepath,
+            container=file_container,
+            offset=file_container.chunks[0].offset,
+            packed_size=sum(
+                (tex_chunk.packed_size or tex_chunk.unpacked_size)
+                for tex_chunk in file_container.chunks
+            ),
+            unpacked_size=unpacked_size,
+            compression=(
+                "zlib"
+                if any(tex_chunk.packed_size > 0 for tex_chunk in file_container.chunks)
+                else None
+            ),
+        )
+
+    def _iter_dx10_records(self) -> Generator[ArchiveRecord, None, None]:
+        """Iterates over the parsed data for DX10 files and yields instances of
+            `ArchiveRecord`.
+
+        Note:
+            Textures with unsupported formats are skipped (with a warning).
+
+        Yields:
+            :class:`.ArchiveRecord`: A record of a file contained within the archive
+        """
+        for (filepath, file_container) in zip(self.file_names, self.files):
+            if not self._build_dds_headers(file_container):
+                continue
+
+            yield self._build_dx10_record(PureWindowsPath(filepath), file_container)
+
+    @staticmethod
+    def _chunk_window(tex_chunk: Container) -> Tuple[int, int]:
+        """Gets the range of a DX10 chunk's unpacked data that belongs to its texture.
+
+        Note:
+            Chunks of textures with selected mipmaps (see
+            :func:`~BTDXArchive.select_mips`) may only partially belong to the
+            texture.
+
+        Args:
+            tex_chunk (Container): The DX10 chunk
+
+        Returns:
+            Tuple[int, int]: The (``offset``, ``size``) of the chunk's unpacked data
+        """
+        return (
+            tex_chunk.get("mip_offset", 0),
+            tex_chunk.get("mip_size", tex_chunk.unpacked_size),
+        )
+
+    @staticmethod
+    def _iter_window(
+        pieces: Iterable[bytes], offset: int, size: int
+    ) -> Generator[bytes, None, None]:
+        """Iterates over a range of the data of the given pieces.
+
+        Args:
+            pieces (Iterable[bytes]): The pieces of the data
+            offset (int): The offset of the range in the data
+            size (int): The size of the range
+
+        Yields:
+            bytes: A piece of the range of the data
+        """
+        (position, end) = (0, offset + size)
+        for piece in pieces:
+            piece_end = position + len(piece)
+            if piece_end > offset:
+                yield piece[max(0, offset - position) : (end - position)]
+            position = piece_end
+            if position >= end:
+                break
+
+    def select_mips(
+        self, record: ArchiveRecord, max_resolution: int = None, mips: slice = None
+    ) -> ArchiveRecord:
+        """Selects a range of the mipmaps of a DX10 texture.
+
+        Reading the returned record only reads the chunks covering the selected
+        mipmaps and rewrites the texture's DDS header to describe them.
+
+        Args:
+            record (ArchiveRecord): The record of the DX10 texture
+            max_resolution (int, optional): Defaults to None.
+                The maximum width and height of the largest selected mipmap
+            mips (slice, optional): Defaults to None.
+                The mipmaps to select, mipmap ``0`` is the full resolution texture
+
+        Raises:
+            ValueError: If the archive is not a DX10 archive, the texture is a cubemap,
+                ``mips`` has a step or no mipmaps are selected
+
+        Returns:
+            :class:`.ArchiveRecord`: A record of the texture with only the selected
+            mipmaps
+
+        Example:
+            >>> FILEPATH = ""  # absolute path to DX10 BTDX archive
+            >>> archive = bethesda_structs.archive.get_archive(FILEPATH)
+            >>> record = archive.find_record("textures\\foo.dds")
+            >>> archive.read_record(archive.select_mips(record, max_resolution=512))
+            ArchiveFile(filepath=PosixPath('textures/foo.dds'))
+        """
+        self._check_select_mips(mips)
+        if record.container.header._unknown_1 == 2049:
+            raise ValueError(
+                f"selecting mipmaps of cubemap {record.filepath} is not supported"
             )
-            header_data.update(
-                dict(
-                    dwPitchOrLinearSize=(
-                        (file_container.header.width * file_container.header.height) * 4
-                    )
-                )
+
+        (first_mip, last_mip) = self._select_mip_range(
+            record.container.header, max_resolution=max_resolution, mips=mips
+        )
+        if first_mip >= last_mip:
+            raise ValueError(f"no mipmaps of {record.filepath} are selected")
+        return self._build_mips_record(record, first_mip, last_mip)
+
+    def _check_select_mips(self, mips: slice):
+        """Checks that mipmaps can be selected in the archive.
+
+        Args:
+            mips (slice): The mipmaps to select
+
+        Raises:
+            ValueError: If the archive is not a DX10 archive or ``mips`` has a step
+        """
+        if self.container.header.type != "DX10":
+            raise ValueError(
+                f"mipmaps can only be selected in DX10 archives, not "
+                f"{self.container.header.type!r} archives"
             )
-        elif file_container.header.format == DXGIFormats.DXGI_FORMAT_R8_UNORM:
-            pixel_data.update(
-                dict(
-                    dwFlags=dict(DDPF_RGB=True), dwRGBBitCount=8, dwRBitMask=0x000000FF
-                )
+        if mips is not None and mips.step not in (None, 1):
+            raise ValueError(
+                f"mipmaps must be selected without a step, recieved {mips!r}"
             )
-            header_data.update(
-                dict(
-                    dwPitchOrLinearSize=(
-                        file_container.header.width * file_container.header.height
+
+    @staticmethod
+    def _select_mip_range(
+        tex_header: Container, max_resolution: int = None, mips: slice = None
+    ) -> Tuple[int, int]:
+        """Gets the range of the mipmaps of a DX10 texture to select.
+
+        Args:
+            tex_header (Container): The header of the DX10 texture
+            max_resolution (int, optional): Defaults to None.
+                The maximum width and height of the largest selected mipmap
+            mips (slice, optional): Defaults to None.
+                The mipmaps to select
+
+        Returns:
+            Tuple[int, int]: The (``first_mip``, ``last_mip``) range of the selected
+            mipmaps, empty if no mipmaps are selected
+        """
+        (first_mip, last_mip, _) = (mips or slice(None)).indices(tex_header.mips_count)
+        if max_resolution is not None:
+            while (first_mip + 1) < last_mip and (
+                max(tex_header.width >> first_mip, tex_header.height >> first_mip)
+                > max_resolution
+            ):
+                first_mip += 1
+        return (first_mip, last_mip)
+
+    def _extract_mips(
+        self, record: ArchiveRecord, max_resolution: int = None, mips: slice = None
+    ) -> ArchiveRecord:
+        """Selects the mipmaps of a DX10 texture to extract from a texture pack.
+
+        Note:
+            Unlike :func:`~BTDXArchive.select_mips` this never fails for a single
+            texture, cubemaps are extracted whole and textures with none of the
+            selected mipmaps are extracted with their smallest mipmap.
+
+        Args:
+            record (ArchiveRecord): The record of the DX10 texture
+            max_resolution (int, optional): Defaults to None.
+                The maximum width and height of the largest selected mipmap
+            mips (slice, optional): Defaults to None.
+                The mipmaps to select
+
+        Returns:
+            :class:`.ArchiveRecord`: A record of the texture to extract
+        """
+        tex_header = record.container.header
+        if tex_header._unknown_1 == 2049:
+            return record
+
+        (first_mip, last_mip) = self._select_mip_range(
+            tex_header, max_resolution=max_resolution, mips=mips
+        )
+        if first_mip >= last_mip:
+            if min(last_mip, tex_header.mips_count) <= 0:
+                return record
+            # NOTE: textures with fewer mipmaps than selected keep their smallest one
+            last_mip = min(last_mip, tex_header.mips_count)
+            first_mip = last_mip - 1
+        return self._build_mips_record(record, first_mip, last_mip)
+
+    def _build_mips_record(
+        self, record: ArchiveRecord, first_mip: int, last_mip: int
+    ) -> ArchiveRecord:
+        """Builds a record of a range of the mipmaps of a DX10 texture.
+
+        Args:
+            record (ArchiveRecord): The record of the DX10 texture
+            first_mip (int): The first selected mipmap
+            last_mip (int): The mipmap after the last selected mipmap
+
+        Returns:
+            :class:`.ArchiveRecord`: A record of the texture with only the selected
+            mipmaps
+        """
+        tex_header = record.container.header
+        mip_sizes = get_mip_sizes(
+            tex_header.format,
+            tex_header.width,
+            tex_header.height,
+            tex_header.mips_count,
+        )
+        tex_chunks = []
+        for tex_chunk in record.container.chunks:
+            start_mip = max(tex_chunk.start_mip, first_mip)
+            end_mip = min(tex_chunk.end_mip + 1, last_mip)
+            if start_mip < end_mip:
+                tex_chunks.append(
+                    Container(
+                        tex_chunk,
+                        mip_offset=sum(mip_sizes[tex_chunk.start_mip : start_mip]),
+                        mip_size=sum(mip_sizes[start_mip:end_mip]),
                     )
                 )
-            )
-        else:
-            warnings.warn(
-                (
-                    f"unsupported DXGI format "
-                    f"{DXGIFormats(file_container.header.format).name}, "
-                    f"please create an issue on {__version__.__repo__} if you see this"
+
+        return self._build_dx10_record(
+            record.filepath,
+            Container(
+                header=Container(
+                    tex_header,
+                    width=max(1, tex_header.width >> first_mip),
+                    height=max(1, tex_header.height >> first_mip),
+                    mips_count=(last_mip - first_mip),
+                    chunks_count=len(tex_chunks),
                 ),
-                UserWarning,
-            )
-            return
+                chunks=tex_chunks,
+            ),
+        )
 
-        header_data.update({"ddspf": pixel_data})
-        dx10_header = None
-        if len(dx10_header_data) > 0:
-            dx10_header = DDS_HEADER_DX10.build(dx10_header_data)
-        return (DDS_HEADER.build(header_data), dx10_header)
+    def _read_gnrl_record(
+        self, record: ArchiveRecord, read: Callable[[int, int], memoryview]
+    ) -> ArchiveFile:
+        """Reads the GNRL file referenced by a given record.
 
-    def _iter_gnrl_files(self) -> Generator[ArchiveFile, None, None]:
-        """Iterates over the parsed data for GNRL fiels and yields instances of
-            `ArchiveFile`.
+        Args:
+            record (ArchiveRecord): The record to read
+            read (Callable[[int, int], memoryview]): A callable that reads
+                (``offset``, ``size``) bytes of the archive's content
 
-        Raises:
-            ValueError: If a filename cannot be determined for a specific file record
+        Returns:
+            :class:`.ArchiveFile`: The file referenced by the record
+        """
+        file_data = self._decompress(
+            read(record.offset, record.packed_size),
+            record.compression,
+            size=record.unpacked_size,
+        )
+        return ArchiveFile(filepath=record.filepath, data=file_data)
 
-        Yields:
-            :class:`.ArchiveFile`: A file contained within the archive
+    def _read_dx10_record(
+        self, record: ArchiveRecord, read: Callable[[int, int], memoryview]
+    ) -> ArchiveFile:
+        """Reads the DX10 file referenced by a given record.
+
+        Args:
+            record (ArchiveRecord): The record to read
+            read (Callable[[int, int], memoryview]): A callable that reads
+                (``offset``, ``size``) bytes of the archive's content
+
+        Returns:
+            :class:`.ArchiveFile`: The file referenced by the record
         """
-        filename_offset = 0
-        for file_container in self.container.files:
-            filepath_content = self.content[
-                (self.container.header.names_offset + filename_offset) :
-            ]
-            filepath = PascalString(VarInt, "utf8").parse(filepath_content)
-            # filename offset increased by length of parsed string accounting for
-            # prefix and suffix bytes
-            filename_offset += len(filepath) + 2
-
-            file_data = self.content[
-                file_container.offset : (
-                    file_container.offset + file_container.unpacked_size
+        file_container = record.container
+        (dds_header, dx10_header) = self._build_dds_headers(file_container)
+
+        # NOTE: chunks are decompressed at their known size and joined once, so the
+        # texture is copied a single time regardless of its number of chunks
+        dds_content = [b"DDS ", dds_header, dx10_header or b""]
+        for tex_chunk in file_container.chunks:
+            (mip_offset, mip_size) = self._chunk_window(tex_chunk)
+            if tex_chunk.packed_size > 0:
+                chunk_data = self._decompress(
+                    read(tex_chunk.offset, tex_chunk.packed_size),
+                    "zlib",
+                    size=tex_chunk.unpacked_size,
                 )
-            ]
-            if file_container.packed_size > 0:
-                file_data = Compressed(GreedyBytes, "zlib").parse(file_data)
+                dds_content.append(chunk_data[mip_offset : (mip_offset + mip_size)])
+            else:
+                dds_content.append(read(tex_chunk.offset + mip_offset, mip_size))
 
-            yield ArchiveFile(filepath=PureWindowsPath(filepath[1:]), data=file_data)
+        return ArchiveFile(filepath=record.filepath, data=b"".join(dds_content))
 
-    def _iter_dx10_files(self) -> Generator[ArchiveFile, None, None]:
-        """Iterates over the parsed data for DX10 archives and yields instances of
-            `ArchiveFile`.
+    def _stored_range(self, record: ArchiveRecord) -> Tuple[int, int]:
+        """Gets the range of the archive's content that is the file's data as-is.
 
-        Raises:
-            ValueError: If a filename cannot be determined for a specific file record
+        Args:
+            record (ArchiveRecord): The record of the file
+
+        Returns:
+            Tuple[int, int]: The (``offset``, ``size``) of the file's data, None if
+            the file's data is compressed or is a DX10 texture
+        """
+        if self.container.header.type == "GNRL" and not record.compression:
+            return (record.offset, record.packed_size)
+
+    def _packed_range(self, record: ArchiveRecord) -> Tuple[int, int]:
+        """Gets the range of the archive's content that the file's data is read from.
+
+        Args:
+            record (ArchiveRecord): The record of the file
+
+        Returns:
+            Tuple[int, int]: The (``offset``, ``size``) of the file's stored data, None
+            if the file is a DX10 texture (which is read from its chunks)
+        """
+        if self.container.header.type == "GNRL":
+            return (record.offset, record.packed_size)
+
+    def _iter_packed(
+        self, record: ArchiveRecord, buffer_size: int = STREAM_BUFFER_SIZE
+    ) -> Generator[bytes, None, None]:
+        """Iterates over the stored (maybe compressed) data of a file in pieces.
+
+        Note:
+            The stored data of DX10 textures is their built DDS headers followed by
+            the stored data of each of their chunks.
+
+        Args:
+            record (ArchiveRecord): The record of the file
+            buffer_size (int, optional): Defaults to ``STREAM_BUFFER_SIZE``.
+                The size of the pieces to read
 
         Yields:
-            :class:`.ArchiveFile`: A file contained within the archive
+            bytes: A piece of the file's stored data
         """
-        filename_offset = 0
-        for file_container in self.container.files:
+        if self.container.header.type == "GNRL":
+            yield from super()._iter_packed(record, buffer_size=buffer_size)
+            return
 
-            filepath_content = self.content[
-                (self.container.header.names_offset + filename_offset) :
-            ]
-            filepath = PascalString(Int16ul, "utf8").parse(filepath_content)
-            filename_offset += len(filepath) + 2
-
-            (dds_header, dx10_header) = self._build_dds_headers(file_container)
-            if dds_header:
-                dds_content = b"DDS "
-                dds_content += dds_header
-
-                if dx10_header:
-                    dds_content += dx10_header
-
-                for tex_chunk in file_container.chunks:
-                    if tex_chunk.packed_size > 0:
-                        dds_content += Compressed(GreedyBytes, "zlib").parse(
-                            self.content[
-                                tex_chunk.offset : (
-                                    tex_chunk.offset + tex_chunk.packed_size
-                                )
-                            ]
-                        )
-                    else:
-                        dds_content += self.content[
-                            tex_chunk.offset : (
-                                tex_chunk.offset + tex_chunk.unpacked_size
-                            )
-                        ]
-
-                yield ArchiveFile(filepath=PureWindowsPath(filepath), data=dds_content)
-
-    def iter_files(self) -> Generator[ArchiveFile, None, None]:
-        """Iterates over the parsed data and yields instances of `ArchiveFile`
+        (dds_header, dx10_header) = self._build_dds_headers(record.container)
+        yield b"DDS " + dds_header + (dx10_header or b"")
+        for tex_chunk in record.container.chunks:
+            yield from self._iter_decompressed(
+                tex_chunk.offset,
+                tex_chunk.packed_size or tex_chunk.unpacked_size,
+                None,
+                buffer_size=buffer_size,
+            )
 
-        Raises:
-            ValueError: If a filename cannot be determined for a specific file record
+    def iter_record_data(
+        self,
+        record: ArchiveRecord,
+        read: Callable[[int, int], memoryview] = None,
+        buffer_size: int = STREAM_BUFFER_SIZE,
+    ) -> Generator[bytes, None, None]:
+        """Iterates over the data of the file referenced by a given record in pieces.
+
+        Args:
+            record (ArchiveRecord): The record to read
+            read (Callable[[int, int], memoryview], optional): Defaults to None.
+                A callable that reads (``offset``, ``size``) bytes of the archive's
+                content, uses the archive's content if None
+            buffer_size (int, optional): Defaults to ``STREAM_BUFFER_SIZE``.
+                The size of the pieces to read and decompress
 
         Yields:
-            :class:`.ArchiveFile`: A file contained within the archive
+            bytes: A piece of the file's data
         """
-        iter_method = {"GNRL": self._iter_gnrl_files, "DX10": self._iter_dx10_files}[
+        if self.container.header.type == "GNRL":
+            yield from self._iter_decompressed(
+                record.offset,
+                record.packed_size,
+                record.compression,
+                read=read,
+                buffer_size=buffer_size,
+            )
+            return
+
+        (dds_header, dx10_header) = self._build_dds_headers(record.container)
+        yield b"DDS " + dds_header + (dx10_header or b"")
+        for tex_chunk in record.container.chunks:
+            (mip_offset, mip_size) = self._chunk_window(tex_chunk)
+            if tex_chunk.packed_size > 0:
+                yield from self._iter_window(
+                    self._iter_decompressed(
+                        tex_chunk.offset,
+                        tex_chunk.packed_size,
+                        "zlib",
+                        read=read,
+                        buffer_size=buffer_size,
+                    ),
+                    mip_offset,
+                    mip_size,
+                )
+            else:
+                yield from self._iter_decompressed(
+                    tex_chunk.offset + mip_offset,
+                    mip_size,
+                    None,
+                    read=read,
+                    buffer_size=buffer_size,
+                )
+
+    def iter_records(self) -> Generator[ArchiveRecord, None, None]:
+        """Iterates over the parsed data and yields instances of `ArchiveRecord`.
+
+        Yields:
+            :class:`.ArchiveRecord`: A record of a file contained within the archive
+        """
+        iter_method = {
+            "GNRL": self._iter_gnrl_records,
+            "DX10": self._iter_dx10_records,
+        }[self.container.header.type]
+        for record in iter_method():
+            yield record
+
+    def _build_index_table(self) -> Tuple["numpy.ndarray", List[str]]:
+        """Builds the index table of the archive from its raw file records.
+
+        Note:
+            GNRL records are fixed-size and decoded with :func:`numpy.frombuffer`
+            directly from the archive's content.
+            DX10 records vary in size by their chunk count, so their table is built
+            from the parsed file table.
+            Like the raw file records, this includes textures with unsupported formats
+            (which have no record), their ``unpacked_size`` is ``0``.
+
+        Returns:
+            Tuple[numpy.ndarray, List[str]]: A tuple of the structured array and its
+            table of filepaths
+        """
+        header = self.container.header
+        if header.type != "GNRL":
+            (table, filepaths) = self._tabulate_records(
+                [
+                    self._build_dx10_record(PureWindowsPath(file_name), file_container)
+                    for (file_name, file_container) in zip(self.file_names, self.files)
+                ]
+            )
+            table["dir_hash"] = [
+                file_container.header.directory_hash for file_container in self.files
+            ]
+            table["file_hash"] = [
+                file_container.header.hash for file_container in self.files
+            ]
+            return (table, filepaths)
+
+        file_records = numpy.frombuffer(
+            self._read(
+                self.header_struct.sizeof(), header.file_count * self._packed_file.size
+            ),
+            dtype=self._file_dtype,
+        ).copy()
+
+        table = numpy.zeros(len(file_records), dtype=INDEX_TABLE_DTYPE)
+        table["offset"] = file_records["offset"]
+        # NOTE: uncompressed GNRL files have a packed size of 0
+        table["compressed"] = file_records["packed_size"] > 0
+        table["packed_size"] = numpy.where(
+            table["compressed"],
+            file_records["packed_size"],
+            file_records["unpacked_size"],
+        )
+        table["unpacked_size"] = file_records["unpacked_size"]
+        table["dir_hash"] = file_records["directory_hash"]
+        table["file_hash"] = file_records["hash"]
+        table["name_id"] = numpy.arange(len(table))
+        return (
+            table,
+            [str(PureWindowsPath(file_name)) for file_name in self.file_names],
+        )
+
+    def read_record(
+        self, record: ArchiveRecord, read: Callable[[int, int], memoryview] = None
+    ) -> ArchiveFile:
+        """Reads the file referenced by a given record.
+
+        Args:
+            record (ArchiveRecord): The record to read
+            read (Callable[[int, int], memoryview], optional): Defaults to None.
+                A callable that reads (``offset``, ``size``) bytes of the archive's
+                content, uses the archive's content if None
+
+        Returns:
+            :class:`.ArchiveFile`: The file referenced by the record
+        """
+        read_method = {"GNRL": self._read_gnrl_record, "DX10": self._read_dx10_record}[
             self.container.header.type
         ]
-        for archive_file in iter_method():
-            yield archive_file
+        return read_method(record, read or self._read)
+
+    def extract(
+        self,
+        to_dir: str,
+        progress_hook: Callable[[int, int, str], None] = None,
+        workers: int = 1,
+        executor: str = "thread",
+        include: T_RecordPattern = None,
+        exclude: T_RecordPattern = None,
+        predicate: Callable[[ArchiveRecord], bool] = None,
+        max_resolution: int = None,
+        mips: slice = None,
+        mode: str = "full",
+    ):
+        """Extracts the content of the `BTDXArchive` to the given directory.
+
+        Note:
+            See :func:`~.BaseArchive.extract` for the common arguments.
+            Textures can be extracted with only some of their mipmaps (see
+            :func:`~BTDXArchive.select_mips`), in which case only the chunks covering
+            those mipmaps are read.
+            Cubemaps are extracted whole and textures with none of the selected
+            mipmaps are extracted with their smallest mipmap, so a single texture
+            never fails the extraction of a texture pack.
+
+        Args:
+            to_dir (str): The directory to extract the content to
+            progress_hook (Callable[[int, int, str], None], optional): Defaults to None.
+                A progress hook that should expect (``current``, ``total``,
+                ``current_filepath``) as arguments
+            workers (int, optional): Defaults to 1.
+                The number of threads (or processes) to decompress and write files
+                with
+            executor (str, optional): Defaults to "thread".
+                The type of workers to extract with, one of ``thread`` or
+                ``process`` (requires the archive to have a ``filepath``)
+            include (T_RecordPattern, optional): Defaults to None.
+                Glob patterns or regular expressions of files to extract
+            exclude (T_RecordPattern, optional): Defaults to None.
+                Glob patterns or regular expressions of files to not extract
+            predicate (Callable[[ArchiveRecord], bool], optional): Defaults to None.
+                A callable that returns True if the file of a given record should be
+                extracted
+            max_resolution (int, optional): Defaults to None.
+                The maximum width and height of extracted DX10 textures
+            mips (slice, optional): Defaults to None.
+                The mipmaps of DX10 textures to extract
+            mode (str, optional): Defaults to "full".
+                The extraction mode, one of ``full`` or ``incremental``
+
+        Raises:
+            ValueError: If mipmaps are selected for a GNRL archive or ``mips`` has a
+                step
+
+        Example:
+            >>> FILEPATH = ""  # absolute path to DX10 BTDX archive
+            >>> archive = bethesda_structs.archive.get_archive(FILEPATH)
+            >>> archive.extract('/home/username/Downloads/previews', max_resolution=256)
+        """
+        if max_resolution is None and mips is None:
+            return super().extract(
+                to_dir,
+                progress_hook=progress_hook,
+                workers=workers,
+                executor=executor,
+                include=include,
+                exclude=exclude,
+                predicate=predicate,
+                mode=mode,
+            )
+
+        self._check_select_mips(mips)
+        filter_record = record_filter(
+            include=include, exclude=exclude, predicate=predicate
+        )
+        self._extract_records(
+            to_dir,
+            [
+                self._extract_mips(record, max_resolution=max_resolution, mips=mips)
+                for record in self.records
+                if filter_record(record)
+            ],
+            progress_hook=progress_hook,
+            workers=workers,
+            executor=executor,
+            mode=mode,
+        )
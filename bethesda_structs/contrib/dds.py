@@ -1,7 +1,10 @@
 # Copyright (c) 2018 Stephen Bunn <stephen@bunn.io>
 # MIT License <https://choosealicense.com/licenses/mit/>
 
+import struct
 from enum import IntEnum
+from typing import List, Tuple
+from functools import lru_cache
 
 from construct import Enum, Array, Const, Struct, Default, Int32ul, FlagsEnum
 
@@ -300,3 +303,227 @@ DDS_HEADER_DX10 = Struct(
 **Reference**:
     `Microsoft <https://goo.gl/1RM6MV>`__
 """
+
+DDS_HEADER_FLAGS = 0x000A1007
+"""The ``DDS_HEADER`` flags of built headers.
+
+Includes ``DDSD_CAPS``, ``DDSD_HEIGHT``, ``DDSD_WIDTH``, ``DDSD_PIXELFORMAT``,
+``DDSD_MIPMAPCOUNT`` and ``DDSD_LINEARSIZE``.
+"""
+
+DDS_HEADER_CAPS = 0x00401008
+"""The ``DDS_HEADER`` caps of built headers.
+
+Includes ``DDSCAPS_COMPLEX``, ``DDSCAPS_TEXTURE`` and ``DDSCAPS_MIPMAP``.
+"""
+
+DDS_HEADER_CUBEMAP_CAPS2 = 0x0000FE00
+"""The ``DDS_HEADER`` caps2 of built cubemap headers.
+
+Includes ``DDSCAPS2_CUBEMAP`` and all 6 ``DDSCAPS2_CUBEMAP_*`` faces.
+"""
+
+DDS_PIXELFORMATS = {
+    DXGIFormats.DXGI_FORMAT_BC1_UNORM: (0x4, MAKEFOURCC(*"DXT1"), 0, 0, 0, 0, 0),
+    DXGIFormats.DXGI_FORMAT_BC2_UNORM: (0x4, MAKEFOURCC(*"DXT3"), 0, 0, 0, 0, 0),
+    DXGIFormats.DXGI_FORMAT_BC3_UNORM: (0x4, MAKEFOURCC(*"DXT5"), 0, 0, 0, 0, 0),
+    DXGIFormats.DXGI_FORMAT_BC5_UNORM: (0x4, MAKEFOURCC(*"ATI2"), 0, 0, 0, 0, 0),
+    DXGIFormats.DXGI_FORMAT_BC7_UNORM: (0x4, MAKEFOURCC(*"DX10"), 0, 0, 0, 0, 0),
+    DXGIFormats.DXGI_FORMAT_BC7_UNORM_SRGB: (0x4, MAKEFOURCC(*"DX10"), 0, 0, 0, 0, 0),
+    DXGIFormats.DXGI_FORMAT_B8G8R8A8_UNORM: (
+        0x42,
+        0,
+        32,
+        0x00FF0000,
+        0x0000FF00,
+        0x000000FF,
+        0xFF000000,
+    ),
+    DXGIFormats.DXGI_FORMAT_R8_UNORM: (0x40, 0, 8, 0x000000FF, 0, 0, 0),
+}
+"""The ``DDS_PIXELFORMAT`` fields of DXGI formats that headers can be built for.
+
+Each format maps to its (``dwFlags``, ``dwFourCC``, ``dwRGBBitCount``,
+``dwRBitMask``, ``dwGBitMask``, ``dwBBitMask``, ``dwABitMask``).
+"""
+
+DDS_LINEAR_SIZES = {
+    DXGIFormats.DXGI_FORMAT_BC1_UNORM: (1, 2),
+    DXGIFormats.DXGI_FORMAT_B8G8R8A8_UNORM: (4, 1),
+}
+"""The (``numerator``, ``denominator``) of bytes per pixel of DXGI formats.
+
+Formats not listed here use 1 byte per pixel.
+"""
+
+DDS_BLOCK_SIZES = {
+    DXGIFormats.DXGI_FORMAT_BC1_UNORM: 8,
+    DXGIFormats.DXGI_FORMAT_BC2_UNORM: 16,
+    DXGIFormats.DXGI_FORMAT_BC3_UNORM: 16,
+    DXGIFormats.DXGI_FORMAT_BC5_UNORM: 16,
+    DXGIFormats.DXGI_FORMAT_BC7_UNORM: 16,
+    DXGIFormats.DXGI_FORMAT_BC7_UNORM_SRGB: 16,
+}
+"""The bytes per 4x4 block of block compressed DXGI formats.
+"""
+
+DDS_PIXEL_SIZES = {
+    DXGIFormats.DXGI_FORMAT_B8G8R8A8_UNORM: 4,
+    DXGIFormats.DXGI_FORMAT_R8_UNORM: 1,
+}
+"""The bytes per pixel of uncompressed DXGI formats.
+"""
+
+_DDS_HEADER_STRUCT = struct.Struct("<7I44x8I5I")
+_DDS_HEADER_DX10_STRUCT = struct.Struct("<5I")
+
+DDS_HEADERS_SIZE = 4 + _DDS_HEADER_STRUCT.size + _DDS_HEADER_DX10_STRUCT.size
+"""The maximum size of the magic and headers of a DDS file.
+"""
+
+
+@lru_cache(maxsize=256)
+def build_dds_headers(
+    dxgi_format: int, width: int, height: int, mips_count: int, cubemap: bool = False
+) -> Tuple[bytes, bytes]:
+    """Builds the ``DDS_HEADER`` and ``DDS_HEADER_DX10`` for a texture.
+
+    Note:
+        Headers are packed directly and cached by the given fields, the result is
+        identical to building :data:`DDS_HEADER` and :data:`DDS_HEADER_DX10`.
+
+    Args:
+        dxgi_format (int): The DXGI format of the texture
+        width (int): The width of the texture
+        height (int): The height of the texture
+        mips_count (int): The number of mipmaps in the texture
+        cubemap (bool, optional): Defaults to False.
+            If True, the texture is a cubemap with all 6 faces
+
+    Raises:
+        ValueError: If headers can't be built for the given DXGI format
+
+    Returns:
+        Tuple[bytes, bytes]: A tuple of ``DDS_HEADER`` and ``DDS_HEADER_DX10``
+        (maybe None)
+    """
+    if dxgi_format not in DDS_PIXELFORMATS:
+        raise ValueError(f"unsupported DXGI format {DXGIFormats(dxgi_format).name}")
+
+    (numerator, denominator) = DDS_LINEAR_SIZES.get(dxgi_format, (1, 1))
+    dds_header = _DDS_HEADER_STRUCT.pack(
+        124,
+        DDS_HEADER_FLAGS,
+        height,
+        width,
+        (width * height * numerator) // denominator,
+        0,
+        mips_count,
+        32,
+        *DDS_PIXELFORMATS[dxgi_format],
+        DDS_HEADER_CAPS,
+        (DDS_HEADER_CUBEMAP_CAPS2 if cubemap else 0),
+        0,
+        0,
+        0,
+    )
+
+    dx10_header = None
+    if DDS_PIXELFORMATS[dxgi_format][1] == MAKEFOURCC(*"DX10"):
+        dx10_header = _DDS_HEADER_DX10_STRUCT.pack(
+            dxgi_format,
+            D3D10ResourceDimension.D3D10_RESOURCE_DIMENSION_TEXTURE2D,
+            0,
+            1,
+            0,
+        )
+    return (dds_header, dx10_header)
+
+
+def parse_dds_headers(content: bytes) -> Tuple[int, int, int, int, bool, int]:
+    """Parses the fields of a DDS file's headers that textures are built from.
+
+    This is the inverse of :func:`build_dds_headers`, the DXGI format of DDS files
+    without a ``DDS_HEADER_DX10`` is resolved from their ``DDS_PIXELFORMAT``.
+
+    Args:
+        content (bytes): The content of the DDS file (at least its first
+            ``DDS_HEADERS_SIZE`` bytes)
+
+    Raises:
+        ValueError: If the content is not a DDS file or its format is not supported
+
+    Returns:
+        Tuple[int, int, int, int, bool, int]: A tuple of (``dxgi_format``, ``width``,
+        ``height``, ``mips_count``, ``cubemap``, ``data_offset``)
+    """
+    if len(content) < (4 + _DDS_HEADER_STRUCT.size) or content[:4] != b"DDS ":
+        raise ValueError("content is not a DDS file")
+
+    (_, _, height, width, _, _, mips_count, _, *pixel_format, _, caps2) = (
+        _DDS_HEADER_STRUCT.unpack_from(content, 4)[:17]
+    )
+    data_offset = 4 + _DDS_HEADER_STRUCT.size
+
+    dxgi_format = None
+    if pixel_format[1] == MAKEFOURCC(*"DX10"):
+        if len(content) < (data_offset + _DDS_HEADER_DX10_STRUCT.size):
+            raise ValueError("content is not a DDS file")
+        (dxgi_format, *_) = _DDS_HEADER_DX10_STRUCT.unpack_from(content, data_offset)
+        data_offset += _DDS_HEADER_DX10_STRUCT.size
+    else:
+        for (format_, format_pixel_format) in DDS_PIXELFORMATS.items():
+            # NOTE: FourCC formats are matched by their FourCC, others by their masks
+            if format_pixel_format[1] == MAKEFOURCC(*"DX10"):
+                continue
+            if (
+                format_pixel_format[1] == pixel_format[1]
+                if format_pixel_format[1]
+                else format_pixel_format[2:] == tuple(pixel_format[2:])
+            ):
+                dxgi_format = format_
+                break
+
+    if dxgi_format not in DDS_PIXELFORMATS:
+        raise ValueError("unsupported DDS pixel format")
+    return (
+        int(dxgi_format),
+        width,
+        height,
+        max(1, mips_count),
+        bool(caps2 & DDS_HEADER_CUBEMAP_CAPS2),
+        data_offset,
+    )
+
+
+def get_mip_sizes(
+    dxgi_format: int, width: int, height: int, mips_count: int
+) -> List[int]:
+    """Gets the size of the data of each mipmap of a texture.
+
+    Args:
+        dxgi_format (int): The DXGI format of the texture
+        width (int): The width of the texture
+        height (int): The height of the texture
+        mips_count (int): The number of mipmaps in the texture
+
+    Raises:
+        ValueError: If the mipmap sizes of the given DXGI format are unknown
+
+    Returns:
+        List[int]: The size of the data of each mipmap (largest first)
+    """
+    mip_sizes = []
+    for mip in range(mips_count):
+        (mip_width, mip_height) = (max(1, width >> mip), max(1, height >> mip))
+        if dxgi_format in DDS_BLOCK_SIZES:
+            mip_sizes.append(
+                ((mip_width + 3) // 4)
+                * ((mip_height + 3) // 4)
+                * DDS_BLOCK_SIZES[dxgi_format]
+            )
+        elif dxgi_format in DDS_PIXEL_SIZES:
+            mip_sizes.append(mip_width * mip_height * DDS_PIXEL_SIZES[dxgi_format])
+        else:
+            raise ValueError(f"unknown mip sizes of DXGI format {dxgi_format!r}")
+    return mip_sizes
@@ -9,7 +9,7 @@ import setuptools
 
 from bethesda_structs import __version__
 
-INSTALL_REQUIRES = ["construct", "multidict", "attrs", "lz4"]
+INSTALL_REQUIRES = ["construct", "multidict", "attrs", "lz4>=2.0"]
 SETUP_REQUIRES = []
 EXTRAS_REQUIRE = {
     "dev": [
@@ -21,7 +21,8 @@ EXTRAS_REQUIRE = {
         "pytest-cov",
         "pytest-flake8",
         "pytest-sugar",
-    ]
+    ],
+    "numpy": ["numpy"],
 }
 
 
@@ -1,9 +1,24 @@
 # Copyright (c) 2018 Stephen Bunn <stephen@bunn.io>
 # MIT License <https://choosealicense.com/licenses/mit/>
 
-from bethesda_structs.archive import get_archive, AVAILABLE_ARCHIVES
+import os
+import re
+import shutil
+from pathlib import PureWindowsPath
+
+import pytest
+
+from bethesda_structs.archive import (
+    AVAILABLE_ARCHIVES,
+    ArchiveVFS,
+    get_archive,
+    diff_archives,
+    record_filter,
+    find_duplicates,
+)
 from bethesda_structs.archive.bsa import BSAArchive
 from bethesda_structs.archive.btdx import BTDXArchive
+from bethesda_structs.archive._common import ArchiveRecord
 
 
 def test_bsa_get_archive(bsa_file):
@@ -18,3 +33,307 @@ def test_btdx_get_archive(btdx_file):
     assert arch is not None
     assert arch.__class__ in AVAILABLE_ARCHIVES
     assert isinstance(arch, BTDXArchive)
+
+
+def test_get_archive_backend(bsa_file):
+    with get_archive(bsa_file, backend="mmap") as arch:
+        assert isinstance(arch, BSAArchive)
+
+
+def _assert_planned_blocks(arch):
+    blocks = arch._plan_blocks(arch.records, block_size=64 * 1024)
+    assert sum(len(block[-1]) for block in blocks) == len(arch.records)
+    previous_end = 0
+    for (offset, size, records) in blocks:
+        assert offset >= previous_end
+        previous_end = offset + size
+        assert records == sorted(records, key=lambda record: record.offset)
+        for record in records:
+            assert offset <= record.offset
+            assert record.offset + record.packed_size <= offset + size
+
+
+def _assert_index_cache(archive_type, filepath, tmpdir):
+    cache_dir = str(tmpdir.join("cache"))
+    filepath = shutil.copy(filepath, str(tmpdir))
+
+    with archive_type.parse_file(filepath, cache_dir=cache_dir) as arch:
+        records = arch.records
+        data = [arch.read_record(record).data for record in records]
+    assert len(os.listdir(cache_dir)) == 1
+
+    with archive_type.parse_file(filepath, backend="file", cache_dir=cache_dir) as arch:
+        # NOTE: only the header is parsed when records are read from the index cache
+        assert list(arch.container.keys()) == ["header"]
+        assert [
+            (record.filepath, record.offset, record.packed_size, record.container)
+            for record in arch.records
+        ] == [
+            (record.filepath, record.offset, record.packed_size, record.container)
+            for record in records
+        ]
+        assert [arch.read_record(record).data for record in arch.records] == data
+        assert arch.find_record(records[-1].filepath) is arch.records[-1]
+        if archive_type is BSAArchive and arch.file_names is not None:
+            assert arch.file_names == [record.filepath.name for record in records]
+
+    # modifying the archive invalidates the index cache
+    stat = os.stat(filepath)
+    os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    with archive_type.parse_file(filepath, cache_dir=cache_dir) as arch:
+        assert arch._records is None
+        assert len(arch.records) == len(records)
+
+    # corrupt index caches are ignored
+    (cache_filepath,) = [
+        os.path.join(cache_dir, cache_name) for cache_name in os.listdir(cache_dir)
+    ]
+    with open(cache_filepath, "r+b") as stream:
+        stream.seek(-1, os.SEEK_END)
+        last_byte = stream.read(1)
+        stream.seek(-1, os.SEEK_END)
+        stream.write(b"\x00" if last_byte == b"\xff" else b"\xff")
+    with archive_type.parse_file(filepath, cache_dir=cache_dir) as arch:
+        assert arch._records is None
+
+
+def test_bsa_index_cache(bsa_file, tmpdir):
+    _assert_index_cache(BSAArchive, bsa_file, tmpdir)
+
+
+def test_btdx_index_cache(btdx_file, tmpdir):
+    _assert_index_cache(BTDXArchive, btdx_file, tmpdir)
+
+
+def _assert_index_table(arch):
+    pytest.importorskip("numpy")
+    (table, filepaths) = arch.index_table()
+    assert len(table) == len(filepaths) == len(arch.records)
+    assert filepaths == [str(record.filepath) for record in arch.records]
+    assert table["name_id"].tolist() == list(range(len(arch.records)))
+    for (row, record) in zip(table.tolist(), arch.records):
+        (offset, packed_size, unpacked_size, compressed, *_) = row
+        assert offset == record.offset
+        assert packed_size == record.packed_size
+        assert unpacked_size == (record.unpacked_size or 0)
+        assert compressed == bool(record.compression)
+
+
+def test_bsa_index_table(bsa_file):
+    with BSAArchive.parse_file(bsa_file, backend="mmap") as arch:
+        _assert_index_table(arch)
+        (table, _) = arch.index_table()
+        assert table["file_hash"].tolist() == [
+            record.container.hash for record in arch.records
+        ]
+
+
+@pytest.mark.parametrize("version", [104, 105])
+def test_bsa_index_table_built(tmpdir, version):
+    to_filepath = str(tmpdir.join("built.bsa"))
+    BSAArchive.build(
+        to_filepath,
+        [("meshes\\foo.nif", b"foo" * 100), ("textures\\bar.dds", b"bar")],
+        version=version,
+    )
+    with BSAArchive.parse_file(to_filepath) as arch:
+        _assert_index_table(arch)
+
+
+def test_btdx_index_table(btdx_file):
+    with BTDXArchive.parse_file(btdx_file, backend="mmap") as arch:
+        _assert_index_table(arch)
+        (table, _) = arch.index_table()
+        if arch.container.header.type == "GNRL":
+            assert table["file_hash"].tolist() == [
+                record.container.hash for record in arch.records
+            ]
+
+
+def test_bsa_plan_blocks(bsa_file):
+    _assert_planned_blocks(get_archive(bsa_file))
+
+
+def test_btdx_plan_blocks(btdx_file):
+    _assert_planned_blocks(get_archive(btdx_file))
+
+
+@pytest.mark.parametrize(
+    "filepath,include,exclude,expected",
+    [
+        ("textures\\foo\\bar.dds", "textures/**/*.dds", None, True),
+        ("Textures\\bar.DDS", "textures/**/*.dds", None, True),
+        ("textures\\foo\\bar.dds", "textures/*.dds", None, False),
+        ("textures\\foo\\bar.dds", None, "**/*.dds", False),
+        ("textures\\foo\\bar.dds", ["*.nif", "**/bar.*"], None, True),
+        ("meshes\\foo.nif", re.compile(r"meshes/\w+\.nif"), None, True),
+        ("meshes\\foo.nif", "meshes/[!f]oo.nif", None, False),
+    ],
+)
+def test_record_filter(filepath, include, exclude, expected):
+    record = ArchiveRecord(filepath=PureWindowsPath(filepath), container=None)
+    assert record_filter(include=include, exclude=exclude)(record) == expected
+    assert not record_filter(include=include, predicate=lambda record: False)(record)
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_find_duplicates(btdx_file, tmpdir, workers):
+    data = {
+        "meshes\\foo.nif": b"foo" * 1000,
+        "meshes\\copy\\foo.nif": b"foo" * 1000,
+        "meshes\\bar.nif": b"bar" * 1000,
+        "empty.txt": b"",
+    }
+    BSAArchive.build(str(tmpdir.join("zlib.bsa")), data.items(), version=104)
+    BSAArchive.build(str(tmpdir.join("raw.bsa")), data.items(), compress=False)
+    BTDXArchive.build(str(tmpdir.join("gnrl.ba2")), data.items())
+    archives = [
+        get_archive(str(tmpdir.join(filename)), backend="mmap")
+        for filename in ("zlib.bsa", "raw.bsa", "gnrl.ba2")
+    ] + [BTDXArchive.parse_file(btdx_file), BTDXArchive.parse_file(btdx_file)]
+
+    groups = find_duplicates(archives, workers=workers)
+    assert [group.wasted_size for group in groups] == sorted(
+        (group.wasted_size for group in groups), reverse=True
+    )
+    found = {
+        frozenset(
+            (archives.index(archive), str(record.filepath))
+            for (archive, record) in group.records
+        )
+        for group in groups
+    }
+    assert frozenset(
+        (index, filepath)
+        for index in range(3)
+        for filepath in ("meshes\\foo.nif", "meshes\\copy\\foo.nif")
+    ) in found
+    assert frozenset((index, "meshes\\bar.nif") for index in range(3)) in found
+    for record in archives[-1].records:
+        if archives[-1].record_size(record) > 0:
+            assert any(
+                {(3, str(record.filepath)), (4, str(record.filepath))} <= group
+                for group in found
+            )
+    assert all(
+        str(record.filepath) != "empty.txt"
+        for group in groups
+        for (_, record) in group.records
+    )
+    for group in groups:
+        assert group.wasted_size == group.size * (len(group.records) - 1)
+        assert len(
+            {
+                archive.read_record(record).data
+                for (archive, record) in group.records
+            }
+        ) == 1
+
+
+def _assert_never_decompressed(archive, monkeypatch):
+    monkeypatch.setattr(
+        archive,
+        "iter_record_data",
+        lambda record, **kwargs: pytest.fail(f"decompressed {record.filepath}"),
+    )
+
+
+@pytest.mark.parametrize(
+    ("archive_type", "build_options"),
+    [
+        (BSAArchive, dict(version=104)),
+        (BSAArchive, dict(compress=False)),
+        (BTDXArchive, dict()),
+    ],
+)
+@pytest.mark.parametrize("workers", [1, 4])
+def test_diff_archives(tmpdir, monkeypatch, archive_type, build_options, workers):
+    old_data = {
+        "meshes\\foo.nif": b"foo" * 1000,
+        "meshes\\bar.nif": bytes(range(256)) * 16,
+        "readme.txt": b"readme",
+    }
+    new_data = {
+        "meshes\\foo.nif": b"foo" * 1000,
+        # the same size and compressibility, but different data
+        "meshes\\bar.nif": bytes(reversed(range(256))) * 16,
+        "textures\\foo.dds": b"dds" * 1000,
+    }
+    archive_type.build(str(tmpdir.join("old")), old_data.items(), **build_options)
+    archive_type.build(str(tmpdir.join("new")), new_data.items(), **build_options)
+
+    old_archive = archive_type.parse_file(str(tmpdir.join("old")), backend="mmap")
+    new_archive = archive_type.parse_file(str(tmpdir.join("new")), backend="mmap")
+    for archive in (old_archive, new_archive):
+        _assert_never_decompressed(archive, monkeypatch)
+
+    changes = list(diff_archives(old_archive, new_archive, workers=workers))
+    assert [(change.status, str(change.filepath)) for change in changes] == [
+        ("removed", "readme.txt"),
+        ("changed", "meshes\\bar.nif"),
+        ("added", "textures\\foo.dds"),
+    ]
+    assert changes[0].new_record is None and changes[-1].old_record is None
+    assert changes[1].old_record is old_archive.find_record("meshes\\bar.nif")
+    assert list(diff_archives(new_archive, new_archive)) == []
+
+
+def test_diff_archives_same(btdx_file, monkeypatch):
+    old_archive = BTDXArchive.parse_file(btdx_file)
+    new_archive = BTDXArchive.parse_file(btdx_file, backend="mmap")
+    for archive in (old_archive, new_archive):
+        _assert_never_decompressed(archive, monkeypatch)
+    assert list(diff_archives(old_archive, new_archive, workers=2)) == []
+
+
+def test_archive_vfs(tmpdir, monkeypatch):
+    BSAArchive.build(
+        str(tmpdir.join("first.bsa")),
+        [("meshes\\foo.nif", b"first"), ("meshes\\bar.nif", b"bar")],
+    )
+    BTDXArchive.build(
+        str(tmpdir.join("second.ba2")),
+        [("Meshes\\Foo.nif", b"second"), ("textures\\foo.dds", b"dds")],
+    )
+    loose_dir = tmpdir.mkdir("data")
+    loose_dir.mkdir("Meshes").join("FOO.nif").write_binary(b"loose")
+    loose_dir.join("readme.txt").write_binary(b"readme")
+
+    with ArchiveVFS(
+        [
+            str(tmpdir.join("first.bsa")),
+            str(tmpdir.join("second.ba2")),
+            str(loose_dir),
+        ]
+    ) as vfs:
+        (first, second) = vfs.archives
+        # NOTE: lookups must never iterate over any archive
+        for archive in vfs.archives:
+            monkeypatch.setattr(
+                archive, "iter_records", lambda: pytest.fail("iterated records")
+            )
+            archive._records = archive._index = None
+
+        with vfs.open("MESHES/foo.nif") as stream:
+            assert stream.read() == b"loose"
+        with vfs.open("meshes\\bar.nif") as stream:
+            assert stream.read() == b"bar"
+        with vfs.open("textures\\foo.dds") as stream:
+            assert stream.read() == b"dds"
+        assert vfs.resolve("meshes\\bar.nif")[0] is first
+        assert vfs.resolve("textures\\foo.dds")[0] is second
+        assert vfs.resolve("meshes\\foo.nif")[0] is None
+        assert vfs.resolve("meshes\\missing.nif") is None
+
+        assert vfs.exists("Meshes") and vfs.exists("meshes/bar.nif")
+        assert not vfs.exists("sound")
+        assert sorted(vfs.listdir()) == ["meshes", "readme.txt", "textures"]
+        assert sorted(vfs.listdir("MESHES")) == ["bar.nif", "foo.nif"]
+        with pytest.raises(FileNotFoundError):
+            vfs.open("sound\\foo.xwm")
+        with pytest.raises(NotADirectoryError):
+            vfs.listdir("sound")
+
+    tmpdir.join("plugin.esp").write_binary(b"TES4" * 16)
+    with pytest.raises(ValueError):
+        ArchiveVFS([str(tmpdir.join("first.bsa")), str(tmpdir.join("plugin.esp"))])
@@ -1,11 +1,21 @@
 # Copyright (c) 2018 Stephen Bunn <stephen@bunn.io>
 # MIT License <https://choosealicense.com/licenses/mit/>
 
-from pathlib import Path
+import io
+import os
+from pathlib import Path, PureWindowsPath
+
+import pytest
 
 from bethesda_structs._common import BaseFiletype
+from bethesda_structs.archive import record_filter
 from bethesda_structs.archive.bsa import BSAArchive
-from bethesda_structs.archive._common import ArchiveFile, BaseArchive
+from bethesda_structs.archive._common import (
+    ArchiveFile,
+    BaseArchive,
+    LazyArchiveFile,
+    _load_extract_manifest,
+)
 
 
 def test_subclass():
@@ -24,3 +34,406 @@ def test_iter_files(bsa_file):
         assert isinstance(arch_file.filepath, Path)
         assert isinstance(arch_file.data, bytes)
         assert len(arch_file.data) > 0
+
+
+def test_mmap_backend(bsa_file):
+    arch = BSAArchive.parse_file(bsa_file)
+    with BSAArchive.parse_file(bsa_file, backend="mmap") as mmap_arch:
+        for (arch_file, mmap_file) in zip(arch.iter_files(), mmap_arch.iter_files()):
+            assert arch_file.filepath == mmap_file.filepath
+            assert arch_file.data == mmap_file.data
+
+
+def test_file_backend(bsa_file):
+    arch = BSAArchive.parse_file(bsa_file)
+    with BSAArchive.parse_file(bsa_file, backend="file") as file_arch:
+        assert file_arch.content.tell() < os.path.getsize(bsa_file)
+        for (arch_file, lazy_file) in zip(arch.iter_files(), file_arch.iter_files()):
+            assert arch_file.filepath == lazy_file.filepath
+            assert arch_file.data == lazy_file.data
+    assert file_arch.content.closed
+
+
+def test_get(bsa_file):
+    arch = BSAArchive.parse_file(bsa_file)
+    for arch_file in arch.iter_files():
+        filepath = str(PureWindowsPath(arch_file.filepath)).upper()
+        assert filepath in arch
+        assert arch.get(filepath).data == arch_file.data
+        with arch.open(arch_file.filepath.as_posix()) as stream:
+            assert stream.read() == arch_file.data
+    assert arch.get("missing\\file.txt") is None
+    assert "missing\\file.txt" not in arch
+
+
+def test_hash_filepath(bsa_file):
+    arch = BSAArchive.parse_file(bsa_file)
+    for (directory_record, record) in zip(
+        arch.container.directory_records, arch.container.directory_blocks
+    ):
+        assert BSAArchive.hash_name(record.name[:-1]) == directory_record.hash
+    for record in arch.records:
+        assert BSAArchive.hash_filepath(record.filepath)[-1] == record.container.hash
+
+    lookup_arch = BSAArchive.parse_file(bsa_file)
+    assert lookup_arch.find_record(arch.records[-1].filepath) is not None
+    assert lookup_arch._records is None
+
+
+def test_find_record_hash_collision(bsa_file, monkeypatch):
+    arch = BSAArchive.parse_file(bsa_file)
+    record = arch.records[-1]
+    hashes = BSAArchive.hash_filepath(record.filepath)
+    # NOTE: every filepath collides with the hashes of the archive's last file
+    monkeypatch.setattr(
+        BSAArchive, "hash_filepath", classmethod(lambda cls, filepath: hashes)
+    )
+
+    lookup_arch = BSAArchive.parse_file(bsa_file)
+    assert lookup_arch.find_record(str(record.filepath).upper()) is not None
+    assert lookup_arch._records is None
+    assert lookup_arch.find_record(f"{record.filepath}.collision") is None
+
+    (directory, name) = (record.filepath.parent, record.filepath.name)
+    lookup_arch = BSAArchive.parse_file(bsa_file)
+    assert lookup_arch.find_record(f"collision\\{name}") is None
+    assert lookup_arch.find_record(f"{directory}\\collision") is None
+
+
+def test_find_record_unnamed(bsa_file):
+    arch = BSAArchive.parse_file(bsa_file)
+    with open(bsa_file, "rb") as stream:
+        content = bytearray(stream.read())
+    # clear the files_named archive flag
+    content[12] &= ~0x002
+    unnamed_arch = BSAArchive.parse(bytes(content))
+    assert unnamed_arch.file_names is None
+    for record in arch.records:
+        unnamed_record = unnamed_arch.find_record(record.filepath)
+        assert unnamed_record.container == record.container
+        assert unnamed_arch.read_record(unnamed_record).data == arch.get(
+            record.filepath
+        ).data
+    for record in unnamed_arch.records:
+        assert record.filepath.name == f"{record.container.hash:016x}"
+
+
+def test_find_record_built_records(bsa_file):
+    arch = BSAArchive.parse_file(bsa_file)
+    filepath = str(arch.records[0].filepath).upper()
+    # NOTE: only the filepath index (built from the records) is used once they exist
+    assert arch.find_record(filepath) is arch.records[0]
+    assert arch.get(filepath).filepath == Path(arch.records[0].filepath)
+
+
+@pytest.mark.parametrize(
+    "workers,executor", [(1, "thread"), (4, "thread"), (2, "process")]
+)
+def test_extract(bsa_file, tmpdir, workers, executor):
+    arch = BSAArchive.parse_file(bsa_file)
+    progress = []
+    arch.extract(
+        str(tmpdir),
+        progress_hook=lambda *args: progress.append(args),
+        workers=workers,
+        executor=executor,
+    )
+    archive_files = list(arch.iter_files())
+    assert len(progress) == len(archive_files) * 2
+    assert progress[-1][0] == progress[-1][1] == sum(
+        arch_file.size for arch_file in archive_files
+    )
+    for arch_file in archive_files:
+        with open(str(tmpdir.join(*arch_file.filepath.parts)), "rb") as stream:
+            assert stream.read() == arch_file.data
+
+
+def test_extract_processes_mmap(bsa_file, tmpdir):
+    # NOTE: records parsed from a memory-mapped archive must still reach the processes
+    with BSAArchive.parse_file(bsa_file, backend="mmap") as arch:
+        arch.extract(str(tmpdir), workers=2, executor="process")
+        for arch_file in arch.iter_files():
+            with open(str(tmpdir.join(*arch_file.filepath.parts)), "rb") as stream:
+                assert stream.read() == arch_file.data
+
+
+def test_record_size(bsa_file):
+    with BSAArchive.parse_file(bsa_file, backend="file") as arch:
+        for record in arch.records:
+            assert arch.record_size(record) == arch.read_record(record).size
+
+
+def test_read_record_matches_file_struct(bsa_file):
+    with BSAArchive.parse_file(bsa_file) as arch:
+        assert arch.compressed_file_struct is arch.compressed_file_struct
+        for record in arch.records:
+            file_struct = arch.uncompressed_file_struct
+            if record.compression:
+                file_struct = arch.compressed_file_struct
+            stored = arch._read(record.offset, record.packed_size)
+            assert arch.read_record(record).data == file_struct.parse(stored).data
+
+
+def test_extract_file_backend(bsa_file, tmpdir):
+    with BSAArchive.parse_file(bsa_file, backend="file") as arch:
+        arch.extract(str(tmpdir))
+        for arch_file in arch.iter_files():
+            with open(str(tmpdir.join(*arch_file.filepath.parts)), "rb") as stream:
+                assert stream.read() == arch_file.data
+
+
+def test_extract_filtered(bsa_file, tmpdir, monkeypatch):
+    arch = BSAArchive.parse_file(bsa_file)
+    include = f"**/*{arch.records[0].filepath.suffix}"
+    expected = [
+        record.filepath for record in arch.records if record_filter(include)(record)
+    ]
+
+    read_records = []
+    iter_record_data = arch.iter_record_data
+    monkeypatch.setattr(
+        arch,
+        "iter_record_data",
+        lambda record, **kwargs: read_records.append(record.filepath)
+        or iter_record_data(record, **kwargs),
+    )
+    arch.extract(str(tmpdir), include=include)
+    assert sorted(read_records) == sorted(expected)
+    assert len(tmpdir.listdir()) > 0
+
+    assert list(arch.iter_files(filter=lambda record: False)) == []
+
+
+def test_extract_size_predicate(bsa_file, tmpdir):
+    arch = BSAArchive.parse_file(bsa_file)
+    max_size = sorted(arch.record_size(record) for record in arch.records)[
+        len(arch.records) // 2
+    ]
+    arch = BSAArchive.parse_file(bsa_file)
+    arch.extract(str(tmpdir), predicate=lambda record: record.unpacked_size < max_size)
+    for record in arch.records:
+        assert tmpdir.join(*record.filepath.parts).check() == (
+            arch.record_size(record) < max_size
+        )
+
+    assert all(
+        archive_file.size < max_size
+        for archive_file in BSAArchive.parse_file(bsa_file).iter_files(
+            filter=lambda record: record.unpacked_size < max_size
+        )
+    )
+
+
+def test_iter_files_lazy(bsa_file, monkeypatch):
+    arch = BSAArchive.parse_file(bsa_file)
+    data = {arch_file.filepath: arch_file.data for arch_file in arch.iter_files()}
+
+    def fail_read_record(*args, **kwargs):
+        raise AssertionError("read_record should not be called")
+
+    monkeypatch.setattr(arch, "read_record", fail_read_record)
+    for arch_file in arch.iter_files():
+        assert isinstance(arch_file, LazyArchiveFile)
+        assert arch_file.size == len(data[arch_file.filepath])
+        assert arch_file.offset == arch_file.record.offset
+        assert arch_file.compression in (None, "zlib", "lz4")
+
+    monkeypatch.undo()
+    for arch_file in arch.iter_files():
+        with arch_file.open() as stream:
+            assert stream.read() == data[arch_file.filepath]
+
+
+@pytest.mark.parametrize("buffer_size", [257, 65536])
+def test_write_record(bsa_file, buffer_size):
+    arch = BSAArchive.parse_file(bsa_file)
+    for record in arch.records:
+        stream = io.BytesIO()
+        written_size = arch.write_record(record, stream, buffer_size=buffer_size)
+        assert written_size == arch.record_size(record)
+        assert stream.getvalue() == arch.read_record(record).data
+
+
+@pytest.mark.parametrize("buffer_size", [257, 65536])
+def test_write_record_lz4(tmpdir, buffer_size):
+    # NOTE: none of the fixtures are v105 archives (which compress files with lz4)
+    data = bytes(1024 * 1024) + os.urandom(4096)
+    to_filepath = str(tmpdir.join("built.bsa"))
+    BSAArchive.build(to_filepath, [("meshes\\foo.nif", data)], version=105)
+
+    with BSAArchive.parse_file(to_filepath) as arch:
+        record = arch.find_record("meshes\\foo.nif")
+        assert record.compression == "lz4"
+        stream = io.BytesIO()
+        assert arch.write_record(record, stream, buffer_size=buffer_size) == len(data)
+        assert stream.getvalue() == data
+        # highly compressed data is still decompressed in bounded pieces
+        assert all(
+            len(piece) <= buffer_size
+            for piece in arch.iter_record_data(record, buffer_size=buffer_size)
+        )
+
+
+def test_open_stream(bsa_file):
+    with BSAArchive.parse_file(bsa_file, backend="file") as arch:
+        for record in arch.records:
+            data = arch.read_record(record).data
+            with arch.open(record.filepath) as stream:
+                assert stream.read(4) == data[:4]
+                assert stream.tell() == min(4, len(data))
+                assert stream.read() == data[4:]
+                assert stream.read() == b""
+                assert stream.seekable() == (record.compression is None)
+                if stream.seekable():
+                    stream.seek(-(len(data) // 2), io.SEEK_END)
+                    assert stream.read() == data[len(data) - (len(data) // 2) :]
+
+
+@pytest.mark.parametrize("version", [104, 105])
+@pytest.mark.parametrize("compress", [True, False])
+@pytest.mark.parametrize("workers", [1, 4])
+def test_build(bsa_file, tmpdir, version, compress, workers):
+    arch = BSAArchive.parse_file(bsa_file)
+    data = {str(record.filepath): arch.read_record(record).data for record in arch.records}
+    to_filepath = str(tmpdir.join("built.bsa"))
+    BSAArchive.build(
+        to_filepath,
+        [(filepath, io.BytesIO(file_data)) for (filepath, file_data) in data.items()],
+        version=version,
+        compress=compress,
+        workers=workers,
+    )
+
+    with BSAArchive.parse_file(to_filepath) as built_arch:
+        assert built_arch.container.header.version == version
+        assert {
+            str(record.filepath): built_arch.read_record(record).data
+            for record in built_arch.records
+        } == data
+        directory_hashes = [
+            directory_record.hash
+            for directory_record in built_arch.container.directory_records
+        ]
+        assert directory_hashes == sorted(directory_hashes)
+        for directory_block in built_arch.container.directory_blocks:
+            file_hashes = [
+                file_record.hash for file_record in directory_block.file_records
+            ]
+            assert file_hashes == sorted(file_hashes)
+        for filepath in data:
+            assert built_arch.find_record(filepath).filepath == PureWindowsPath(filepath)
+    assert tmpdir.listdir() == [tmpdir.join("built.bsa")]
+
+
+def test_build_uncompressed_identical(bsa_file, tmpdir):
+    arch = BSAArchive.parse_file(bsa_file)
+    if arch.container.header.version != 105 or any(
+        record.compression for record in arch.records
+    ):
+        pytest.skip("archive is not an uncompressed v105 archive")
+
+    to_filepath = str(tmpdir.join("built.bsa"))
+    BSAArchive.build(
+        to_filepath,
+        [(record.filepath, arch.read_record(record).data) for record in arch.records],
+        compress=False,
+    )
+    with open(bsa_file, "rb") as stream, open(to_filepath, "rb") as built_stream:
+        (content, built_content) = (stream.read(), built_stream.read())
+    # NOTE: the archive flags, file flags and unknown values may differ
+    blocks_offset = 36 + (arch.container.header.directory_count * 24)
+    for (start, end) in ((0, 12), (16, 32), (blocks_offset, None)):
+        assert built_content[start:end] == content[start:end]
+    with BSAArchive.parse_file(to_filepath) as built_arch:
+        assert [
+            (record.hash, record.file_count, record.name_offset)
+            for record in built_arch.container.directory_records
+        ] == [
+            (record.hash, record.file_count, record.name_offset)
+            for record in arch.container.directory_records
+        ]
+
+
+def test_build_directory(tmpdir):
+    source_dir = tmpdir.mkdir("source")
+    source_dir.mkdir("meshes").join("foo.nif").write_binary(b"nif" * 100)
+    source_dir.join("readme.txt").write_binary(b"")
+    to_filepath = str(tmpdir.join("built.bsa"))
+    BSAArchive.build(to_filepath, str(source_dir), version=104)
+
+    with BSAArchive.parse_file(to_filepath) as arch:
+        assert arch.get("meshes\\foo.nif").data == b"nif" * 100
+        assert arch.get("readme.txt").data == b""
+        assert arch.container.header.file_flags.nif
+
+    with pytest.raises(ValueError):
+        BSAArchive.build(to_filepath, [("foo.nif", b""), ("FOO.nif", b"")])
+    with pytest.raises(ValueError):
+        BSAArchive.build(to_filepath, [], version=103)
+    with pytest.raises(NotADirectoryError):
+        BSAArchive.build(to_filepath, str(tmpdir.join("missing")))
+
+
+def test_extract_incremental(tmpdir, monkeypatch):
+    source = {
+        "meshes\\foo.nif": b"foo" * 1000,
+        "meshes\\bar.nif": b"bar" * 1000,
+        "readme.txt": b"readme",
+    }
+    to_filepath = str(tmpdir.join("built.bsa"))
+    to_dir = tmpdir.mkdir("extracted")
+
+    def extract(arch) -> list:
+        read_records = []
+        iter_record_data = arch.iter_record_data
+        monkeypatch.setattr(
+            arch,
+            "iter_record_data",
+            lambda record, **kwargs: read_records.append(str(record.filepath))
+            or iter_record_data(record, **kwargs),
+        )
+        arch.extract(str(to_dir), mode="incremental")
+        for (filepath, data) in source.items():
+            assert to_dir.join(*PureWindowsPath(filepath).parts).read_binary() == data
+        return sorted(read_records)
+
+    BSAArchive.build(to_filepath, source.items())
+    with BSAArchive.parse_file(to_filepath, backend="mmap") as arch:
+        checksummed = []
+        checksum_record = arch._checksum_record
+        monkeypatch.setattr(
+            arch,
+            "_checksum_record",
+            lambda record: checksummed.append(record) or checksum_record(record),
+        )
+        # checksums are computed while extracting rather than read again
+        assert extract(arch) == sorted(source.keys())
+        assert checksummed == []
+        assert to_dir.join(".built.bsa.manifest.json").check(file=1)
+        (_, manifest) = _load_extract_manifest(
+            str(to_dir.join(".built.bsa.manifest.json"))
+        )
+        assert {
+            filepath: extracted.checksum for (filepath, extracted) in manifest.items()
+        } == {
+            record.filepath.as_posix(): checksum_record(record)
+            for record in arch.records
+        }
+
+        # an unchanged archive's stored data is never read
+        assert extract(arch) == []
+        assert checksummed == []
+
+        to_dir.join("readme.txt").write_binary(b"changed on disk")
+        assert extract(arch) == ["readme.txt"]
+
+    # only the changed and added files are decompressed from a rebuilt archive
+    source["meshes\\bar.nif"] = b"baz" * 1000
+    source["textures\\foo.dds"] = b"dds" * 1000
+    BSAArchive.build(to_filepath, source.items())
+    with BSAArchive.parse_file(to_filepath, backend="mmap") as arch:
+        assert extract(arch) == ["meshes\\bar.nif", "textures\\foo.dds"]
+        assert extract(arch) == []
+
+        with pytest.raises(ValueError):
+            arch.extract(str(to_dir), mode="partial")
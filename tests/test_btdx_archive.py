@@ -1,11 +1,23 @@
 # Copyright (c) 2018 Stephen Bunn <stephen@bunn.io>
 # MIT License <https://choosealicense.com/licenses/mit/>
 
-from pathlib import Path
+import io
+import os
+from pathlib import Path, PureWindowsPath
+
+import pytest
+from construct import Container
 
 from bethesda_structs._common import BaseFiletype
+from bethesda_structs.archive import record_filter
 from bethesda_structs.archive.btdx import BTDXArchive
-from bethesda_structs.archive._common import ArchiveFile, BaseArchive
+from bethesda_structs.archive._common import ArchiveFile, BaseArchive, LazyArchiveFile
+from bethesda_structs.contrib.dds import (
+    DDS_HEADER,
+    DXGIFormats,
+    get_mip_sizes,
+    build_dds_headers,
+)
 
 
 def test_subclass():
@@ -24,3 +36,421 @@ def test_iter_files(btdx_file):
         assert isinstance(arch_file.filepath, Path)
         assert isinstance(arch_file.data, bytes)
         assert len(arch_file.data) > 0
+
+
+def test_mmap_backend(btdx_file):
+    arch = BTDXArchive.parse_file(btdx_file)
+    with BTDXArchive.parse_file(btdx_file, backend="mmap") as mmap_arch:
+        for (arch_file, mmap_file) in zip(arch.iter_files(), mmap_arch.iter_files()):
+            assert arch_file.filepath == mmap_file.filepath
+            assert arch_file.data == mmap_file.data
+
+
+def test_file_backend(btdx_file):
+    arch = BTDXArchive.parse_file(btdx_file)
+    with BTDXArchive.parse_file(btdx_file, backend="file") as file_arch:
+        assert file_arch.content.tell() < os.path.getsize(btdx_file)
+        for (arch_file, lazy_file) in zip(arch.iter_files(), file_arch.iter_files()):
+            assert arch_file.filepath == lazy_file.filepath
+            assert arch_file.data == lazy_file.data
+    assert file_arch.content.closed
+
+
+def test_get(btdx_file):
+    arch = BTDXArchive.parse_file(btdx_file)
+    for arch_file in arch.iter_files():
+        filepath = str(PureWindowsPath(arch_file.filepath)).upper()
+        assert filepath in arch
+        assert arch.get(filepath).data == arch_file.data
+        with arch.open(arch_file.filepath.as_posix()) as stream:
+            assert stream.read() == arch_file.data
+    assert arch.get("missing\\file.txt") is None
+    assert "missing\\file.txt" not in arch
+
+
+@pytest.mark.parametrize(
+    "workers,executor", [(1, "thread"), (4, "thread"), (2, "process")]
+)
+def test_extract(btdx_file, tmpdir, workers, executor):
+    arch = BTDXArchive.parse_file(btdx_file)
+    progress = []
+    arch.extract(
+        str(tmpdir),
+        progress_hook=lambda *args: progress.append(args),
+        workers=workers,
+        executor=executor,
+    )
+    archive_files = list(arch.iter_files())
+    assert len(progress) == len(archive_files) * 2
+    assert progress[-1][0] == progress[-1][1] == sum(
+        arch_file.size for arch_file in archive_files
+    )
+    for arch_file in archive_files:
+        with open(str(tmpdir.join(*arch_file.filepath.parts)), "rb") as stream:
+            assert stream.read() == arch_file.data
+
+
+def test_extract_processes_mmap(btdx_file, tmpdir):
+    # NOTE: records parsed from a memory-mapped archive must still reach the processes
+    with BTDXArchive.parse_file(btdx_file, backend="mmap") as arch:
+        arch.extract(str(tmpdir), workers=2, executor="process")
+        for arch_file in arch.iter_files():
+            with open(str(tmpdir.join(*arch_file.filepath.parts)), "rb") as stream:
+                assert stream.read() == arch_file.data
+
+
+def test_record_size(btdx_file):
+    with BTDXArchive.parse_file(btdx_file, backend="file") as arch:
+        for record in arch.records:
+            assert arch.record_size(record) == arch.read_record(record).size
+
+
+def test_file_names(btdx_file):
+    with BTDXArchive.parse_file(btdx_file, backend="file") as arch:
+        assert arch.file_names is arch.file_names
+        assert len(arch.file_names) == arch.container.header.file_count
+        for (record, file_name) in zip(arch.records, arch.file_names):
+            assert record.filepath == PureWindowsPath(file_name)
+            file_header = record.container.get("header", record.container)
+            assert record.filepath.suffix == f".{file_header.ext}"
+
+
+@pytest.mark.parametrize("backend", ["memory", "mmap", "file"])
+@pytest.mark.parametrize("with_numpy", [True, False])
+def test_gnrl_files(btdx_file, backend, with_numpy, monkeypatch):
+    if with_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr("bethesda_structs.archive.btdx.numpy", None)
+
+    with BTDXArchive.parse_file(btdx_file, backend=backend) as arch:
+        if arch.container.header.type != "GNRL":
+            pytest.skip("archive files are not GNRL files")
+
+        # NOTE: records are decoded from the file table without parsing the files
+        records = arch.records
+        assert callable(arch.container.files)
+        # NOTE: record containers are only built from the file table when accessed
+        assert not any(isinstance(record._container, Container) for record in records)
+        assert arch.files is arch.files
+        assert len(arch.files) == len(records)
+        for (record, file_container) in zip(records, arch.files):
+            # NOTE: parsed containers also reference their stream as ``_io``
+            assert list(record.container.items()) == [
+                (key, value) for (key, value) in file_container.items() if key != "_io"
+            ]
+
+
+def test_extract_file_backend(btdx_file, tmpdir):
+    with BTDXArchive.parse_file(btdx_file, backend="file") as arch:
+        arch.extract(str(tmpdir))
+        for arch_file in arch.iter_files():
+            with open(str(tmpdir.join(*arch_file.filepath.parts)), "rb") as stream:
+                assert stream.read() == arch_file.data
+
+
+def test_extract_filtered(btdx_file, tmpdir, monkeypatch):
+    arch = BTDXArchive.parse_file(btdx_file)
+    include = f"**/*{arch.records[0].filepath.suffix}"
+    expected = [
+        record.filepath for record in arch.records if record_filter(include)(record)
+    ]
+
+    read_records = []
+    iter_record_data = arch.iter_record_data
+    monkeypatch.setattr(
+        arch,
+        "iter_record_data",
+        lambda record, **kwargs: read_records.append(record.filepath)
+        or iter_record_data(record, **kwargs),
+    )
+    arch.extract(str(tmpdir), include=include)
+    assert sorted(read_records) == sorted(expected)
+    assert len(tmpdir.listdir()) > 0
+
+    assert list(arch.iter_files(filter=lambda record: False)) == []
+
+
+def test_iter_files_lazy(btdx_file, monkeypatch):
+    arch = BTDXArchive.parse_file(btdx_file)
+    data = {arch_file.filepath: arch_file.data for arch_file in arch.iter_files()}
+
+    def fail_read_record(*args, **kwargs):
+        raise AssertionError("read_record should not be called")
+
+    monkeypatch.setattr(arch, "read_record", fail_read_record)
+    for arch_file in arch.iter_files():
+        assert isinstance(arch_file, LazyArchiveFile)
+        assert arch_file.size == len(data[arch_file.filepath])
+        assert arch_file.offset == arch_file.record.offset
+        assert arch_file.compression in (None, "zlib", "lz4")
+
+    monkeypatch.undo()
+    for arch_file in arch.iter_files():
+        with arch_file.open() as stream:
+            assert stream.read() == data[arch_file.filepath]
+
+
+@pytest.mark.parametrize("buffer_size", [257, 65536])
+def test_write_record(btdx_file, buffer_size):
+    arch = BTDXArchive.parse_file(btdx_file)
+    for record in arch.records:
+        stream = io.BytesIO()
+        written_size = arch.write_record(record, stream, buffer_size=buffer_size)
+        assert written_size == arch.record_size(record)
+        assert stream.getvalue() == arch.read_record(record).data
+
+
+def test_open_stream(btdx_file):
+    with BTDXArchive.parse_file(btdx_file, backend="file") as arch:
+        for record in arch.records:
+            data = arch.read_record(record).data
+            with arch.open(record.filepath) as stream:
+                assert stream.read(4) == data[:4]
+                assert stream.tell() == min(4, len(data))
+                assert stream.read() == data[4:]
+                assert stream.read() == b""
+                assert stream.seekable() == (record.compression is None)
+                if stream.seekable():
+                    stream.seek(-(len(data) // 2), io.SEEK_END)
+                    assert stream.read() == data[len(data) - (len(data) // 2) :]
+
+
+@pytest.mark.parametrize(
+    "options,first_mip,last_mip",
+    [
+        (dict(max_resolution=512), 1, 11),
+        (dict(mips=slice(3, 6)), 3, 6),
+        (dict(mips=slice(0, 2)), 0, 2),
+        (dict(max_resolution=64, mips=slice(None, -2)), 4, 9),
+        (dict(max_resolution=1), 10, 11),
+    ],
+)
+def test_select_mips(btdx_file, options, first_mip, last_mip):
+    with BTDXArchive.parse_file(btdx_file, backend="file") as arch:
+        if arch.container.header.type != "DX10":
+            with pytest.raises(ValueError):
+                arch.select_mips(arch.records[0], **options)
+            return
+
+        for record in arch.records:
+            tex_header = record.container.header
+            mip_sizes = get_mip_sizes(
+                tex_header.format,
+                tex_header.width,
+                tex_header.height,
+                tex_header.mips_count,
+            )
+            data = arch.read_record(record).data
+            mips_offset = 128 + sum(mip_sizes[:first_mip])
+
+            selected = arch.select_mips(record, **options)
+            selected_data = arch.read_record(selected).data
+            dds_header = DDS_HEADER.parse(selected_data[4:128])
+            assert dds_header.dwWidth == tex_header.width >> first_mip
+            assert dds_header.dwHeight == tex_header.height >> first_mip
+            assert dds_header.dwMipMapCount == last_mip - first_mip
+            assert selected_data[128:] == data[
+                mips_offset : (mips_offset + sum(mip_sizes[first_mip:last_mip]))
+            ]
+            assert selected.packed_size <= record.packed_size
+            assert arch.record_size(selected) == len(selected_data)
+            assert b"".join(arch.iter_record_data(selected, buffer_size=257)) == (
+                selected_data
+            )
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_extract_max_resolution(btdx_file, tmpdir, executor):
+    with BTDXArchive.parse_file(btdx_file) as arch:
+        if arch.container.header.type != "DX10":
+            with pytest.raises(ValueError):
+                arch.extract(str(tmpdir), max_resolution=256)
+            return
+
+        arch.extract(str(tmpdir), workers=2, executor=executor, max_resolution=256)
+        for record in arch.records:
+            with open(str(tmpdir.join(*record.filepath.parts)), "rb") as stream:
+                assert stream.read() == arch.read_record(
+                    arch.select_mips(record, max_resolution=256)
+                ).data
+
+
+def _build_texture(
+    width: int, height: int, mips_count: int, cubemap: bool = False
+) -> bytes:
+    (dds_header, dx10_header) = build_dds_headers(
+        71, width, height, mips_count, cubemap=cubemap
+    )
+    return (
+        b"DDS "
+        + dds_header
+        + (dx10_header or b"")
+        + os.urandom(
+            sum(get_mip_sizes(71, width, height, mips_count)) * (6 if cubemap else 1)
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    "options", [dict(max_resolution=32), dict(mips=slice(2, None))]
+)
+def test_extract_mips_texture_pack(tmpdir, options):
+    to_filepath = str(tmpdir.join("textures.ba2"))
+    BTDXArchive.build(
+        to_filepath,
+        [
+            ("textures\\sky.dds", _build_texture(64, 64, 7, cubemap=True)),
+            ("textures\\one.dds", _build_texture(64, 64, 1)),
+            ("textures\\foo.dds", _build_texture(256, 256, 9)),
+        ],
+        archive_type="DX10",
+    )
+    to_dir = tmpdir.mkdir("extracted")
+
+    with BTDXArchive.parse_file(to_filepath) as arch:
+        (sky, one, foo) = (
+            arch.find_record(f"textures\\{name}.dds") for name in ("sky", "one", "foo")
+        )
+        with pytest.raises(ValueError):
+            arch.select_mips(sky, **options)
+        if "mips" in options:
+            with pytest.raises(ValueError):
+                arch.select_mips(one, **options)
+
+        # single textures never fail the extraction of a texture pack
+        arch.extract(str(to_dir), **options)
+        for (record, expected) in (
+            (sky, sky),
+            (one, one),
+            (foo, arch.select_mips(foo, **options)),
+        ):
+            assert (
+                to_dir.join(*record.filepath.parts).read_binary()
+                == arch.read_record(expected).data
+            )
+
+
+def test_index_table_unsupported_texture(tmpdir):
+    pytest.importorskip("numpy")
+    to_filepath = str(tmpdir.join("textures.ba2"))
+    BTDXArchive.build(
+        to_filepath,
+        [
+            ("textures\\bar.dds", _build_texture(64, 64, 7)),
+            ("textures\\foo.dds", _build_texture(64, 64, 7)),
+        ],
+        archive_type="DX10",
+    )
+    with BTDXArchive.parse_file(to_filepath) as arch:
+        (first, second) = arch.files
+    # NOTE: the format is the byte before the last field of the texture header
+    format_offset = (
+        BTDXArchive.header_struct.sizeof()
+        + BTDXArchive.tex_header_struct.sizeof()
+        + first.header.chunks_count * BTDXArchive.tex_chunk_struct.sizeof()
+        + BTDXArchive.tex_header_struct.sizeof()
+        - 3
+    )
+    with open(to_filepath, "r+b") as stream:
+        stream.seek(format_offset)
+        assert stream.read(1)[0] == second.header.format
+        stream.seek(format_offset)
+        stream.write(bytes([DXGIFormats.DXGI_FORMAT_R32_FLOAT]))
+
+    with pytest.warns(UserWarning), BTDXArchive.parse_file(to_filepath) as arch:
+        (table, filepaths) = arch.index_table()
+        # the table lists every texture, even those without a record
+        assert len(table) == len(filepaths) == arch.container.header.file_count == 2
+        (record,) = arch.records
+        assert filepaths[0] == str(record.filepath)
+        assert table["unpacked_size"].tolist() == [record.unpacked_size, 0]
+        assert table["packed_size"].tolist()[1] == sum(
+            (tex_chunk.packed_size or tex_chunk.unpacked_size)
+            for tex_chunk in second.chunks
+        )
+
+
+def test_extract_incremental(btdx_file, tmpdir, monkeypatch):
+    with BTDXArchive.parse_file(btdx_file, backend="mmap") as arch:
+        read_records = []
+        iter_record_data = arch.iter_record_data
+        monkeypatch.setattr(
+            arch,
+            "iter_record_data",
+            lambda record, **kwargs: read_records.append(record.filepath)
+            or iter_record_data(record, **kwargs),
+        )
+        options = (
+            dict(max_resolution=1) if arch.container.header.type == "DX10" else {}
+        )
+        arch.extract(str(tmpdir), workers=2, mode="incremental", **options)
+        assert len(read_records) == len(arch.records)
+
+        read_records.clear()
+        arch.extract(str(tmpdir), workers=2, mode="incremental", **options)
+        assert read_records == []
+
+        # textures extracted with other mipmaps are extracted again
+        arch.extract(str(tmpdir), mode="incremental")
+        for record in arch.records:
+            with open(str(tmpdir.join(*record.filepath.parts)), "rb") as stream:
+                assert stream.read() == arch.read_record(record).data
+
+
+@pytest.mark.parametrize("compress", [True, False])
+@pytest.mark.parametrize("workers", [1, 4])
+def test_build(btdx_file, tmpdir, compress, workers):
+    arch = BTDXArchive.parse_file(btdx_file)
+    data = {str(record.filepath): arch.read_record(record).data for record in arch.records}
+    to_filepath = str(tmpdir.join("built.ba2"))
+    BTDXArchive.build(
+        to_filepath,
+        [(filepath, io.BytesIO(file_data)) for (filepath, file_data) in data.items()],
+        archive_type=arch.container.header.type,
+        compress=compress,
+        workers=workers,
+    )
+
+    with BTDXArchive.parse_file(to_filepath) as built_arch:
+        assert built_arch.container.header.type == arch.container.header.type
+        assert {
+            str(record.filepath): built_arch.read_record(record).data
+            for record in built_arch.records
+        } == data
+        for record in built_arch.records:
+            file_header = record.container.get("header", record.container)
+            assert (file_header.directory_hash, file_header.hash) == (
+                BTDXArchive.hash_filepath(record.filepath)
+            )
+    assert tmpdir.listdir() == [tmpdir.join("built.ba2")]
+
+
+def test_build_dx10_identical(btdx_file, tmpdir):
+    arch = BTDXArchive.parse_file(btdx_file)
+    if arch.container.header.type != "DX10":
+        pytest.skip("archive is not a DX10 archive")
+
+    to_filepath = str(tmpdir.join("built.ba2"))
+    BTDXArchive.build(
+        to_filepath,
+        [(record.filepath, arch.read_record(record).data) for record in arch.records],
+        archive_type="DX10",
+    )
+    with open(btdx_file, "rb") as stream, open(to_filepath, "rb") as built_stream:
+        # NOTE: names are written with backslashes rather than the original's slashes
+        assert (
+            built_stream.read(arch.container.header.names_offset)
+            == stream.read(arch.container.header.names_offset)
+        )
+
+
+def test_build_invalid(tmpdir):
+    to_filepath = str(tmpdir.join("built.ba2"))
+    with pytest.raises(ValueError):
+        BTDXArchive.build(to_filepath, [], archive_type="GNMF")
+    with pytest.raises(ValueError):
+        BTDXArchive.build(to_filepath, [("foo.dds", b"not a texture")], "DX10")
+    with pytest.raises(ValueError):
+        BTDXArchive.build(to_filepath, [("foo.texture", b"")])
+    assert tmpdir.listdir() == []
@@ -1,9 +1,169 @@
 # Copyright (c) 2018 Stephen Bunn <stephen@bunn.io>
 # MIT License <https://choosealicense.com/licenses/mit/>
 
-from bethesda_structs.contrib.dds import MAKEFOURCC
+import pytest
+
+from bethesda_structs.contrib.dds import (
+    DDS_HEADER,
+    MAKEFOURCC,
+    DDS_HEADER_DX10,
+    DXGIFormats,
+    D3D10ResourceDimension,
+    get_mip_sizes,
+    build_dds_headers,
+    parse_dds_headers,
+)
 from construct import Bytes, Int32ul
 
 
 def test_MAKEFOURCC(makefourcc_pair):
     assert MAKEFOURCC(*makefourcc_pair[0]) == makefourcc_pair[-1]
+
+
+@pytest.mark.parametrize(
+    "dxgi_format,pixel_format,linear_size,dx10",
+    [
+        (
+            DXGIFormats.DXGI_FORMAT_BC1_UNORM,
+            dict(dwFlags=dict(DDPF_FOURCC=True), dwFourCC=MAKEFOURCC(*"DXT1")),
+            (1, 2),
+            False,
+        ),
+        (
+            DXGIFormats.DXGI_FORMAT_BC3_UNORM,
+            dict(dwFlags=dict(DDPF_FOURCC=True), dwFourCC=MAKEFOURCC(*"DXT5")),
+            (1, 1),
+            False,
+        ),
+        (
+            DXGIFormats.DXGI_FORMAT_BC7_UNORM_SRGB,
+            dict(dwFlags=dict(DDPF_FOURCC=True), dwFourCC=MAKEFOURCC(*"DX10")),
+            (1, 1),
+            True,
+        ),
+        (
+            DXGIFormats.DXGI_FORMAT_B8G8R8A8_UNORM,
+            dict(
+                dwFlags=dict(DDPF_ALPHA=True, DDPF_RBG=True),
+                dwRGBBitCount=32,
+                dwABitMask=0xFF000000,
+                dwRBitMask=0x00FF0000,
+                dwGBitMask=0x0000FF00,
+                dwBBitMask=0x000000FF,
+            ),
+            (4, 1),
+            False,
+        ),
+    ],
+)
+@pytest.mark.parametrize("size,mips_count", [((1024, 1024), 11), ((512, 128), 1)])
+@pytest.mark.parametrize("cubemap", [False, True])
+def test_build_dds_headers(
+    dxgi_format, pixel_format, linear_size, dx10, size, mips_count, cubemap
+):
+    (width, height) = size
+    header_data = {
+        "dwFlags": dict.fromkeys(
+            (
+                "DDSD_CAPS",
+                "DDSD_HEIGHT",
+                "DDSD_WIDTH",
+                "DDSD_PIXELFORMAT",
+                "DDSD_MIPMAPCOUNT",
+                "DDSD_LINEARSIZE",
+            ),
+            True,
+        ),
+        "dwHeight": height,
+        "dwWidth": width,
+        "dwPitchOrLinearSize": (width * height * linear_size[0]) // linear_size[1],
+        "dwMipMapCount": mips_count,
+        "ddspf": pixel_format,
+        "dwCaps": dict.fromkeys(
+            ("DDSCAPS_COMPLEX", "DDSCAPS_TEXTURE", "DDSCAPS_MIPMAP"), True
+        ),
+    }
+    if cubemap:
+        header_data["dwCaps2"] = {
+            "DDSCAPS2_CUBEMAP": True,
+            "DDSCAPS2_CUBEMAP_POSITIVEX": True,
+            "DDSCAPS2_CUBEMAP_NEGATIVEX": True,
+            "DDSCAPS2_CUBEMAP_POSITIVEY": True,
+            "DDSCAPS2_CUBEMAP_NEGATIVEY": True,
+            "DDSCAPS2_CUBEMAP_POSITIVEZ": True,
+            "DDSCAPS2_CUBEMAP_NEGATIVEZ": True,
+        }
+    dx10_header = None
+    if dx10:
+        dx10_header = DDS_HEADER_DX10.build(
+            {
+                "dxgiFormat": dxgi_format,
+                "resourceDimension": (
+                    D3D10ResourceDimension.D3D10_RESOURCE_DIMENSION_TEXTURE2D.value
+                ),
+                "miscFlag": 0,
+                "arraySize": 1,
+                "miscFlags2": 0,
+            }
+        )
+
+    assert build_dds_headers(
+        dxgi_format, width, height, mips_count, cubemap=cubemap
+    ) == (DDS_HEADER.build(header_data), dx10_header)
+
+
+@pytest.mark.parametrize(
+    "dxgi_format",
+    [
+        DXGIFormats.DXGI_FORMAT_BC1_UNORM,
+        DXGIFormats.DXGI_FORMAT_BC7_UNORM,
+        DXGIFormats.DXGI_FORMAT_B8G8R8A8_UNORM,
+        DXGIFormats.DXGI_FORMAT_R8_UNORM,
+    ],
+)
+@pytest.mark.parametrize("cubemap", [False, True])
+def test_parse_dds_headers(dxgi_format, cubemap):
+    (dds_header, dx10_header) = build_dds_headers(
+        dxgi_format, 512, 128, 10, cubemap=cubemap
+    )
+    content = b"DDS " + dds_header + (dx10_header or b"") + b"data"
+    assert parse_dds_headers(content) == (
+        dxgi_format,
+        512,
+        128,
+        10,
+        cubemap,
+        len(content) - 4,
+    )
+
+
+def test_parse_dds_headers_unsupported():
+    with pytest.raises(ValueError):
+        parse_dds_headers(b"DDS ")
+    with pytest.raises(ValueError):
+        parse_dds_headers(b"PNG " + bytes(144))
+    (dds_header, _) = build_dds_headers(DXGIFormats.DXGI_FORMAT_BC1_UNORM, 4, 4, 1)
+    with pytest.raises(ValueError):
+        parse_dds_headers(b"DDS " + dds_header.replace(b"DXT1", b"DXT9"))
+
+
+def test_build_dds_headers_unsupported():
+    with pytest.raises(ValueError):
+        build_dds_headers(DXGIFormats.DXGI_FORMAT_R32_FLOAT, 256, 256, 9)
+
+
+def test_get_mip_sizes():
+    assert get_mip_sizes(DXGIFormats.DXGI_FORMAT_BC1_UNORM, 16, 8, 5) == [
+        64,
+        16,
+        8,
+        8,
+        8,
+    ]
+    assert get_mip_sizes(DXGIFormats.DXGI_FORMAT_B8G8R8A8_UNORM, 4, 2, 3) == [
+        32,
+        8,
+        4,
+    ]
+    with pytest.raises(ValueError):
+        get_mip_sizes(DXGIFormats.DXGI_FORMAT_R32_FLOAT, 4, 4, 1)